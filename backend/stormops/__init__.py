@@ -0,0 +1,4 @@
+# Importing stormops has no side effects: nothing configures logging, creates
+# directories or imports pandas/requests/rich until a command actually runs.
+# Entry point: python -m stormops <command>, with discover, fetch, worker, crawl, extract,
+# replay, render, manifest, serve, run and bench (stormops.cli)
@@ -0,0 +1,7 @@
+import sys
+
+from .cli import main
+
+# Guarded so parse worker processes, which start by importing this module, don't run the CLI
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,747 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import mocksite
+from .frontier import Frontier
+from .records import SUCCESS, CameraRow, EmbedResult
+from .startup import FIRST_FETCH_BUDGET_MS, IMPORT_BUDGET_MS, PACKAGE_PARENT, measure_startup, package_env
+
+STAGES = ['master', 'extract', 'discover', 'scan', 'rows', 'render', 'order', 'thumbnails', 'redos', 'isolation', 'slave', 'crawl', 'workers', 'main']
+# Sizes of the synthetic UnParsed dump for the discover stage; peak RSS should not grow with them
+DEFAULT_DUMP_MB = [4, 16]
+DEFAULT_OUTPUT = 'bench_results.json'
+DEFAULT_HISTORY = 'bench_history.jsonl'
+# Adversarial input sizes for the redos stage: a linear pattern takes about 4x as long on
+# the larger, a quadratic one 16x
+REDOS_SIZES_KB = (16, 64)
+# Growth over that 4x at which a pattern counts as superlinear, and the time below which
+# growth is timer noise
+REDOS_MAX_GROWTH = 8
+REDOS_NOISE_MS = 2
+# The isolation stage parses this many directory pages, then the same with one page of each
+# kind of poison among them, under this per-page limit and worker memory cap
+ISOLATION_PAGES = 40
+ISOLATION_TIMEOUT_SECONDS = 2.0
+ISOLATION_MEMORY_MB = 256
+
+# Site options forwarded unchanged from the parent to each stage subprocess
+SITE_OPTIONS = [
+    ('--pages', 'directory_pages', int, 5, 'Directory pages on the mock site'),
+    ('--cams-per-page', 'cameras_per_page', int, 40, 'Camera links per directory page'),
+    ('--page-kb', 'page_kb', int, 50, 'Approximate size of every page in KB'),
+    ('--latency-ms', 'latency_ms', int, 0, 'Fixed latency added to each response'),
+    ('--latency-jitter-ms', 'latency_jitter_ms', int, 0, 'Random extra latency per response'),
+    ('--error-rate', 'error_rate', float, 0.0, 'Fraction of requests answered with HTTP 500'),
+    ('--throttle-rate', 'throttle_rate', float, 0.0, 'Fraction of requests answered with HTTP 429'),
+    ('--seed', 'seed', int, 1, 'Seed for the embed mix and injected faults'),
+]
+
+def parse_embed_mix(value):
+    mix = {}
+    for part in value.split(','):
+        platform_name, weight = part.split('=')
+        mix[platform_name.strip()] = float(weight)
+    return mix
+
+def site_config_from_args(args):
+    kwargs = {dest: getattr(args, dest) for _, dest, _, _, _ in SITE_OPTIONS}
+    return mocksite.SiteConfig(embed_mix=parse_embed_mix(args.embed_mix), **kwargs)
+
+def forwarded_site_args(args):
+    forwarded = ['--embed-mix', args.embed_mix]
+    for flag, dest, _, _, _ in SITE_OPTIONS:
+        forwarded += [flag, str(getattr(args, dest))]
+    return forwarded
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+# ru_maxrss is KB on Linux and bytes on macOS
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+# Write every camera page into the HTML cache and every directory page into UnParsed
+def write_scan_corpus(site_config, cache_dir, unparsed_dir):
+    cache_files = []
+    for index, path in enumerate(mocksite.camera_paths(site_config)):
+        filename = os.path.join(cache_dir, f"cam_{index}.html")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(mocksite.render_camera_page(site_config, index))
+        cache_files.append(filename)
+    directory_files = []
+    for page in range(site_config.directory_pages):
+        filename = os.path.join(unparsed_dir, f"directory_{page + 1}.html")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(mocksite.render_directory_page(site_config, page))
+        directory_files.append(filename)
+    return cache_files, directory_files
+
+def read_text(filename):
+    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+# Best of `repeat` timings of fn(), with its last result
+def best_time(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+# MB/s of the open().read() path against the mmap path over the same files (embeds from
+# cached camera pages, links from directory pages); the two must find the same things
+def compare_scan_paths(cache_files, directory_files):
+    from . import pipeline
+
+    paths = {
+        'embeds': (
+            cache_files,
+            lambda: [pipeline.extract_embed_code(read_text(f)) for f in cache_files],
+            lambda: [pipeline.extract_embed_code_from_file(f) for f in cache_files],
+        ),
+        'links': (
+            directory_files,
+            lambda: [list(pipeline.iter_master_rows([read_text(f)])) + list(pipeline.iter_extract_rows([read_text(f)])) for f in directory_files],
+            lambda: [list(pipeline.iter_master_rows_mapped(f)) + list(pipeline.iter_extract_rows_mapped(f)) for f in directory_files],
+        ),
+    }
+    report = {}
+    for name, (files, read_path, mapped_path) in paths.items():
+        megabytes = sum(os.path.getsize(f) for f in files) / 1048576
+        read_seconds, read_result = best_time(read_path)
+        mapped_seconds, mapped_result = best_time(mapped_path)
+        report[f"{name}_mb"] = round(megabytes, 2)
+        report[f"{name}_read_mb_per_sec"] = round(megabytes / read_seconds, 1) if read_seconds else None
+        report[f"{name}_mmap_mb_per_sec"] = round(megabytes / mapped_seconds, 1) if mapped_seconds else None
+        report[f"{name}_match"] = read_result == mapped_result
+    return report
+
+# Bytes per row of `count` result rows held as dicts (how rows used to be carried) and as
+# EmbedResult records, measured with tracemalloc; strings are shared, so only row overhead differs
+def measure_row_memory(site_config, base_url, count):
+    import tracemalloc
+
+    paths = mocksite.camera_paths(site_config)
+    embed = '<iframe src="https://www.youtube.com/embed/abc" allowfullscreen></iframe>'
+    fields = [(f"{base_url}{paths[i % len(paths)]}?n={i}", mocksite.camera_name(i % len(paths)), embed) for i in range(count)]
+    builders = {
+        'dict': lambda: [{'URL': url, 'Name': name, 'Embed_Code': code, 'Status': SUCCESS} for url, name, code in fields],
+        'record': lambda: [EmbedResult(url, name, code, SUCCESS) for url, name, code in fields],
+    }
+    report = {'rows': count}
+    for kind, build in builders.items():
+        tracemalloc.start()
+        rows = build()
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del rows
+        report[f"{kind}_bytes_per_row"] = round(used / count, 1)
+    report['row_memory_saved'] = round(1 - report['record_bytes_per_row'] / report['dict_bytes_per_row'], 3)
+    return report
+
+# URLs/sec of `stormops worker` processes draining a freshly seeded store, per worker count.
+# Nothing caps the rate across workers here (--global-interval 0), so the numbers show how
+# far throughput scales with processes before the mock site or SQLite becomes the limit.
+def measure_worker_scaling(site_config, base_url, counts, initial_delay=None):
+    from .leasequeue import spawn_workers
+    from .store import PipelineStore
+
+    worker_args = ['--global-interval', '0', '--no-cache']
+    if initial_delay is not None:
+        worker_args += ['--delay', str(initial_delay)]
+    report = {}
+    for count in counts:
+        db_path = f"workers_{count}.db"
+        with PipelineStore(db_path) as store:
+            store.add_urls(CameraRow(base_url + path, mocksite.camera_name(i)) for i, path in enumerate(mocksite.camera_paths(site_config)))
+        started = time.perf_counter()
+        spawn_workers(count, db_path, worker_args)
+        elapsed = time.perf_counter() - started
+        with PipelineStore(db_path) as store:
+            processed = store.result_count()
+        report[f"workers_{count}_urls_per_sec"] = round(processed / elapsed, 2)
+    first = report[f"workers_{counts[0]}_urls_per_sec"]
+    report['worker_scaling'] = {count: round(report[f"workers_{count}_urls_per_sec"] / first, 2) for count in counts} if first else None
+    return report
+
+# Gallery cards for every mock camera that has an embed
+def mock_webcams(site_config, base_url):
+    webcams = []
+    for index, path in enumerate(mocksite.camera_paths(site_config)):
+        platform = mocksite.camera_platform(site_config, index)
+        if platform != 'none':
+            embed = mocksite.EMBED_TEMPLATES[platform].format(video_id=f"vid{index:07d}", video_number=100000 + index)
+            webcams.append(EmbedResult(base_url + path, mocksite.camera_name(index), embed, SUCCESS))
+    return webcams
+
+# Baseline for the render stage: how pages were written before the template layer, with
+# the stylesheet inlined into every page and each card formatted from a str.format template
+def write_inline_style_page(writer, webcams):
+    from .templates import STYLESHEET
+
+    head = ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n<title>All Webcams</title>\n'
+            f'<style>\n{STYLESHEET}</style>\n</head>\n<body>\n<div class="masonry">\n')
+    card = """
+        <div class="card">
+            <h2>{name}</h2>
+            <div class="video-container">
+                {embed_code}
+            </div>
+        </div>
+        """
+    writer.write(head)
+    for webcam in webcams:
+        writer.write_card(card.format(name=webcam.name, embed_code=webcam.embed_code), webcam.embed_code)
+    writer.write('</div>\n</body>\n</html>\n')
+    return writer
+
+# Render time per page and total bytes for batch pages of batch_size cameras, inline-style
+# baseline against the compiled templates plus one shared stylesheet
+def compare_render(webcams, batch_size):
+    import io
+
+    from .html_verify import CountingWriter
+    from .pipeline import write_all_webcams_html
+    from .templates import STYLESHEET
+
+    batches = [webcams[i:i + batch_size] for i in range(0, len(webcams), batch_size)]
+
+    def inline_pages():
+        return sum(write_inline_style_page(CountingWriter(io.StringIO()), batch).bytes_written for batch in batches)
+
+    def template_pages():
+        return sum(write_all_webcams_html(CountingWriter(io.StringIO()), batch).bytes_written for batch in batches)
+
+    inline_seconds, inline_bytes = best_time(inline_pages)
+    template_seconds, template_bytes = best_time(template_pages)
+    template_bytes += len(STYLESHEET.encode('utf-8'))
+    pages = max(len(batches), 1)
+    return {
+        'render_pages': len(batches),
+        'inline_ms_per_page': round(inline_seconds * 1000 / pages, 4),
+        'template_ms_per_page': round(template_seconds * 1000 / pages, 4),
+        'inline_bytes': inline_bytes,
+        'template_bytes': template_bytes,
+    }
+
+# Full batch-page build, then a rebuild after renaming one camera: time of each and how
+# many page files the rebuild touched (by mtime)
+def measure_incremental_build(webcams, batch_size, directory):
+    from .pipeline import save_batch_pages
+
+    start = time.perf_counter()
+    pages = save_batch_pages(webcams, batch_size, directory)
+    full_seconds = time.perf_counter() - start
+    mtimes = {page: os.stat(page).st_mtime_ns for page in pages}
+    changed = list(webcams)
+    middle = len(changed) // 2
+    if changed:
+        changed[middle] = EmbedResult(changed[middle].url, changed[middle].name + ' (renamed)', changed[middle].embed_code, SUCCESS)
+    time.sleep(0.01)
+    start = time.perf_counter()
+    pages = save_batch_pages(changed, batch_size, directory)
+    incremental_seconds = time.perf_counter() - start
+    return {
+        'full_build_ms': round(full_seconds * 1000, 2),
+        'incremental_build_ms': round(incremental_seconds * 1000, 2),
+        'incremental_pages_touched': sum(1 for page in pages if os.stat(page).st_mtime_ns != mtimes.get(page)),
+    }
+
+# Region shards written for the cameras against one monolithic manifest of all of them:
+# how many shards, and the gzipped bytes a client downloads for its one region (the
+# largest shard, the worst case) versus the whole catalogue
+def compare_shards(webcams, directory):
+    import gzip
+
+    from .shards import GZIP_LEVEL, encode_shard, group_by_region, write_shards
+
+    index = write_shards(webcams, directory)
+    records = [record for shard in group_by_region(webcams).values() for record in shard]
+    monolithic = encode_shard({'cameras': records}, 'json')
+    largest = max(index['regions'].values(), key=lambda entry: entry['bytes'], default={'bytes': 0})
+    return {
+        'shards': len(index['regions']),
+        'largest_shard_gz_bytes': largest.get('gz', largest['bytes']),
+        'monolithic_gz_bytes': len(gzip.compress(monolithic, GZIP_LEVEL, mtime=0)),
+    }
+
+# Every link process_master takes from the directory pages (cameras plus navigation),
+# "fetched" in discovery order and in yield order with each answer taken from the mock
+# site's embed mix, nothing downloaded: the share of all embeds found after a quarter and
+# half of the fetches, and how many fetches it took to find 90% of them
+def compare_fetch_order(site_config, base_url):
+    from .pipeline import iter_master_rows
+    from .priority import YieldOrder
+    from .store import PipelineStore
+
+    embeds = {base_url + mocksite.camera_path(i): mocksite.EMBED_TEMPLATES[platform].format(video_id=f"vid{i:07d}", video_number=100000 + i)
+              for i in range(site_config.camera_count) for platform in [mocksite.camera_platform(site_config, i)] if platform != 'none'}
+    rows = [row for page in range(site_config.directory_pages)
+            for row in iter_master_rows([mocksite.render_directory_page(site_config, page)], base_url)]
+    extra = {}
+    for order in ('discovery', 'yield'):
+        with PipelineStore(f"order_{order}.db") as store:
+            store.add_urls(rows)
+            pending = YieldOrder(store, rerank_interval=25) if order == 'yield' else store.iter_pending()
+            found = []
+            for row in pending:
+                embed_code = embeds.get(row.url)
+                store.add_result(row.url, row.name, embed_code)
+                if order == 'yield':
+                    pending.observe(row.url, row.name, embed_code)
+                found.append(1 if embed_code else 0)
+        total = max(sum(found), 1)
+        running = 0
+        for fetched, hit in enumerate(found, 1):
+            running += hit
+            if running >= 0.9 * total:
+                break
+        extra[f"{order}_fetches_to_90pct"] = fetched
+        for share in (25, 50):
+            extra[f"{order}_embeds_at_{share}pct"] = round(sum(found[:len(found) * share // 100]) / total, 3)
+    extra['order_urls'] = len(found)
+    return extra
+
+# Poster thumbnails for every YouTube camera through ThumbnailService, with the mock site
+# standing in for the poster host: a cold pass with each poster asked for twice at once
+# (one fetch each), then a pass answered from memory and one from disk. Reports ms per
+# thumbnail for each tier and how many fetches the cold pass made.
+def measure_thumbnails(site_config, base_url):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .fetcher import fetch_bytes
+    from .thumbnails import DiskCache, MemoryCache, ThumbnailService, youtube_video_id
+
+    video_ids = [video_id for video_id in (youtube_video_id(webcam.embed_code) for webcam in mock_webcams(site_config, base_url)) if video_id]
+    fetched = []
+
+    def counting_fetch(url):
+        fetched.append(url)
+        return fetch_bytes(url)
+
+    service = ThumbnailService(DiskCache('thumbnail_cache'), MemoryCache(), fetch=counting_fetch, origin=base_url)
+    extra = {'thumbnails': len(video_ids)}
+    with ThreadPoolExecutor(16) as pool:
+        for tier, requests in (('cold', video_ids * 2), ('memory', video_ids), ('disk', video_ids)):
+            if tier == 'disk':
+                service.memory.clear()
+            start = time.perf_counter()
+            missing = sum(1 for data in pool.map(service.get, requests) if data is None)
+            extra[f"thumbnail_{tier}_ms"] = round((time.perf_counter() - start) * 1000 / max(len(requests), 1), 4)
+            extra[f"thumbnail_{tier}_missing"] = missing
+    extra['thumbnail_fetches'] = len(fetched)
+    return extra
+
+# Every page pattern the pipeline runs, by name
+def page_patterns():
+    import re
+
+    from . import config, html_verify, pipeline
+    from .sources import WEBCAMTAXI
+
+    patterns = {f"discovery[{i}]": pattern for i, pattern in enumerate(WEBCAMTAXI.discovery_patterns)}
+    patterns.update((f"video[{i}]", re.compile(pattern)) for i, pattern in enumerate(config.VIDEO_PATTERNS))
+    patterns['a_tag'] = pipeline.A_TAG_PATTERN
+    patterns['verify_embed'] = html_verify.EMBED_PATTERN
+    return patterns
+
+# Repeating units that push backtracking patterns into their worst case: each pattern's
+# opening with nothing after it, every prefix of a real tag (a near miss that almost
+# matches), and filler repeated after an opening that never closes
+def redos_units():
+    from .mocksite import EMBED_TEMPLATES
+
+    openings = ['<a ', '<div class="nspArt">', '<div class="nspCol1">', '<iframe ', '<iframe src="https://www.youtube.com/embed/']
+    tags = [
+        '<div class="nspArt nspCol3"><a href="/en/japan/tokyo/shibuya-crossing.html" class="nspImageWrapper" title="Shibuya Cam">',
+        '<a href="/en/japan/tokyo/shibuya-crossing.html" title="Shibuya Cam" class="webcam thumbnail">',
+        EMBED_TEMPLATES['youtube'].format(video_id='dQw4w9WgXcQ'),
+        EMBED_TEMPLATES['vimeo'].format(video_number=1),
+    ]
+    units = {f"opening {opening!r}": opening for opening in openings}
+    units.update((f"near miss {tag[:24]!r}...", ''.join(tag[:i] + ' ' for i in range(1, len(tag)))) for tag in tags)
+    for prefix in ('', '<a ', '<div class="nspArt">'):
+        units.update((f"{prefix!r} then {filler!r}", prefix + filler * 64) for filler in (' ', 'Cam', '/', '"'))
+    return units
+
+# Time every page pattern over every adversarial input at each of REDOS_SIZES_KB, and flag
+# the patterns whose time grows faster than the input (catastrophic backtracking)
+def measure_pattern_scaling():
+    patterns = page_patterns()
+    units = redos_units()
+    small, large = (kb * 1024 for kb in REDOS_SIZES_KB)
+    worst = {}
+    superlinear = []
+    for unit_name, unit in units.items():
+        texts = [(unit * (size // len(unit) + 1))[:size] for size in (small, large)]
+        for name, pattern in patterns.items():
+            small_seconds, _ = best_time(lambda: pattern.findall(texts[0]), repeat=2)
+            large_seconds, _ = best_time(lambda: pattern.findall(texts[1]), repeat=2)
+            growth = large_seconds / small_seconds if small_seconds else 0
+            ns_per_byte = large_seconds * 1e9 / large
+            if ns_per_byte > worst.get(name, (0,))[0]:
+                worst[name] = (ns_per_byte, unit_name)
+            if growth > REDOS_MAX_GROWTH and large_seconds * 1000 >= REDOS_NOISE_MS:
+                superlinear.append({'pattern': name, 'input': unit_name, 'growth': round(growth, 1), 'large_ms': round(large_seconds * 1000, 2)})
+    return {
+        'patterns': len(patterns),
+        'inputs': len(units),
+        'redos_sizes_kb': list(REDOS_SIZES_KB),
+        'worst_ns_per_byte': {name: {'ns_per_byte': round(ns, 1), 'input': unit_name} for name, (ns, unit_name) in sorted(worst.items())},
+        'superlinear': superlinear,
+    }
+
+# Parse task for the isolation stage: poison pages (by file name) hang, allocate until they
+# hit the memory cap or kill their worker; any other page is parsed as usual
+def poisoned_parse(filepath, method='both', source=None):
+    from .parsepool import parse_page
+
+    name = os.path.basename(filepath)
+    if name.startswith('poison-hang'):
+        while True:
+            time.sleep(1)
+    if name.startswith('poison-memory'):
+        hog = []
+        while True:
+            hog.append(bytearray(64 * 1024 * 1024))
+    if name.startswith('poison-crash'):
+        os._exit(70)
+    yield from parse_page(filepath, method, source)
+
+# Pages/sec through the parse worker pool over clean directory pages, and over the same
+# pages with a hanging, a memory-hungry and a crashing page among them; every poison page
+# should be dead-lettered and every camera link still found
+def measure_parse_isolation(site_config, directory):
+    from . import config
+    from .parsepool import ParsePool
+    from .store import PipelineStore
+
+    os.makedirs(directory, exist_ok=True)
+    pages = []
+    for page in range(ISOLATION_PAGES):
+        pages.append(os.path.join(directory, f"directory_{page + 1}.html"))
+        with open(pages[-1], 'w', encoding='utf-8') as f:
+            f.write(mocksite.render_directory_page(site_config, page % site_config.directory_pages))
+    poison = []
+    for kind in ('hang', 'memory', 'crash'):
+        poison.append(os.path.join(directory, f"poison-{kind}.html"))
+        shutil.copyfile(pages[0], poison[-1])
+    extra = {'isolation_pages': len(pages), 'isolation_workers': config.PARSE_WORKERS}
+    for name, filepaths in (('clean', pages), ('poisoned', pages[:len(pages) // 2] + poison + pages[len(pages) // 2:])):
+        store = PipelineStore(os.path.join(directory, f"{name}.db"))
+        with ParsePool(timeout=ISOLATION_TIMEOUT_SECONDS, memory_mb=ISOLATION_MEMORY_MB, target=poisoned_parse) as pool:
+            started = time.perf_counter()
+            done = sum(1 for _ in pool.discover(filepaths, store))
+            elapsed = time.perf_counter() - started
+        extra[f"isolation_{name}_pages_per_sec"] = round(len(pages) / elapsed, 1)
+        extra[f"isolation_{name}_urls"] = store.url_count()
+        extra[f"isolation_{name}_dead_letters"] = sorted(entry['reason'] for entry in pool.dead_letters)
+        extra[f"isolation_{name}_pages_done"] = done
+        store.close()
+    return extra
+
+# Runs inside a fresh subprocess so peak RSS and CPU time belong to this stage alone
+def run_stage(args):
+    os.chdir(args.workdir)
+    site_config = site_config_from_args(args)
+
+    from rich.progress import Progress
+
+    from . import config, fetcher, pipeline
+    from .crawler import LinkCrawler
+    from .log import setup_logging
+    from .tables import iter_table
+
+    setup_logging()
+    config.BASE_URL = args.base_url
+    config.ensure_directories()
+    if args.initial_delay is not None:
+        fetcher.rate_controller.initial_delay = args.initial_delay
+
+    directory_html = [mocksite.render_directory_page(site_config, page) for page in range(site_config.directory_pages)]
+    store = None
+    if args.stage == 'discover':
+        # The dump is input, not pipeline output; write it before bytes_written is sampled
+        os.makedirs(config.UNPARSED_DIR, exist_ok=True)
+        dump_file = os.path.join(config.UNPARSED_DIR, 'directory_dump.html')
+        mocksite.write_directory_dump(site_config, dump_file, args.dump_mb[0] * 1024 * 1024)
+        store = pipeline.open_store()
+    elif args.stage == 'scan':
+        os.makedirs(config.UNPARSED_DIR, exist_ok=True)
+        cache_files, directory_files = write_scan_corpus(site_config, config.HTML_CACHE_DIR, config.UNPARSED_DIR)
+    elif args.stage == 'main':
+        os.makedirs(config.UNPARSED_DIR, exist_ok=True)
+        for page, html in enumerate(directory_html):
+            with open(os.path.join(config.UNPARSED_DIR, f"directory_{page + 1}.html"), 'w', encoding='utf-8') as f:
+                f.write(html)
+    elif args.stage == 'crawl':
+        store = pipeline.open_store()
+    elif args.stage == 'slave':
+        store = pipeline.open_store()
+        store.add_urls(CameraRow(args.base_url + path, mocksite.camera_name(i)) for i, path in enumerate(mocksite.camera_paths(site_config)))
+        store.commit()
+
+    bytes_before = directory_size(args.workdir)
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    extra = {}
+    with Progress(disable=True) as progress:
+        task = progress.add_task('bench', total=None)
+        if args.stage == 'master':
+            urls = sum(len(pipeline.process_master(html, progress, task)) for html in directory_html)
+        elif args.stage == 'extract':
+            urls = sum(len(pipeline.process_extract(html, progress, task)) for html in directory_html)
+        elif args.stage == 'discover':
+            frontier = Frontier(store)
+            pipeline.discover_file(dump_file, frontier)
+            urls = store.url_count()
+            extra = dict(frontier.stats(), dump_bytes=os.path.getsize(dump_file))
+        elif args.stage == 'scan':
+            extra = compare_scan_paths(cache_files, directory_files)
+            urls = len(cache_files) + len(directory_files)
+        elif args.stage == 'render':
+            webcams = mock_webcams(site_config, args.base_url)
+            extra = compare_render(webcams, config.MIN_VIDEOS_PER_HTML)
+            extra.update(measure_incremental_build(webcams, config.MIN_VIDEOS_PER_HTML, config.WEBCAM_DIR))
+            extra.update(compare_shards(webcams, config.WEBCAM_DIR))
+            urls = len(webcams)
+        elif args.stage == 'order':
+            extra = compare_fetch_order(site_config, args.base_url)
+            urls = extra['order_urls']
+        elif args.stage == 'thumbnails':
+            extra = measure_thumbnails(site_config, args.base_url)
+            urls = extra['thumbnail_fetches']
+        elif args.stage == 'redos':
+            extra = measure_pattern_scaling()
+            urls = 0
+        elif args.stage == 'isolation':
+            extra = measure_parse_isolation(site_config, config.UNPARSED_DIR)
+            urls = extra['isolation_clean_urls']
+        elif args.stage == 'rows':
+            extra = measure_row_memory(site_config, args.base_url, args.rows)
+            urls = args.rows
+        elif args.stage == 'workers':
+            extra = measure_worker_scaling(site_config, args.base_url, args.worker_counts, args.initial_delay)
+            urls = site_config.camera_count * len(args.worker_counts)
+        elif args.stage == 'slave':
+            valid, skipped, failed = pipeline.process_slave(store, progress, task)
+            pipeline.export_results(store, os.path.join(config.WEBCAM_DIR, config.GALLERY_FILENAME))
+            urls = valid + skipped + failed
+            extra = {'valid_embeds': valid, 'no_embed': skipped, 'failed': failed}
+        elif args.stage == 'crawl':
+            # Crawl from the mock root (no delay beyond the rate controller), fetching cameras as they are found
+            crawler = LinkCrawler(root=args.base_url + '/', delay=0)
+            valid, skipped, failed = pipeline.process_slave(store, progress, task, crawler.iter_cameras(Frontier(store)))
+            pipeline.export_results(store, os.path.join(config.WEBCAM_DIR, config.GALLERY_FILENAME))
+            urls = valid + skipped + failed
+            extra = dict(crawler.stats(), valid_embeds=valid, no_embed=skipped, failed=failed,
+                         all_cameras_found=crawler.cameras == site_config.camera_count)
+        else:
+            pipeline.main()
+            results = list(iter_table(config.OUTPUT_CSV))
+            urls = len(results)
+            extra = {'valid_embeds': sum(1 for row in results if row['Embed_Code'])}
+    elapsed = time.perf_counter() - started
+    if store is not None:
+        store.close()
+
+    result = {
+        'stage': f"discover@{args.dump_mb[0]}MB" if args.stage == 'discover' else args.stage,
+        'urls': urls,
+        'wall_seconds': round(elapsed, 4),
+        'urls_per_sec': round(urls / elapsed, 2) if elapsed > 0 else None,
+        'cpu_seconds': round(cpu_seconds() - cpu_before, 4),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'bytes_written': directory_size(args.workdir) - bytes_before,
+    }
+    result.update(extra)
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PACKAGE_PARENT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_summary(report):
+    from rich import print as rprint
+    from rich.table import Table
+
+    table = Table(title="Pipeline Benchmark", style="cyan", header_style="bold green")
+    for column in ['Stage', 'URLs', 'URLs/sec', 'Wall (s)', 'CPU (s)', 'Peak RSS (MB)', 'Written (KB)', 'Requests']:
+        table.add_column(column, style="green")
+    for stage in report['stages']:
+        table.add_row(
+            stage['stage'], str(stage['urls']), str(stage['urls_per_sec']), str(stage['wall_seconds']),
+            str(stage['cpu_seconds']), f"{stage['peak_rss_bytes'] / 1048576:.1f}", f"{stage['bytes_written'] / 1024:.1f}",
+            str(stage['server_requests'])
+        )
+    rprint(table)
+    for stage in report['stages']:
+        if stage['stage'] == 'scan':
+            for name in ('embeds', 'links'):
+                rprint(f"[green]Scan {name}: open().read() {stage[f'{name}_read_mb_per_sec']} MB/s, "
+                       f"mmap {stage[f'{name}_mmap_mb_per_sec']} MB/s over {stage[f'{name}_mb']} MB "
+                       f"(same results: {stage[f'{name}_match']})[/green]")
+        if stage['stage'].startswith('discover@'):
+            rprint(f"[green]{stage['stage']}: {stage['duplicates_avoided']} duplicate links skipped of {stage['seen']} "
+                   f"({stage['bloom_false_positives']} Bloom false positives, {stage['bloom_bytes'] / 1048576:.1f} MB filter)[/green]")
+        if stage['stage'] == 'crawl':
+            rprint(f"[green]Crawl: {stage['pages']} pages, {stage['new_cameras']} cameras "
+                   f"(all found: {stage['all_cameras_found']}), {stage['disallowed']} disallowed by robots.txt[/green]")
+        if stage['stage'] == 'workers' and stage['worker_scaling']:
+            rprint("[green]Workers: " + ', '.join(f"{count} -> {stage[f'workers_{count}_urls_per_sec']} URLs/s (x{ratio})"
+                                                 for count, ratio in stage['worker_scaling'].items()) + "[/green]")
+        if stage['stage'] == 'render':
+            rprint(f"[green]Render: {stage['render_pages']} pages, {stage['inline_ms_per_page']} -> {stage['template_ms_per_page']} ms/page, "
+                   f"{stage['inline_bytes'] / 1024:.1f} -> {stage['template_bytes'] / 1024:.1f} KB[/green]")
+            rprint(f"[green]Incremental render: full build {stage['full_build_ms']} ms, one camera changed "
+                   f"{stage['incremental_build_ms']} ms touching {stage['incremental_pages_touched']} page(s)[/green]")
+            rprint(f"[green]Camera shards: {stage['shards']} regions, largest {stage['largest_shard_gz_bytes'] / 1024:.1f} KB gzipped "
+                   f"vs {stage['monolithic_gz_bytes'] / 1024:.1f} KB for the whole catalogue[/green]")
+        if stage['stage'] == 'order':
+            rprint(f"[green]Fetch order: embeds found after half the fetches, discovery {stage['discovery_embeds_at_50pct']:.0%} "
+                   f"vs yield {stage['yield_embeds_at_50pct']:.0%}; 90% of embeds after {stage['discovery_fetches_to_90pct']} vs "
+                   f"{stage['yield_fetches_to_90pct']} of {stage['order_urls']} fetches[/green]")
+        if stage['stage'] == 'thumbnails':
+            rprint(f"[green]Thumbnails: {stage['thumbnail_fetches']} fetches for {stage['thumbnails']} posters asked for twice; "
+                   f"{stage['thumbnail_cold_ms']} ms cold, {stage['thumbnail_disk_ms']} ms from disk, {stage['thumbnail_memory_ms']} ms from memory[/green]")
+        if stage['stage'] == 'redos':
+            style = 'red' if stage['superlinear'] else 'green'
+            name, slowest = max(stage['worst_ns_per_byte'].items(), key=lambda item: item[1]['ns_per_byte'])
+            rprint(f"[{style}]Patterns: {len(stage['superlinear'])} superlinear of {stage['patterns']} over {stage['inputs']} adversarial inputs; "
+                   f"slowest {name} at {slowest['ns_per_byte']} ns/byte on {slowest['input']}[/{style}]")
+            for entry in stage['superlinear']:
+                rprint(f"[red]  {entry['pattern']} on {entry['input']}: x{entry['growth']} for 4x the input ({entry['large_ms']} ms)[/red]")
+        if stage['stage'] == 'isolation':
+            rprint(f"[green]Parse isolation: {stage['isolation_clean_pages_per_sec']} pages/s clean, "
+                   f"{stage['isolation_poisoned_pages_per_sec']} with 3 poison pages among {stage['isolation_pages']} "
+                   f"(dead-lettered: {', '.join(stage['isolation_poisoned_dead_letters']) or 'none'}; "
+                   f"same URLs: {stage['isolation_clean_urls'] == stage['isolation_poisoned_urls']})[/green]")
+        if stage['stage'] == 'rows':
+            rprint(f"[green]Rows: {stage['dict_bytes_per_row']} bytes/row as dicts, {stage['record_bytes_per_row']} as records "
+                   f"({stage['row_memory_saved']:.0%} less) over {stage['rows']} rows[/green]")
+    startup = report.get('startup')
+    if startup:
+        style = 'green' if startup['within_budget'] else 'red'
+        rprint(f"[{style}]Startup: import {startup['import_ms']} ms (budget {startup['import_budget_ms']}), "
+               f"first fetch {startup['first_fetch_ms']} ms (budget {startup['first_fetch_budget_ms']})[/{style}]")
+
+def run_benchmark(args):
+    config = site_config_from_args(args)
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'site': config.as_dict(),
+        'initial_delay': args.initial_delay,
+        'stages': []
+    }
+    with mocksite.MockSite(config) as site:
+        if not args.skip_startup:
+            report['startup'] = measure_startup(site.base_url + mocksite.camera_path(0), args.import_budget_ms, args.first_fetch_budget_ms)
+        # The discover stage runs once per dump size so memory can be compared across sizes
+        runs = []
+        for stage in args.stages:
+            if stage == 'discover':
+                runs += [(stage, ['--dump-mb', str(mb)]) for mb in args.dump_mb]
+            elif stage == 'rows':
+                runs.append((stage, ['--rows', str(args.rows)]))
+            elif stage == 'workers':
+                runs.append((stage, ['--worker-counts'] + [str(count) for count in args.worker_counts]))
+            else:
+                runs.append((stage, []))
+        for stage, stage_args in runs:
+            workdir = tempfile.mkdtemp(prefix=f"stormops-bench-{stage}-")
+            result_file = os.path.join(workdir, 'bench_stage_result.json')
+            command = [sys.executable, '-m', 'stormops.bench', '--stage', stage, '--workdir', workdir,
+                       '--base-url', site.base_url, '--result-file', result_file] + stage_args + forwarded_site_args(args)
+            if args.initial_delay is not None:
+                command += ['--initial-delay', str(args.initial_delay)]
+            served_before = site.stats()
+            output = None if args.verbose else subprocess.DEVNULL
+            subprocess.run(command, check=True, stdout=output, stderr=output, env=package_env())
+            served_after = site.stats()
+            with open(result_file, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # The stage's own result file lives in workdir; don't count it as pipeline output
+            result['bytes_written'] -= os.path.getsize(result_file)
+            result['server_requests'] = served_after['requests'] - served_before['requests']
+            result['server_bytes'] = served_after['bytes_served'] - served_before['bytes_served']
+            report['stages'].append(result)
+            if args.keep:
+                result['workdir'] = workdir
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    with open(args.history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report) + '\n')
+    print_summary(report)
+    return report
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='stormops bench', description="Benchmark the scraper pipeline end to end against a local mock webcamtaxi site")
+    for flag, dest, kind, default, help_text in SITE_OPTIONS:
+        parser.add_argument(flag, dest=dest, type=kind, default=default, help=help_text)
+    parser.add_argument('--embed-mix', default='youtube=0.6,vimeo=0.15,dailymotion=0.1,none=0.15', help='Platform weights, e.g. youtube=0.7,none=0.3')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Stages to run')
+    parser.add_argument('--dump-mb', type=int, nargs='+', default=DEFAULT_DUMP_MB, help='UnParsed dump sizes (MB) for the discover stage')
+    parser.add_argument('--rows', type=int, default=100000, help='Result rows held in memory by the rows stage')
+    parser.add_argument('--worker-counts', type=int, nargs='+', default=[1, 2, 4], help='Worker process counts for the workers stage')
+    parser.add_argument('--initial-delay', type=float, default=None, help='Override the rate controller starting delay (seconds)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON report for this run')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON-lines file every run is appended to')
+    parser.add_argument('--skip-startup', action='store_true', help='Do not measure import time and time-to-first-fetch')
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS, help='Budget for importing stormops.pipeline')
+    parser.add_argument('--first-fetch-budget-ms', type=float, default=FIRST_FETCH_BUDGET_MS, help='Budget for a fresh process to fetch its first page')
+    parser.add_argument('--enforce-budget', action='store_true', help='Exit non-zero when a startup budget is exceeded or a page pattern is superlinear')
+    parser.add_argument('--keep', action='store_true', help='Keep each stage working directory')
+    parser.add_argument('--verbose', action='store_true', help='Show stage output')
+    # Internal: run a single stage in this process
+    parser.add_argument('--stage', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.stage:
+        run_stage(args)
+    else:
+        report = run_benchmark(args)
+        startup = report.get('startup')
+        if args.enforce_budget and startup and not startup['within_budget']:
+            sys.exit(f"Startup budget exceeded: {', '.join(startup['over_budget'])}")
+        superlinear = [entry['pattern'] for stage in report['stages'] if stage['stage'] == 'redos' for entry in stage['superlinear']]
+        if args.enforce_budget and superlinear:
+            sys.exit(f"Superlinear page patterns: {', '.join(sorted(set(superlinear)))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+CHECKPOINT_STATE_FILE = 'checkpoint.json'
+CHECKPOINT_INTERVAL_URLS = 25
+CHECKPOINT_INTERVAL_SECONDS = 60
+PREVIOUS_SUFFIX = '.prev'
+HASH_CHUNK_SIZE = 64 * 1024
+
+# fsync a directory so a rename inside it survives power loss
+def fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+# mkstemp creates its file 0600; give it the mode of the file it will replace, or what a
+# new file gets under the umask, so outputs stay readable by e.g. a static file server
+def inherit_mode(fd, path):
+    if not hasattr(os, 'fchmod'):
+        return
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    os.fchmod(fd, mode)
+
+# Text file wrapper that hashes and sizes everything written through it
+class HashingWriter:
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.bytes_written = 0
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.sha256.update(data)
+        self.bytes_written += len(data)
+        return self.f.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+# Write to a temp file in the target directory, fsync, then rename over the target.
+# Newlines are written untranslated so the recorded hash matches the bytes on disk.
+# The replaced file is kept as <path>.prev (hard link, no copy) so the previous
+# generation stays available if the new one fails validation.
+@contextmanager
+def atomic_write(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        inherit_mode(fd, path)
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            writer = HashingWriter(f)
+            yield writer
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            previous = path + PREVIOUS_SUFFIX
+            try:
+                if os.path.exists(previous):
+                    os.unlink(previous)
+                os.link(path, previous)
+            except OSError as e:
+                logger.debug(f"Could not keep previous generation of {path}: {str(e)}")
+        os.replace(tmp_path, path)
+        fsync_directory(directory)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+# Write bytes to path through a temporary file and a rename. No previous generation is
+# kept: this is for content-hashed assets, which are never rewritten under the same name,
+# and files published straight to clients, such as the shard index.
+def atomic_write_bytes(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        inherit_mode(fd, path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        fsync_directory(directory)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def load_checkpoint_state(state_file=CHECKPOINT_STATE_FILE):
+    if not os.path.exists(state_file):
+        return {'files': {}, 'previous': {}}
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        state.setdefault('files', {})
+        state.setdefault('previous', {})
+        return state
+    except Exception as e:
+        logger.warning(f"Failed to read checkpoint state {state_file}: {str(e)}")
+        return {'files': {}, 'previous': {}}
+
+def _matches(path, entry):
+    if not entry or not os.path.exists(path):
+        return False
+    if os.path.getsize(path) != entry.get('bytes'):
+        return False
+    return file_sha256(path) == entry.get('sha256')
+
+# Return the newest generation of a checkpointed file that matches its recorded hash.
+# Files written before checkpoints existed have no entry and are trusted as-is.
+def validated_path(path, state_file=CHECKPOINT_STATE_FILE):
+    state = load_checkpoint_state(state_file)
+    entry = state['files'].get(path)
+    if entry is None:
+        return path if os.path.exists(path) else None
+    if _matches(path, entry):
+        logger.info(f"Validated checkpoint {path} ({entry.get('rows')} rows, written {entry.get('written')})")
+        return path
+    previous = path + PREVIOUS_SUFFIX
+    if _matches(previous, state['previous'].get(path)):
+        logger.warning(f"Checkpoint {path} failed validation, resuming from {previous}")
+        return previous
+    logger.error(f"No valid checkpoint generation found for {path}")
+    return None
+
+# Atomically write each output and then the state file recording their hashes.
+# writers maps output path -> callable(f) that writes the file and returns its row count.
+# A file that fails is logged and the others are still written; returns the failed paths.
+def write_checkpoint(writers, state_file=CHECKPOINT_STATE_FILE):
+    with registry.stage('persist'):
+        return _write_checkpoint(writers, state_file)
+
+def _write_checkpoint(writers, state_file):
+    state = load_checkpoint_state(state_file)
+    failed = []
+    for path, write_fn in writers.items():
+        try:
+            with atomic_write(path) as f:
+                rows = write_fn(f)
+            if path in state['files']:
+                state['previous'][path] = state['files'][path]
+            state['files'][path] = {
+                'sha256': f.sha256.hexdigest(),
+                'bytes': f.bytes_written,
+                'rows': rows,
+                'written': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            registry.inc('persist_bytes_total', f.bytes_written, labels={'file': os.path.basename(path)})
+        except Exception as e:
+            logger.error(f"Failed to checkpoint {path}: {str(e)}")
+            failed.append(path)
+    with atomic_write(state_file) as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    return failed
+
+# Checkpoint cadence of a long-running loop: due after interval_urls units of work or
+# interval_seconds, whichever comes first. The caller writes the checkpoint (the fetch loop
+# commits the store) and then calls reset().
+class Checkpointer:
+    def __init__(self, interval_urls=CHECKPOINT_INTERVAL_URLS, interval_seconds=CHECKPOINT_INTERVAL_SECONDS):
+        self.interval_urls = interval_urls
+        self.interval_seconds = interval_seconds
+        self.pending = 0
+        self.last_checkpoint = time.monotonic()
+
+    # Note one more unit of work since the last checkpoint
+    def mark(self, count=1):
+        self.pending += count
+
+    def due(self):
+        if self.pending == 0:
+            return False
+        return self.pending >= self.interval_urls or time.monotonic() - self.last_checkpoint >= self.interval_seconds
+
+    # Start a new interval once the checkpoint is written
+    def reset(self):
+        self.pending = 0
+        self.last_checkpoint = time.monotonic()
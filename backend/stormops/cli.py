@@ -0,0 +1,416 @@
+import argparse
+import logging
+import os
+import sys
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# One entry point for every stage. Each command applies its options to config (and the
+# fetcher) and then calls the same pipeline functions, so all of them share one fetcher,
+# one rate controller, one set of embed patterns and one gallery template.
+
+def add_fetch_options(parser):
+    group = parser.add_argument_group('fetching')
+    group.add_argument('--workers', type=int, default=None, help='Fetch worker threads (default 8)')
+    group.add_argument('--delay', type=float, default=None, help='Starting per-host delay between requests in seconds (default 0.5)')
+    group.add_argument('--max-concurrency', type=int, default=None, help='Upper bound on concurrent requests per host')
+    group.add_argument('--retries', type=int, default=None, help='Attempts per URL before it is marked failed (default 5)')
+    group.add_argument('--timeout', type=float, default=None, help='Request timeout in seconds (default 20)')
+    group.add_argument('--cache-dir', default=None, help=f"HTML cache directory (default {config.HTML_CACHE_DIR})")
+    group.add_argument('--no-cache', action='store_true', help='Do not save fetched pages; stop each download at the first embed')
+    group.add_argument('--reuse-cache', action='store_true', help='Scan pages already in the cache instead of downloading them again')
+    group.add_argument('--no-stream', action='store_true', help='Download whole pages before scanning them')
+    group.add_argument('--order', choices=['yield', 'discovery'], default=None,
+                       help='Fetch pending URLs most-likely-embed first or in discovery order (default yield)')
+
+# The fetch options as command-line arguments again, for worker processes
+def fetch_option_argv(args):
+    argv = []
+    for flag in ('workers', 'delay', 'max_concurrency', 'retries', 'timeout', 'cache_dir', 'order'):
+        value = getattr(args, flag)
+        if value is not None:
+            argv += [f"--{flag.replace('_', '-')}", str(value)]
+    for flag in ('no_cache', 'reuse_cache', 'no_stream'):
+        if getattr(args, flag):
+            argv.append(f"--{flag.replace('_', '-')}")
+    return argv
+
+def apply_fetch_options(args):
+    from . import fetcher
+
+    fetcher.configure(args.workers, args.delay, args.max_concurrency, args.retries, args.timeout)
+    if args.cache_dir:
+        config.HTML_CACHE_DIR = args.cache_dir
+    if args.no_cache:
+        config.CACHE_HTML = False
+    if args.reuse_cache:
+        config.REUSE_CACHE = True
+    if args.order:
+        config.FETCH_ORDER = args.order
+    if args.no_stream:
+        config.STREAM_FETCH = False
+
+def add_output_option(parser, default, what):
+    parser.add_argument('-o', '--output', default=default, help=f"{what}; .csv, .json or .ndjson/.jsonl picks the format (default {default})")
+
+# Row count the checkpoint state recorded for path
+def load_checkpoint_rows(path):
+    from .checkpoint import load_checkpoint_state
+
+    return load_checkpoint_state()['files'].get(path, {}).get('rows')
+
+def print_rows_written(count, path):
+    from rich import print as rprint
+
+    rprint(f"[green]Wrote {count} rows to {path}[/green]")
+
+def cmd_discover(args):
+    from rich import print as rprint
+
+    from .frontier import Frontier
+    from .pipeline import discover_file, export_urls, iter_html_files, open_store
+    from .sources import get_source
+
+    config.INPUT_CSV = args.output
+    if args.base_url:
+        config.BASE_URL = args.base_url
+    paths = args.inputs or [config.UNPARSED_DIR if os.path.isdir(config.UNPARSED_DIR) else config.RAW_PAGE_HTML]
+    with open_store() as store:
+        # Links go straight from each file through the frontier into the store; nothing is held per run
+        frontier = Frontier(store)
+        for filepath in iter_html_files(paths):
+            discover_file(filepath, frontier, args.method, get_source(args.source))
+        export_urls(store)
+        print_rows_written(store.url_count(), config.INPUT_CSV)
+        rprint(f"[green]{frontier.duplicates} duplicate links skipped ({frontier.false_positives} Bloom false positives)[/green]")
+
+def print_delta(delta):
+    from rich import print as rprint
+
+    if delta is not None:
+        rprint(f"[green]{delta.counts['new']} new, {delta.counts['changed']} changed and {delta.counts['removed']} removed cameras "
+               f"since the last export in {config.DELTA_FILE}[/green]")
+
+def cmd_fetch(args):
+    from rich import print as rprint
+    from rich.progress import Progress
+
+    from .pipeline import export_results, open_store, process_slave
+    from .records import FAILED
+
+    apply_fetch_options(args)
+    config.INPUT_CSV = args.urls
+    config.OUTPUT_CSV = args.output
+    config.ensure_directories()
+    gallery = os.path.join(config.WEBCAM_DIR, config.GALLERY_FILENAME)
+    with open_store() as store:
+        if store.url_count() == 0:
+            logger.error(f"No URLs in {config.STORE_DB} or {config.INPUT_CSV}; run `discover` first")
+            return 1
+        try:
+            if args.processes > 1:
+                # Worker processes lease URLs from the store and write their results back to it
+                from .leasequeue import spawn_workers
+                from .priority import rank_pending
+
+                # Workers lease highest priority first; rank once up front
+                if config.FETCH_ORDER == 'yield':
+                    rank_pending(store)
+                store.commit()
+                worker_args = fetch_option_argv(args)
+                if args.global_interval is not None:
+                    worker_args += ['--global-interval', str(args.global_interval)]
+                failed_workers = sum(1 for code in spawn_workers(args.processes, store.path, worker_args, args.log_file) if code)
+                if failed_workers:
+                    logger.error(f"{failed_workers} of {args.processes} workers exited with an error")
+                rprint(f"[green]{store.result_count()} URLs processed by {args.processes} workers, {store.pending_count()} still pending[/green]")
+            else:
+                with Progress() as progress:
+                    task = progress.add_task("[cyan]Fetching...", total=1)
+                    valid, skipped, failed = process_slave(store, progress, task, refresh=args.refresh)
+                rprint(f"[green]{valid} embeds found, {skipped} pages without embeds, {failed} failed fetches[/green]")
+            retrying = store.status_counts().get(FAILED, 0)
+            if retrying:
+                rprint(f"[yellow]{retrying} URLs on the retry queue for the next run[/yellow]")
+        finally:
+            delta = export_results(store, gallery)
+    rprint(f"[green]Results in {config.OUTPUT_CSV}[/green]")
+    print_delta(delta)
+
+def cmd_worker(args):
+    from . import fetcher
+    from .leasequeue import GlobalHostLimiter, run_worker
+    from .store import PipelineStore
+
+    apply_fetch_options(args)
+    config.ensure_directories([config.HTML_CACHE_DIR])
+    fetcher.HOST_LIMITER = GlobalHostLimiter(config.STORE_DB, args.global_interval)
+    # The store is shared with other workers; never seed it from CSVs here
+    with PipelineStore() as store:
+        run_worker(store, args.id, args.batch, args.lease_seconds)
+
+def cmd_crawl(args):
+    from rich import print as rprint
+    from rich.progress import Progress
+
+    from . import fetcher
+    from .crawler import LinkCrawler, crawl_sources
+    from .frontier import Frontier
+    from .pipeline import export_results, export_urls, open_store, process_slave
+    from .sources import get_source
+
+    sources = [get_source(name) for name in args.source or config.SOURCES]
+    if args.root and len(sources) > 1:
+        logger.error("--root needs a single --source")
+        return 1
+    apply_fetch_options(args)
+    for source in sources:
+        source.apply_rate_limits(fetcher.rate_controller)
+    config.INPUT_CSV = args.urls
+    config.OUTPUT_CSV = args.output
+    config.ensure_directories()
+    gallery = os.path.join(config.WEBCAM_DIR, config.GALLERY_FILENAME)
+    totals = [0, 0, 0]
+    delta = None
+    with open_store() as store:
+        obey_robots = False if args.ignore_robots else None
+        crawlers = [LinkCrawler(source, args.root, args.max_depth, args.max_pages, args.crawl_delay, obey_robots) for source in sources]
+        frontier = Frontier(store)
+        # Several sources crawl side by side; all of them feed the same fetch workers
+        cameras = crawl_sources(crawlers, frontier) if len(crawlers) > 1 else crawlers[0].iter_cameras(frontier)
+        try:
+            if args.no_fetch:
+                for _ in cameras:
+                    pass
+            else:
+                with Progress() as progress:
+                    task = progress.add_task("[cyan]Crawling...", total=2)
+                    # New cameras are fetched while the crawl continues; then anything
+                    # already in the store without a result
+                    for rows in (cameras, None):
+                        totals = [a + b for a, b in zip(totals, process_slave(store, progress, task, rows))]
+        finally:
+            export_urls(store)
+            if not args.no_fetch:
+                delta = export_results(store, gallery)
+    for crawler in crawlers:
+        stats = crawler.stats()
+        rprint(f"[green]{crawler.source.name}: crawled {stats['pages']} pages ({stats['failed_pages']} failed, "
+               f"{stats['disallowed']} disallowed by robots.txt), {stats['new_cameras']} new cameras in {config.INPUT_CSV}[/green]")
+    if not args.no_fetch:
+        rprint(f"[green]{totals[0]} embeds found, {totals[1]} pages without embeds, {totals[2]} failed; results in {config.OUTPUT_CSV}[/green]")
+        print_delta(delta)
+
+def cmd_extract(args):
+    from .checkpoint import write_checkpoint
+    from .pipeline import iter_extract_files, table_writer
+
+    rows = iter_extract_files(args.inputs or [config.UNPARSED_DIR])
+    write_checkpoint({args.output: table_writer(args.output, rows, config.RESULT_COLUMNS)})
+    print_rows_written(load_checkpoint_rows(args.output), args.output)
+
+def cmd_replay(args):
+    from .checkpoint import write_checkpoint
+    from .pipeline import iter_replayed, open_store, table_writer
+
+    if args.cache_dir:
+        config.HTML_CACHE_DIR = args.cache_dir
+    config.INPUT_CSV = args.urls
+    with open_store() as store:
+        rows = iter_replayed(store.iter_urls())
+        write_checkpoint({args.output: table_writer(args.output, rows, config.RESULT_COLUMNS)})
+    print_rows_written(load_checkpoint_rows(args.output), args.output)
+
+def cmd_render(args):
+    from rich import print as rprint
+
+    from .checkpoint import validated_path
+    from .html_verify import verify_html_files
+    from .pipeline import iter_checkpointed_table, save_batch_pages, save_webcams_html, webcams_from_results
+
+    if args.directory:
+        config.WEBCAM_DIR = args.directory
+    config.ensure_directories([config.WEBCAM_DIR])
+    if validated_path(args.input) is None:
+        logger.error(f"No results table at {args.input}")
+        return 1
+    save_webcams_html(webcams_from_results(iter_checkpointed_table(args.input)), os.path.join(config.WEBCAM_DIR, config.GALLERY_FILENAME))
+    if args.batch_size:
+        save_batch_pages(webcams_from_results(iter_checkpointed_table(args.input)), args.batch_size)
+    for result in verify_html_files(config.WEBCAM_DIR):
+        rprint(f"[green]{result['File']}: {result['Embed Count']} embeds[/green]")
+
+def cmd_manifest(args):
+    from rich import print as rprint
+
+    from .checkpoint import validated_path
+    from .pipeline import iter_checkpointed_table, webcams_from_results
+    from .shards import shard_directory, write_shards
+
+    if args.directory:
+        config.WEBCAM_DIR = args.directory
+    if validated_path(args.input) is None:
+        logger.error(f"No results table at {args.input}")
+        return 1
+    index = write_shards(webcams_from_results(iter_checkpointed_table(args.input)), shard_format=args.format, depth=args.depth)
+    for region, entry in index['regions'].items():
+        rprint(f"[green]{region}: {entry['count']} cameras, {entry['bytes']} bytes ({entry.get('gz', entry['bytes'])} gzipped) -> {entry['file']}[/green]")
+    rprint(f"[green]Wrote {len(index['regions'])} shards, indexed in {shard_directory()}[/green]")
+
+def cmd_serve(args):
+    from .events import StoreWatcher
+    from .server import make_server
+
+    if args.thumbnail_origin:
+        config.THUMBNAIL_ORIGIN = args.thumbnail_origin
+    if args.thumbnail_cache_mb is not None:
+        config.THUMBNAIL_CACHE_BYTES = args.thumbnail_cache_mb * 1024 * 1024
+    server = make_server(args.port, args.host, args.directory)
+    # Runs in other processes write to the store; turn their results into live events
+    watcher = StoreWatcher(config.STORE_DB).start() if not args.no_watch and os.path.exists(config.STORE_DB) else None
+    logger.info(f"Serving {args.directory or config.WEBCAM_DIR} on http://{args.host}:{server.server_address[1]}/ (metrics at /metrics, live camera feed at /events, thumbnails at /thumbnails/)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        server.server_close()
+
+def cmd_run(args):
+    from .pipeline import main
+
+    apply_fetch_options(args)
+    if args.parse_workers is not None:
+        config.PARSE_WORKERS = args.parse_workers
+    if args.parse_timeout is not None:
+        config.PARSE_TIMEOUT_SECONDS = args.parse_timeout
+    if args.parse_memory_mb is not None:
+        config.PARSE_WORKER_MEMORY_MB = args.parse_memory_mb
+    main()
+
+def build_parser():
+    from .sources import SOURCES
+
+    parser = argparse.ArgumentParser(prog='stormops', description="Discover, fetch and render webcamtaxi camera embeds")
+    parser.add_argument('--log-file', default=None, help=f"Log file (default {config.LOG_FILE})")
+    parser.add_argument('--store', default=None, help=f"SQLite store for URLs and results (default {config.STORE_DB})")
+    parser.add_argument('--metrics-port', type=int, default=None, help='Serve Prometheus metrics on this port while the command runs')
+    parser.add_argument('--serve-port', type=int, default=None, help='Serve the gallery and its live camera feed (/events) on this port while the command runs')
+    parser.add_argument('--metrics-snapshot', default=None, help=f"Write a JSON metrics snapshot to this file every {config.METRICS_SNAPSHOT_SECONDS}s (off by default)")
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], default=None, help='Profile the command')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    discover = commands.add_parser('discover', help='Find camera URLs in saved directory pages')
+    discover.add_argument('inputs', nargs='*', help=f"HTML files or directories (default {config.UNPARSED_DIR}/ or {config.RAW_PAGE_HTML})")
+    discover.add_argument('--method', choices=['master', 'extract', 'both'], default='both', help='Link patterns to use')
+    discover.add_argument('--base-url', default=None, help=f"Prefix for relative links (default {config.BASE_URL})")
+    discover.add_argument('--source', choices=sorted(SOURCES), default='webcamtaxi', help='Source adapter the saved pages come from')
+    add_output_option(discover, config.INPUT_CSV, 'URL table, merged with any existing one')
+    discover.set_defaults(func=cmd_discover)
+
+    fetch = commands.add_parser('fetch', help='Fetch camera pages and extract their embeds')
+    fetch.add_argument('--urls', default=config.INPUT_CSV, help=f"URL table to fetch (default {config.INPUT_CSV})")
+    add_output_option(fetch, config.OUTPUT_CSV, 'Results table, resumed from its last checkpoint')
+    fetch.add_argument('--processes', type=int, default=1, help='Fetch in this many worker processes sharing the store')
+    fetch.add_argument('--global-interval', type=float, default=None, help='Minimum seconds between requests to a host across all worker processes')
+    fetch.add_argument('--refresh', action='store_true', help='Also refetch results past their TTL (a week with an embed, 90 days without); single process only')
+    add_fetch_options(fetch)
+    fetch.set_defaults(func=cmd_fetch)
+
+    worker = commands.add_parser('worker', help='Fetch worker leasing URLs from a shared store; run several, on any host that can open it')
+    worker.add_argument('--id', default=None, help='Worker name in the lease table (default host-pid)')
+    worker.add_argument('--batch', type=int, default=None, help='URLs leased at a time (default 16)')
+    worker.add_argument('--lease-seconds', type=float, default=None, help='Seconds before an unfinished lease is handed to another worker (default 120)')
+    worker.add_argument('--global-interval', type=float, default=None, help='Minimum seconds between requests to a host across all workers (default 0.1)')
+    add_fetch_options(worker)
+    worker.set_defaults(func=cmd_worker)
+
+    crawl = commands.add_parser('crawl', help='Crawl the site from its root for camera URLs, fetching them as they are found')
+    crawl.add_argument('--source', action='append', choices=sorted(SOURCES), default=None, help=f"Source adapter to crawl; repeat for several (default {', '.join(config.SOURCES)})")
+    crawl.add_argument('--root', default=None, help="Page to start from, with a single source (default the source's root)")
+    crawl.add_argument('--max-depth', type=int, default=None, help=f"Directory levels to follow below the root (default {config.CRAWL_MAX_DEPTH})")
+    crawl.add_argument('--max-pages', type=int, default=None, help=f"Directory pages to fetch at most (default {config.CRAWL_MAX_PAGES})")
+    crawl.add_argument('--crawl-delay', type=float, default=None, help=f"Seconds between directory page fetches (default {config.CRAWL_DELAY_SECONDS})")
+    crawl.add_argument('--ignore-robots', action='store_true', help='Do not read robots.txt')
+    crawl.add_argument('--no-fetch', action='store_true', help='Only discover camera URLs')
+    crawl.add_argument('--urls', default=config.INPUT_CSV, help=f"URL table, merged with any existing one (default {config.INPUT_CSV})")
+    add_output_option(crawl, config.OUTPUT_CSV, 'Results table')
+    add_fetch_options(crawl)
+    crawl.set_defaults(func=cmd_crawl)
+
+    extract = commands.add_parser('extract', help='Extract embeds from saved pages without fetching')
+    extract.add_argument('inputs', nargs='*', help=f"HTML files or directories (default {config.UNPARSED_DIR}/)")
+    add_output_option(extract, 'extracted_embeds.csv', 'Results table')
+    extract.set_defaults(func=cmd_extract)
+
+    replay = commands.add_parser('replay', help='Rebuild results from the HTML cache without fetching')
+    replay.add_argument('--urls', default=config.INPUT_CSV, help=f"URL table (default {config.INPUT_CSV})")
+    replay.add_argument('--cache-dir', default=None, help=f"HTML cache directory (default {config.HTML_CACHE_DIR})")
+    add_output_option(replay, config.OUTPUT_CSV, 'Results table')
+    replay.set_defaults(func=cmd_replay)
+
+    render = commands.add_parser('render', help='Write gallery pages from a results table')
+    render.add_argument('--input', default=config.OUTPUT_CSV, help=f"Results table (default {config.OUTPUT_CSV})")
+    render.add_argument('--directory', default=None, help=f"Gallery directory (default {config.WEBCAM_DIR})")
+    render.add_argument('--batch-size', type=int, default=0, help='Also split the gallery into webcams_N.html pages of this many cameras, rewriting only pages that changed')
+    render.set_defaults(func=cmd_render)
+
+    manifest = commands.add_parser('manifest', help='Write compact camera manifests for the frontend, one content-hashed shard per region')
+    manifest.add_argument('--input', default=config.OUTPUT_CSV, help=f"Results table (default {config.OUTPUT_CSV})")
+    manifest.add_argument('--directory', default=None, help=f"Gallery directory; shards go in its cameras/ (default {config.WEBCAM_DIR})")
+    manifest.add_argument('--format', choices=['json', 'msgpack'], default='json', help='Shard encoding; msgpack needs the msgpack package (default json)')
+    manifest.add_argument('--depth', type=int, default=None, help=f"URL segments after /en/ per shard: 1 by country, 2 by region (default {config.MANIFEST_SHARD_DEPTH})")
+    manifest.set_defaults(func=cmd_manifest)
+
+    serve = commands.add_parser('serve', help='Serve the gallery directory and metrics over HTTP')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--directory', default=None, help=f"Directory to serve (default {config.WEBCAM_DIR})")
+    serve.add_argument('--no-watch', action='store_true', help='Do not turn new results in the store into live camera events')
+    serve.add_argument('--thumbnail-origin', default=None, help=f"Host YouTube posters are fetched from for /thumbnails/ (default {config.THUMBNAIL_ORIGIN})")
+    serve.add_argument('--thumbnail-cache-mb', type=int, default=None,
+                       help=f"Size cap of the thumbnail disk cache in {config.THUMBNAIL_CACHE_DIR}/ (default {config.THUMBNAIL_CACHE_BYTES // 1048576})")
+    serve.set_defaults(func=cmd_serve)
+
+    run = commands.add_parser('run', help=f"Full pipeline over {config.UNPARSED_DIR}/ or {config.RAW_PAGE_HTML}: discover, fetch and render")
+    add_fetch_options(run)
+    parsing = run.add_argument_group('parsing')
+    parsing.add_argument('--parse-workers', type=int, default=None,
+                         help=f"Worker processes parsing saved pages, 0 to parse in-process (default {config.PARSE_WORKERS})")
+    parsing.add_argument('--parse-timeout', type=float, default=None,
+                         help=f"Seconds a page may take before its worker is killed, plus {config.PARSE_TIMEOUT_SECONDS_PER_MB:g}/MB (default {config.PARSE_TIMEOUT_SECONDS:g})")
+    parsing.add_argument('--parse-memory-mb', type=int, default=None,
+                         help=f"Memory a parse worker may allocate, 0 for no limit (default {config.PARSE_WORKER_MEMORY_MB})")
+    run.set_defaults(func=cmd_run)
+
+    # Listed for --help only; main() hands `bench ...` to stormops.bench's own parser
+    commands.add_parser('bench', help='Benchmark the pipeline against a local mock site (see bench --help)', add_help=False)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ['bench']:
+        from . import bench
+
+        bench.main(argv[1:])
+        return 0
+    args = build_parser().parse_args(argv)
+
+    from .log import setup_logging
+    from .pipeline import run
+
+    setup_logging(args.log_file)
+    if args.store:
+        config.STORE_DB = args.store
+    if args.command == 'serve':
+        return args.func(args)
+    status = []
+    run(args.metrics_port, args.metrics_snapshot, args.profile, target=lambda: status.append(args.func(args)), serve_port=args.serve_port)
+    return status[0] if status else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import logging
+import os
+
+# --- Configuration Constants ---
+# Read at call time (config.NAME), so entry points and the benchmark can override them.
+BASE_URL = 'https://www.webcamtaxi.com'
+INPUT_CSV = 'omni_eye_df.csv'
+OUTPUT_CSV = 'video_embeds.csv'
+HTML_CACHE_DIR = 'html_cache'
+WEBCAM_DIR = 'webcam_directory'
+UNPARSED_DIR = 'UnParsed'
+RAW_PAGE_HTML = 'raw_page_html.html'
+LOG_FILE = 'scraper.log'
+MAX_LOG_LINES_DISPLAY = 70
+MIN_VIDEOS_PER_HTML = 10
+URL_COLUMNS = ['URL', 'Name']
+RESULT_COLUMNS = ['URL', 'Name', 'Embed_Code', 'Status']
+# Scan pages as they download; with CACHE_HTML off the connection closes at the first embed
+STREAM_FETCH = True
+CACHE_HTML = True
+# Scan pages already in HTML_CACHE_DIR instead of downloading them again
+REUSE_CACHE = False
+GALLERY_FILENAME = 'all_webcams.html'
+# Pattern matching time a saved page gets (seconds, plus so much per MB) before it is
+# quarantined in QUARANTINE_FILE and skipped by later runs
+MATCH_BUDGET_SECONDS = 2.0
+MATCH_BUDGET_SECONDS_PER_MB = 1.0
+QUARANTINE_FILE = 'quarantine.ndjson'
+# Saved directory pages are parsed in this many worker processes (0 parses them in the run's
+# own process). A page gets PARSE_TIMEOUT_SECONDS plus so much per MB of wall clock, a worker
+# PARSE_WORKER_MEMORY_MB beyond what it starts with, and workers are replaced after
+# PARSE_TASKS_PER_WORKER pages.
+PARSE_WORKERS = 2
+PARSE_TIMEOUT_SECONDS = 30.0
+PARSE_TIMEOUT_SECONDS_PER_MB = 5.0
+PARSE_WORKER_MEMORY_MB = 1024
+PARSE_TASKS_PER_WORKER = 50
+# Cameras new, changed or removed since the previous export, written next to the results
+# table on every export (.csv, .json or .ndjson; empty to skip)
+DELTA_FILE = 'video_embeds.delta.ndjson'
+# SQLite store holding the URL table and results while a run is in progress
+STORE_DB = 'stormops.db'
+# URL canonicalization at discovery: query parameters worth keeping (all others are
+# dropped) and whether links differing only in path case are duplicates (the URL fetched
+# keeps its case either way)
+CANONICAL_QUERY_PARAMS = ('start',)  # directory pagination
+CANONICAL_LOWERCASE_PATH = True
+# Bloom filter sizing for the discovery frontier. Past this many URLs more lookups fall
+# through to the store, but duplicate detection stays exact
+FRONTIER_EXPECTED_URLS = 1_000_000
+FRONTIER_ERROR_RATE = 0.001
+# Link-graph crawl from the site root: directory levels followed below the root, pages
+# fetched per crawl, seconds between the crawler's own page fetches, and robots.txt
+CRAWL_MAX_DEPTH = 3
+CRAWL_MAX_PAGES = 500
+CRAWL_DELAY_SECONDS = 1.0
+CRAWL_OBEY_ROBOTS = True
+# Seconds until a result is due to be fetched again (by fetch --refresh): pages with an
+# embed are re-checked weekly, pages without one rarely gain one and wait a quarter
+RESULT_TTL_SECONDS = {'success': 7 * 86400, 'no_embed': 90 * 86400}
+# Failed fetches go on the store's retry queue, due again after this many seconds,
+# doubling with each further failure up to the cap
+RETRY_BACKOFF_SECONDS = 30
+RETRY_MAX_BACKOFF_SECONDS = 86400
+# Order pending URLs are fetched in: 'yield' (most likely to have an embed first, see
+# stormops.priority) or 'discovery'
+FETCH_ORDER = 'yield'
+# URL segments after /en/ that key a camera manifest shard: 1 shards by country, 2 by
+# country and region (see stormops.shards)
+MANIFEST_SHARD_DEPTH = 2
+# Poster thumbnails served by `serve` (see stormops.thumbnails): where posters are fetched
+# from, and the disk cache they are kept in, least recently used evicted past the cap
+THUMBNAIL_ORIGIN = 'https://i.ytimg.com'
+THUMBNAIL_CACHE_DIR = 'thumbnail_cache'
+THUMBNAIL_CACHE_BYTES = 256 * 1024 * 1024
+# Source adapters (stormops.sources) crawled by default
+SOURCES = ['webcamtaxi']
+METRICS_PORT = None
+# JSON metrics snapshot written every METRICS_SNAPSHOT_SECONDS, off unless a file is named
+# (--metrics-snapshot)
+METRICS_SNAPSHOT_FILE = None
+METRICS_SNAPSHOT_SECONDS = 30
+PROFILE_MODE = None
+
+# Video platform patterns; attributes never cross a '<' or '>' and every span is bounded,
+# so matching stays linear in the page size however malformed it is
+VIDEO_PATTERNS = [
+    r'<iframe\s[^<>]{0,512}src="https?://www\.youtube\.com/embed/[^"<>]{1,512}"[^<>]{0,512}></iframe>',  # YouTube
+    r'<iframe\s[^<>]{0,512}src="https?://player\.vimeo\.com/video/[^"<>]{1,512}"[^<>]{0,512}></iframe>',  # Vimeo
+    r'<iframe\s[^<>]{0,512}src="https?://www\.dailymotion\.com/embed/video/[^"<>]{1,512}"[^<>]{0,512}></iframe>',  # Dailymotion
+]
+
+logger = logging.getLogger(__name__)
+
+# Create the working directories; called by entry points, never at import
+def ensure_directories(directories=None):
+    for directory in directories or [HTML_CACHE_DIR, WEBCAM_DIR, UNPARSED_DIR]:
+        if not os.path.exists(directory):
+            logger.debug(f"Creating directory: {directory}")
+            os.makedirs(directory)
+            logger.info(f"Created directory: {directory}")
@@ -0,0 +1,192 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from . import config
+from .fetcher import fetch_html
+from .pipeline import A_TAG_PATTERN, HREF_PATTERN, TITLE_PATTERN
+from .records import CameraRow
+from .sources import CAMERA, DIRECTORY, OTHER, WEBCAMTAXI, name_from_path
+from .urlcanon import canonicalize_url, url_key
+
+logger = logging.getLogger(__name__)
+
+# Parsed directory pages waiting for the frontier when several sources crawl at once
+CRAWL_QUEUE_PAGES = 64
+
+# (href, title or None) for every <a> tag with an href
+def iter_links(html):
+    for match in A_TAG_PATTERN.finditer(html):
+        tag = match.group(0)
+        href_match = HREF_PATTERN.search(tag)
+        if href_match:
+            title_match = TITLE_PATTERN.search(tag)
+            yield href_match.group(1), title_match.group(1) if title_match else None
+
+# Breadth-first crawl of one source's link graph from its root. The source classifies
+# links: directory and pagination pages are followed down to max_depth levels (the root is
+# depth 0) and camera links go through the frontier into the store. iter_cameras() yields
+# each new camera as its directory page is parsed so the fetch stage can start on it while
+# the crawl goes on. Politeness: only the root's host is crawled, robots.txt is obeyed
+# (including Crawl-delay), the crawler's own page fetches are spaced by delay seconds (the
+# source's crawl_delay by default) on top of the rate controller, and at most max_pages
+# pages are fetched. fetch(url) -> html defaults to the shared fetcher.
+class LinkCrawler:
+    def __init__(self, source=None, root=None, max_depth=None, max_pages=None, delay=None, obey_robots=None, fetch=None):
+        self.source = source or WEBCAMTAXI
+        self.root = canonicalize_url(root or self.source.root)
+        self.host = urlsplit(self.root).netloc
+        self.base_url = f"{urlsplit(self.root).scheme}://{self.host}"
+        self.max_depth = config.CRAWL_MAX_DEPTH if max_depth is None else max_depth
+        self.max_pages = config.CRAWL_MAX_PAGES if max_pages is None else max_pages
+        if delay is None:
+            delay = config.CRAWL_DELAY_SECONDS if self.source.crawl_delay is None else self.source.crawl_delay
+        self.delay = delay
+        self.obey_robots = config.CRAWL_OBEY_ROBOTS if obey_robots is None else obey_robots
+        self.fetch = fetch or fetch_html
+        self.robots = None
+        self.last_fetch = None
+        self.pages = 0
+        self.failed = 0
+        self.disallowed = 0
+        self.cameras = 0
+        self.links = {CAMERA: 0, DIRECTORY: 0, OTHER: 0}
+
+    # robots.txt for the root's host; a missing or unreadable one allows everything
+    def _load_robots(self):
+        from urllib.robotparser import RobotFileParser
+
+        self.robots = RobotFileParser(f"{self.base_url}/robots.txt")
+        try:
+            self.robots.parse(self.fetch(self.robots.url).splitlines())
+        except Exception as e:
+            logger.info(f"No usable robots.txt at {self.robots.url} ({str(e)}), crawling without it")
+            self.robots.parse([])
+            return
+        crawl_delay = self.robots.crawl_delay('*')
+        if crawl_delay is not None and float(crawl_delay) > self.delay:
+            logger.info(f"Using robots.txt Crawl-delay of {crawl_delay}s for {self.host}")
+            self.delay = float(crawl_delay)
+
+    def allowed(self, url):
+        if not self.obey_robots:
+            return True
+        if self.robots is None:
+            self._load_robots()
+        return self.robots.can_fetch('*', url)
+
+    def _wait_turn(self):
+        if self.last_fetch is not None:
+            remaining = self.last_fetch + self.delay - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        self.last_fetch = time.monotonic()
+
+    # Fetch one directory page; returns (camera rows, directory URLs) found on it
+    def _crawl_page(self, url):
+        try:
+            html = self.fetch(url)
+        except Exception as e:
+            logger.warning(f"Failed to crawl {url}: {str(e)}")
+            self.failed += 1
+            return [], []
+        self.pages += 1
+        cameras = []
+        directories = []
+        for href, title in iter_links(html):
+            link = canonicalize_url(href, self.base_url)
+            kind = self.source.classify(url_key(link)) if urlsplit(link).netloc == self.host else OTHER
+            self.links[kind] += 1
+            if kind == CAMERA:
+                cameras.append(CameraRow(link, title or name_from_path(link)))
+            elif kind == DIRECTORY:
+                directories.append(link)
+        return cameras, directories
+
+    # Camera rows found on each crawled page, in breadth-first order; touches neither the
+    # frontier nor the store, so it can run on its own thread
+    def iter_pages(self):
+        pending = deque([(self.root, 0)])
+        queued = {url_key(self.root)}
+        while pending and self.pages + self.failed < self.max_pages:
+            url, depth = pending.popleft()
+            if not self.allowed(url):
+                logger.debug(f"robots.txt disallows {url}")
+                self.disallowed += 1
+                continue
+            self._wait_turn()
+            cameras, directories = self._crawl_page(url)
+            if depth < self.max_depth:
+                for link in directories:
+                    if url_key(link) not in queued:
+                        queued.add(url_key(link))
+                        pending.append((link, depth + 1))
+            logger.info(f"Crawled {url} (depth {depth}): {len(cameras)} camera links, {len(pending)} pages queued")
+            yield cameras
+        if pending:
+            logger.warning(f"Stopped crawling {self.host} after {self.max_pages} pages with {len(pending)} still queued")
+
+    # New cameras, added to the store through the frontier page by page
+    def iter_cameras(self, frontier):
+        for cameras in self.iter_pages():
+            yield from self._admit(frontier, cameras)
+
+    def _admit(self, frontier, cameras):
+        new = frontier.new_rows(cameras)
+        frontier.commit()
+        self.cameras += len(new)
+        return new
+
+    def stats(self):
+        return {
+            'pages': self.pages,
+            'failed_pages': self.failed,
+            'disallowed': self.disallowed,
+            'new_cameras': self.cameras,
+            'camera_links': self.links[CAMERA],
+            'directory_links': self.links[DIRECTORY],
+            'other_links': self.links[OTHER],
+        }
+
+# Crawl several sources at once: each crawler fetches and parses its pages on its own
+# thread, and the calling thread (which owns the store) passes what they find through the
+# shared frontier, yielding new cameras from all sites as one stream for the fetch stage.
+def crawl_sources(crawlers, frontier):
+    pages = queue.Queue(maxsize=CRAWL_QUEUE_PAGES)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def run(crawler):
+        try:
+            for cameras in crawler.iter_pages():
+                if stop.is_set():
+                    return
+                put((crawler, cameras))
+        except Exception:
+            logger.exception(f"Crawler for {crawler.source.name} stopped")
+        finally:
+            put((crawler, None))
+
+    threads = [threading.Thread(target=run, args=(crawler,), name=f"crawl-{crawler.source.name}", daemon=True) for crawler in crawlers]
+    for thread in threads:
+        thread.start()
+    running = len(threads)
+    try:
+        while running:
+            crawler, cameras = pages.get()
+            if cameras is None:
+                running -= 1
+                continue
+            yield from crawler._admit(frontier, cameras)
+    finally:
+        stop.set()
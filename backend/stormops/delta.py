@@ -0,0 +1,43 @@
+import logging
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+DELTA_COLUMNS = ['Change', 'URL', 'Name', 'Embed_Code']
+
+# Change kinds: a camera that was not in the last export, one whose name or embed changed,
+# and one that is gone (or lost its embed)
+NEW = 'new'
+CHANGED = 'changed'
+REMOVED = 'removed'
+
+# What changed in the camera catalogue since the last export. The store keeps a digest of
+# every exported camera (the exported table); rows() streams the cameras whose digest is
+# new or different, then the ones that disappeared, so a downstream job reads only the
+# changes instead of diffing the whole results table. The delta is written in the same
+# checkpoint as the results table, and commit() then moves the snapshot on, so a failed
+# export leaves the changes for the next one. Each export's delta replaces the last one.
+class RunDelta:
+    def __init__(self, store):
+        self.store = store
+        self.changes = []
+        self.counts = {NEW: 0, CHANGED: 0, REMOVED: 0}
+
+    def rows(self):
+        for url, name, embed_code, digest, new in self.store.iter_changed_webcams():
+            change = NEW if new else CHANGED
+            self.changes.append((url, digest))
+            self.counts[change] += 1
+            yield {'Change': change, 'URL': url, 'Name': name, 'Embed_Code': embed_code}
+        for url in self.store.iter_removed_webcams():
+            self.changes.append((url, None))
+            self.counts[REMOVED] += 1
+            yield {'Change': REMOVED, 'URL': url}
+
+    def commit(self):
+        self.store.apply_exported(self.changes)
+        for change, count in self.counts.items():
+            registry.inc('delta_rows_total', count, labels={'change': change})
+        logger.info(f"Delta since the last export: {self.counts[NEW]} new, {self.counts[CHANGED]} changed, {self.counts[REMOVED]} removed")
@@ -0,0 +1,194 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Recent events kept for clients resuming with Last-Event-ID
+EVENT_HISTORY = 10000
+# Live events a client may fall behind by before it is cut off; it reconnects with
+# Last-Event-ID and catches up from the history
+SUBSCRIBER_BUFFER = 256
+# Seconds between checks of the store when serving from another process's run
+STORE_WATCH_SECONDS = 1.0
+# Results are read back this far before the newest one seen: writers commit in batches
+# (process_slave on the checkpoint cadence), so a row can become visible after later ones
+STORE_WATCH_LAG_SECONDS = 90
+
+# Event kinds: a camera got an embed, its name or embed changed, it lost its embed. reset
+# tells a client its Last-Event-ID is older than the history (or from an earlier server)
+# and it should reload the gallery page.
+ADD = 'add'
+UPDATE = 'update'
+REMOVE = 'remove'
+RESET = 'reset'
+
+class Event:
+    __slots__ = ('id', 'kind', 'data')
+
+    def __init__(self, id, kind, data):
+        self.id = id
+        self.kind = kind
+        self.data = data
+
+    # Server-Sent Events wire format
+    def sse(self):
+        head = f"id: {self.id}\n" if self.id is not None else ''
+        return f"{head}event: {self.kind}\ndata: {json.dumps(self.data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+# One client's queue of events not yet sent. Live events beyond limit cut it off (overflowed)
+# rather than grow without bound or hold up the publisher.
+class Subscription:
+    def __init__(self, limit):
+        self.limit = limit
+        self.events = deque()
+        self.overflowed = False
+        self.condition = threading.Condition()
+
+    def put(self, event, replay=False):
+        with self.condition:
+            if self.overflowed:
+                return
+            if not replay and len(self.events) >= self.limit:
+                self.overflowed = True
+                registry.inc('event_overflows_total')
+            else:
+                self.events.append(event)
+            self.condition.notify()
+
+    # Events queued so far, waiting up to timeout for the first; empty on timeout
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.events and not self.overflowed:
+                self.condition.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+            return events
+
+# In-process publish/subscribe for camera changes. Event IDs count up from the start time
+# in milliseconds, so an ID from before a restart is recognisably stale instead of being
+# mistaken for a recent one.
+class EventBus:
+    def __init__(self, history=EVENT_HISTORY, buffer=SUBSCRIBER_BUFFER):
+        self.lock = threading.Lock()
+        self.history = deque(maxlen=history)
+        self.buffer = buffer
+        self.first_id = self.next_id = int(time.time() * 1000)
+        self.subscribers = set()
+
+    def publish(self, kind, data):
+        with self.lock:
+            event = Event(self.next_id, kind, data)
+            self.next_id += 1
+            self.history.append(event)
+            for subscription in self.subscribers:
+                subscription.put(event)
+        registry.inc('events_published_total', labels={'kind': kind})
+        return event
+
+    # New subscription; with last_event_id, first replays every event after it, or a reset
+    # event if those are no longer all in the history
+    def subscribe(self, last_event_id=None):
+        subscription = Subscription(self.buffer)
+        with self.lock:
+            if last_event_id is not None:
+                oldest = self.history[0].id if self.history else self.next_id
+                if self.first_id <= last_event_id < self.next_id and last_event_id >= oldest - 1:
+                    for event in self.history:
+                        if event.id > last_event_id:
+                            subscription.put(event, replay=True)
+                else:
+                    subscription.put(Event(None, RESET, {'last_event_id': last_event_id}), replay=True)
+            self.subscribers.add(subscription)
+            registry.set_gauge('event_subscribers', len(self.subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+            registry.set_gauge('event_subscribers', len(self.subscribers))
+
+# The process-wide bus the fetch stage publishes to and `serve` streams from
+bus = EventBus()
+
+# The event a new result makes, if any, given the camera's previous result (an EmbedResult
+# or None). A failed fetch makes none: the camera keeps its last embed.
+def camera_change(previous, url, name, embed_code):
+    had_embed = previous is not None and previous.embed_code
+    if embed_code:
+        data = {'url': url, 'name': name, 'embed_code': embed_code}
+        if not had_embed:
+            return ADD, data
+        if previous.embed_code != embed_code or previous.name != name:
+            return UPDATE, data
+        return None
+    return (REMOVE, {'url': url}) if had_embed else None
+
+def publish_change(previous, url, name, embed_code, event_bus=None):
+    change = camera_change(previous, url, name, embed_code)
+    if change is not None:
+        (event_bus or bus).publish(*change)
+
+# Publishes changes other processes write to the store (fetch workers, a separate `fetch`
+# run) by polling results checked since the last poll and diffing them against the
+# cameras it has seen. Only a digest of each camera is kept in memory.
+class StoreWatcher:
+    def __init__(self, path, event_bus=None, interval=None):
+        self.path = path
+        self.bus = event_bus or bus
+        self.interval = STORE_WATCH_SECONDS if interval is None else interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.cameras = {}
+        self.checked_at = 0
+
+    def _load(self, store):
+        for row in store.iter_webcams():
+            self.cameras[row.url] = hash((row.name, row.embed_code))
+        self.checked_at = store.conn.execute('SELECT MAX(checked_at) FROM results').fetchone()[0] or 0
+
+    # Publish what changed since the last poll. Rows within the lag are read again and are
+    # no-ops when already seen.
+    def poll(self, store):
+        rows = store.conn.execute(
+            "SELECT url, name, embed_code, checked_at FROM results WHERE checked_at >= ? AND status != 'failed' ORDER BY checked_at",
+            (self.checked_at - STORE_WATCH_LAG_SECONDS,)
+        ).fetchall()
+        for url, name, embed_code, checked_at in rows:
+            self.checked_at = max(self.checked_at, checked_at)
+            seen = self.cameras.get(url)
+            if embed_code:
+                digest = hash((name, embed_code))
+                if seen != digest:
+                    self.cameras[url] = digest
+                    self.bus.publish(ADD if seen is None else UPDATE, {'url': url, 'name': name, 'embed_code': embed_code})
+            elif seen is not None:
+                del self.cameras[url]
+                self.bus.publish(REMOVE, {'url': url})
+
+    def _run(self):
+        from .store import PipelineStore
+
+        with PipelineStore(self.path) as store:
+            self._load(store)
+            while not self.stop_event.wait(self.interval):
+                try:
+                    self.poll(store)
+                except Exception as e:
+                    logger.warning(f"Failed to poll {self.path} for changes: {str(e)}")
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='store-watcher', daemon=True)
+        self.thread.start()
+        logger.info(f"Watching {self.path} for camera changes")
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,234 @@
+import codecs
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+from .checkpoint import atomic_write
+from .lazy import lazy_import
+from .metrics import SIZE_BUCKETS, registry
+from .ratecontrol import AdaptiveRateController, CircuitOpenError, backoff_delay, parse_retry_after
+from .streamscan import STREAM_CHUNK_SIZE, EmbedStreamScanner
+
+requests = lazy_import('requests')
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Starting per-host delay between requests; the rate controller adapts it from here
+RATE_LIMIT_SECONDS = 0.5
+MAX_RETRIES = 5
+MAX_FETCH_WORKERS = 8
+REQUEST_TIMEOUT_SECONDS = 20
+THROTTLE_STATUS_CODES = (429, 503)
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+# Client errors that can clear up on their own; any other 4xx means the page is gone
+TRANSIENT_CLIENT_STATUS_CODES = (408, 425, 429)
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'VLC/3.0.20 LibVLC/3.0.20',
+    'Lavf/60.3.100',
+    'QuickTime/7.7.3 (qtver=7.7.3;os=Windows NT 6.1)',
+    'Windows-Media-Player/12.0.19041.3636'
+]
+
+rate_controller = AdaptiveRateController(initial_delay=RATE_LIMIT_SECONDS, max_concurrency=MAX_FETCH_WORKERS)
+# Optional limiter shared with other processes (leasequeue.GlobalHostLimiter); its
+# acquire(host) is called after the local rate controller admits a request
+HOST_LIMITER = None
+
+# Apply command-line fetch settings; anything left as None keeps its current value
+def configure(workers=None, delay=None, max_concurrency=None, retries=None, timeout=None):
+    global MAX_FETCH_WORKERS, MAX_RETRIES, REQUEST_TIMEOUT_SECONDS
+    if workers is not None:
+        MAX_FETCH_WORKERS = workers
+    if delay is not None:
+        rate_controller.initial_delay = delay
+    if max_concurrency is not None:
+        rate_controller.max_concurrency = max_concurrency
+    if retries is not None:
+        MAX_RETRIES = retries
+    if timeout is not None:
+        REQUEST_TIMEOUT_SECONDS = timeout
+
+_local = threading.local()
+
+# One keep-alive session per worker thread
+def get_session():
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+# Send a GET through the adaptive rate controller, retrying transient failures with
+# jittered exponential backoff and waiting out Retry-After on 429/503. attempts (default
+# MAX_RETRIES) bounds the tries; the fetch stage passes 1 and retries from its own queue
+# so a worker thread never sleeps through a backoff.
+def send_request(url, stream=False, attempts=None):
+    host = urlparse(url).netloc
+    attempts = attempts or MAX_RETRIES
+    for attempt in range(attempts):
+        # Raises CircuitOpenError instead of sending while the host's breaker is open
+        rate_controller.acquire(host)
+        if HOST_LIMITER is not None:
+            try:
+                HOST_LIMITER.acquire(host)
+            except Exception:
+                rate_controller.cancel(host)
+                raise
+        headers = {'User-Agent': random.choice(USER_AGENTS)}
+        logger.debug(f"Sending GET request to {url} with User-Agent: {headers['User-Agent']} (attempt {attempt + 1})")
+        started = time.monotonic()
+        try:
+            response = get_session().get(url, timeout=REQUEST_TIMEOUT_SECONDS, headers=headers, stream=stream)
+        except requests.exceptions.RequestException as e:
+            rate_controller.release(host, ok=False)
+            registry.inc('fetch_responses_total', labels={'status': 'error'})
+            if attempt + 1 == attempts:
+                raise
+            registry.inc('fetch_retries_total', labels={'reason': 'error'})
+            delay = backoff_delay(attempt)
+            logger.warning(f"Request to {url} failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        latency = time.monotonic() - started
+        registry.inc('fetch_responses_total', labels={'status': response.status_code})
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            throttled = response.status_code in THROTTLE_STATUS_CODES
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if throttled else None
+            rate_controller.release(host, latency, ok=False, throttled=throttled, retry_after=retry_after)
+            response.close()
+            if attempt + 1 == attempts:
+                response.raise_for_status()
+            registry.inc('fetch_retries_total', labels={'reason': 'throttled' if throttled else 'status'})
+            # With Retry-After the next acquire() already waits until the host reopens
+            delay = 0 if retry_after is not None else backoff_delay(attempt)
+            logger.warning(f"HTTP {response.status_code} from {url}, retrying in {retry_after if retry_after is not None else delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        # Anything else (including 404) is a healthy answer from the host
+        rate_controller.release(host, latency, ok=True)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        return response
+
+# Status of an HTTPError saying the page itself is gone (404, 410 and other lasting 4xx
+# answers), or None for anything worth retrying: 5xx, throttling, connection failures
+def permanent_status(error):
+    response = getattr(error, 'response', None)
+    if not isinstance(error, requests.exceptions.HTTPError) or response is None:
+        return None
+    status = response.status_code
+    return status if 400 <= status < 500 and status not in TRANSIENT_CLIENT_STATUS_CODES else None
+
+def record_body_size(size):
+    registry.inc('fetch_bytes_total', size)
+    registry.observe('fetch_body_bytes', size, buckets=SIZE_BUCKETS)
+
+# Fetch a whole page as text
+def fetch_html(url, attempts=None):
+    with registry.stage('fetch'):
+        response = send_request(url, attempts=attempts)
+        record_body_size(len(response.content))
+        return response.text
+
+# Fetch a whole binary body, such as a poster image
+def fetch_bytes(url, attempts=None):
+    with registry.stage('fetch'):
+        response = send_request(url, attempts=attempts)
+        record_body_size(len(response.content))
+        return response.content
+
+# Stream a page and scan it for the first embed as chunks arrive. Without save_to the
+# connection is closed as soon as the embed is found; with save_to the whole body is
+# still read so the cache file is complete, but it goes straight to disk instead of
+# being held in memory. Returns (embed_code or None, bytes_read).
+# Time spent scanning is also recorded as the extract stage.
+def fetch_embed(url, patterns, save_to=None, attempts=None):
+    with registry.stage('fetch'):
+        return _fetch_embed(url, patterns, save_to, attempts)
+
+# Incremental decoder for a response's charset. A charset Python does not know is decoded
+# as UTF-8 with replacement characters, as requests' response.text does.
+def incremental_decoder(encoding):
+    try:
+        return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        logger.debug(f"Unknown charset {encoding!r}, decoding as UTF-8")
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+def _fetch_embed(url, patterns, save_to, attempts):
+    response = send_request(url, stream=True, attempts=attempts)
+    scanner = EmbedStreamScanner(patterns)
+    scan_seconds = 0.0
+    decoder = incremental_decoder(response.encoding)
+    bytes_read = 0
+    try:
+        with (atomic_write(save_to) if save_to else nullcontext()) as cache:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                bytes_read += len(chunk)
+                text = decoder.decode(chunk)
+                scan_started = time.perf_counter()
+                scanner.feed(text)
+                scan_seconds += time.perf_counter() - scan_started
+                if cache is not None:
+                    cache.write(text)
+                elif scanner.found:
+                    break
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                scanner.feed(tail)
+                if cache is not None:
+                    cache.write(tail)
+    except OSError as e:
+        # A failed cache write must not fail the fetch; keep whatever embed was found
+        logger.error(f"Failed to save HTML to {save_to}: {str(e)}")
+    finally:
+        response.close()
+    record_body_size(bytes_read)
+    registry.observe('stage_seconds', scan_seconds, labels={'stage': 'extract'})
+    if scanner.found and save_to is None:
+        logger.debug(f"Found embed in {url} after {bytes_read} bytes, closed connection early")
+    return scanner.match, bytes_read
+
+# Fetch (url, payload) items on a thread pool, keeping at most 2 * workers queued, and
+# yield (url, payload, result, error) as each completes. Per-host concurrency is still
+# governed by the rate controller, so extra workers only help once it ramps up.
+def fetch_many(items, workers=None, fetch=None):
+    fetch = fetch or fetch_html
+    workers = workers or MAX_FETCH_WORKERS
+    items = iter(items)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            for url, payload in items:
+                pending[executor.submit(fetch, url)] = (url, payload)
+                return True
+            return False
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+        while pending:
+            registry.set_gauge('fetch_queue_depth', len(pending))
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, payload = pending.pop(future)
+                try:
+                    yield url, payload, future.result(), None
+                except (requests.exceptions.RequestException, CircuitOpenError) as e:
+                    yield url, payload, None, e
+                submit_next()
+        registry.set_gauge('fetch_queue_depth', 0)
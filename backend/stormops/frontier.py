@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import math
+
+from . import config
+from .metrics import registry
+from .records import CameraRow
+from .store import STORE_BATCH_SIZE
+from .urlcanon import canonicalize_url, url_key
+
+logger = logging.getLogger(__name__)
+
+# Fixed-size Bloom filter over strings: no false negatives, false positives at about
+# error_rate while it holds no more than capacity items. k bit positions per item come
+# from one blake2b digest (double hashing), so a lookup costs one hash.
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(int(capacity), 1)
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+# Discovery frontier in front of the store's exact URL table. Every URL is canonicalized
+# and looked up by its url_key; a Bloom miss means the URL is new and goes straight to the
+# store, and only Bloom hits are checked exactly (against the rows waiting to be inserted,
+# then the store, case-insensitively when keys fold path case). Has the store's
+# add_urls()/commit(), so discover_file() takes either.
+class Frontier:
+    def __init__(self, store, expected=None, error_rate=None, base_url=None):
+        self.store = store
+        self.base_url = base_url
+        expected = max(expected or config.FRONTIER_EXPECTED_URLS, 2 * store.url_count())
+        self.bloom = BloomFilter(expected, error_rate or config.FRONTIER_ERROR_RATE)
+        for row in store.iter_urls():
+            self.bloom.add(url_key(canonicalize_url(row.url, base_url)))
+        self.seen = 0
+        self.added = 0
+        self.duplicates = 0
+        self.false_positives = 0
+
+    def commit(self):
+        self.store.commit()
+
+    def _is_duplicate(self, url, key, pending):
+        if key not in self.bloom:
+            return False
+        if key in pending or self.store.has_url(url, ignore_case=config.CANONICAL_LOWERCASE_PATH):
+            return True
+        self.false_positives += 1
+        return False
+
+    # Canonicalize rows and drop duplicates, yielding batches of new rows keyed by url_key
+    def _new_batches(self, rows):
+        duplicates = 0
+        batch = {}
+        for row in rows:
+            url = canonicalize_url(row.url, self.base_url)
+            key = url_key(url)
+            self.seen += 1
+            if self._is_duplicate(url, key, batch):
+                duplicates += 1
+                continue
+            self.bloom.add(key)
+            batch[key] = CameraRow(url, row.name)
+            if len(batch) >= STORE_BATCH_SIZE:
+                yield batch
+                batch = {}
+        if batch:
+            yield batch
+        self.duplicates += duplicates
+        registry.inc('frontier_urls_total', duplicates, labels={'result': 'duplicate'})
+
+    def _added(self, added):
+        self.added += added
+        registry.inc('frontier_urls_total', added, labels={'result': 'new'})
+
+    # Add URL rows, dropping duplicates before they reach the store; returns how many were new
+    def add_urls(self, rows):
+        added = sum(self.store.add_urls(batch.values()) for batch in self._new_batches(rows))
+        self._added(added)
+        return added
+
+    # Like add_urls, but returns the new rows themselves (canonical URLs) so they can be
+    # handed on, e.g. straight to the fetch stage while a crawl is still running
+    def new_rows(self, rows):
+        new = []
+        for batch in self._new_batches(rows):
+            self.store.add_urls(batch.values())
+            new.extend(batch.values())
+        self._added(len(new))
+        return new
+
+    def stats(self):
+        return {
+            'seen': self.seen,
+            'added': self.added,
+            'duplicates_avoided': self.duplicates,
+            'bloom_false_positives': self.false_positives,
+            'bloom_bytes': self.bloom.nbytes,
+        }
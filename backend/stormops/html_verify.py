@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import re
+import time
+
+from .checkpoint import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+MANIFEST_FILENAME = 'manifest.json'
+VERIFY_CHUNK_SIZE = 64 * 1024
+# Longest embed we expect to straddle a chunk boundary
+MAX_EMBED_LENGTH = 4096
+
+EMBED_PATTERN = re.compile(
+    r'<iframe\s[^<>]{0,512}src="https?://(?:www\.youtube\.com|player\.vimeo\.com|www\.dailymotion\.com)/[^"<>]{1,512}"[^<>]{0,512}></iframe>',
+    re.IGNORECASE
+)
+
+# Count embeds in an in-memory snippet (used by writers as cards are emitted)
+def count_embeds(text):
+    if not text:
+        return 0
+    return sum(1 for _ in EMBED_PATTERN.finditer(text))
+
+# Count embeds in an existing file without loading it whole
+def count_embeds_streaming(filename, chunk_size=VERIFY_CHUNK_SIZE):
+    count = 0
+    carry = ''
+    with open(filename, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer = carry + chunk
+            last_end = 0
+            for match in EMBED_PATTERN.finditer(buffer):
+                count += 1
+                last_end = match.end()
+            # Keep enough of the tail to complete an embed split across chunks
+            carry = buffer[max(last_end, len(buffer) - MAX_EMBED_LENGTH):]
+    return count
+
+# Wraps an open text file, counting bytes and embeds as cards are written
+class CountingWriter:
+    def __init__(self, f):
+        self.f = f
+        self.bytes_written = 0
+        self.embed_count = 0
+
+    def write(self, text):
+        self.f.write(text)
+        self.bytes_written += len(text.encode('utf-8'))
+
+    def write_card(self, text, embed_code):
+        self.write(text)
+        self.embed_count += count_embeds(embed_code)
+
+def manifest_path(directory):
+    return os.path.join(directory, MANIFEST_FILENAME)
+
+# Load the manifest of generated files, returning an empty one if missing or unreadable
+def load_manifest(directory):
+    path = manifest_path(directory)
+    if not os.path.exists(path):
+        return {'files': {}}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('files', {})
+        return manifest
+    except Exception as e:
+        logger.warning(f"Failed to read manifest {path}: {str(e)}")
+        return {'files': {}}
+
+def save_manifest(directory, manifest):
+    path = manifest_path(directory)
+    try:
+        # One write rather than json.dump's many small ones; the manifest holds every page's
+        # camera list once builds are incremental
+        text = json.dumps(manifest, indent=2, sort_keys=True)
+        with atomic_write(path) as f:
+            f.write(text)
+    except Exception as e:
+        logger.error(f"Failed to save manifest {path}: {str(e)}")
+
+def manifest_entry(embed_count, byte_count):
+    return {
+        'Embed Count': embed_count,
+        'Bytes': byte_count,
+        'Written': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+# Record the entries (basename -> manifest_entry) of files just published, in one load and
+# save of the manifest however many files there are
+def record_manifest_entries(directory, entries):
+    if not entries:
+        return
+    manifest = load_manifest(directory)
+    manifest['files'].update(entries)
+    save_manifest(directory, manifest)
+
+# Verify one file: trust the manifest when it matches the file on disk, else stream-scan it
+def verify_html_file(filename, manifest=None, rescan=False):
+    basename = os.path.basename(filename)
+    try:
+        if manifest is None:
+            manifest = load_manifest(os.path.dirname(filename))
+        entry = manifest['files'].get(basename)
+        if not rescan and entry and entry.get('Bytes') == os.path.getsize(filename):
+            logger.info(f"Verified {basename} from manifest: {entry['Embed Count']} embeds")
+            return {'File': basename, 'Embed Count': entry['Embed Count']}
+        iframe_count = count_embeds_streaming(filename)
+        logger.info(f"Verified {basename}: {iframe_count} embeds")
+        return {'File': basename, 'Embed Count': iframe_count}
+    except Exception as e:
+        logger.error(f"Failed to verify {basename}: {str(e)}")
+        return {'File': basename, 'Embed Count': 'Error'}
+
+# Verify every generated HTML file in a directory
+def verify_html_files(directory, rescan=False):
+    manifest = load_manifest(directory)
+    html_files = sorted(f for f in os.listdir(directory) if f.endswith('.html'))
+    return [verify_html_file(os.path.join(directory, f), manifest, rescan) for f in html_files]
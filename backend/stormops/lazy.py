@@ -0,0 +1,28 @@
+import importlib
+import importlib.util
+import sys
+
+# Return a module object whose import is deferred until an attribute is first used.
+# Heavy dependencies (pandas, requests) go through this so importing stormops, or
+# running a command that never touches them, does not pay for them.
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        # Defer the ImportError to first use, where it names the missing dependency
+        return _MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+class _MissingModule:
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        raise ImportError(f"{self._name} is required for this command but is not installed")
@@ -0,0 +1,208 @@
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from . import config
+from .records import CameraRow
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# A lease not completed or renewed within this many seconds goes back to the queue
+LEASE_SECONDS = 120
+# URLs leased per round trip; a worker keeps its fetch window busy with about this many
+LEASE_BATCH = 16
+# How long an idle worker waits before looking for work (e.g. leases about to expire)
+POLL_SECONDS = 1.0
+# Minimum seconds between requests to one host across every worker sharing the store
+GLOBAL_HOST_INTERVAL_SECONDS = 0.1
+SQLITE_BUSY_TIMEOUT_SECONDS = 30
+
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    url TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS host_slots (
+    host TEXT PRIMARY KEY,
+    next_allowed_at REAL NOT NULL
+);
+"""
+# URLs nobody holds a live lease on that are pending (no result) or on the retry queue
+# (failed, backoff over): pending first, highest priority first (see stormops.priority),
+# then oldest
+LEASABLE_SQL = (
+    'SELECT urls.url, urls.name, leases.url IS NOT NULL FROM urls LEFT JOIN leases ON leases.url = urls.url '
+    'LEFT JOIN results ON results.url = urls.url '
+    "WHERE (results.url IS NULL OR (results.status = 'failed' AND results.due_at <= ?)) "
+    'AND (leases.url IS NULL OR leases.expires_at < ?) ORDER BY results.url IS NOT NULL, urls.priority DESC, urls.id LIMIT ?'
+)
+LEASE_UPSERT = (
+    'INSERT INTO leases (url, worker, expires_at) VALUES (?, ?, ?) '
+    'ON CONFLICT(url) DO UPDATE SET worker = excluded.worker, expires_at = excluded.expires_at, attempts = leases.attempts + 1'
+)
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+# Short write transaction that takes SQLite's write lock up front, so two workers can't
+# lease the same rows
+@contextmanager
+def immediate(conn):
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+# Work queue over the store's URL table, shared by any number of worker processes that
+# open the same database file. A worker leases a batch of pending URLs for lease_seconds,
+# fetches them without holding any lock, then writes the results and drops its leases in
+# one transaction. Leases that expire (a worker died or stalled) are handed out again.
+class LeaseQueue:
+    def __init__(self, store, worker_id=None, lease_seconds=None):
+        self.store = store
+        self.conn = store.conn
+        self.conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_SECONDS * 1000}")
+        self.conn.executescript(LEASE_SCHEMA)
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds or LEASE_SECONDS
+        self.reclaimed = 0
+
+    # Lease up to count pending URLs; returns CameraRows
+    def lease(self, count=LEASE_BATCH):
+        now = time.time()
+        with immediate(self.conn):
+            rows = self.conn.execute(LEASABLE_SQL, (now, now, count)).fetchall()
+            self.conn.executemany(LEASE_UPSERT, [(url, self.worker_id, now + self.lease_seconds) for url, _, _ in rows])
+        reclaimed = sum(1 for _, _, expired in rows if expired)
+        if reclaimed:
+            logger.info(f"Worker {self.worker_id} reclaimed {reclaimed} expired leases")
+            self.reclaimed += reclaimed
+        return [CameraRow(url, name) for url, name, _ in rows]
+
+    # Push this worker's leases out by another lease_seconds
+    def renew(self):
+        with immediate(self.conn):
+            self.conn.execute('UPDATE leases SET expires_at = ? WHERE worker = ?', (time.time() + self.lease_seconds, self.worker_id))
+
+    # Store results as (url, name, embed_code, failed) and drop their leases; failures go on
+    # the retry queue and are leased again once their backoff is over
+    def complete(self, results):
+        with immediate(self.conn):
+            for url, name, embed_code, failed in results:
+                self.store.add_result(url, name, embed_code, failed)
+            self.conn.executemany('DELETE FROM leases WHERE url = ? AND worker = ?', [(url, self.worker_id) for url, _, _, _ in results])
+
+    # Give back whatever this worker still holds, e.g. on shutdown
+    def release(self):
+        with immediate(self.conn):
+            self.conn.execute('DELETE FROM leases WHERE worker = ?', (self.worker_id,))
+
+    def leased_count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM leases WHERE expires_at >= ?', (time.time(),)).fetchone()[0]
+
+# Per-host request spacing shared by every process using the store: each request claims the
+# host's next slot in the host_slots table, so N workers together still send at most one
+# request per interval to a host. Used by the fetcher next to its local rate controller;
+# fetch threads each get their own connection.
+class GlobalHostLimiter:
+    def __init__(self, path=None, interval=None):
+        self.path = path or config.STORE_DB
+        self.interval = GLOBAL_HOST_INTERVAL_SECONDS if interval is None else interval
+        self.local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+            conn.executescript(LEASE_SCHEMA)
+        return conn
+
+    # Block until this process holds the host's next slot
+    def acquire(self, host):
+        if self.interval <= 0:
+            return
+        conn = self._conn()
+        now = time.time()
+        with immediate(conn):
+            row = conn.execute('SELECT next_allowed_at FROM host_slots WHERE host = ?', (host,)).fetchone()
+            slot = now if row is None else max(now, row[0])
+            conn.execute(
+                'INSERT INTO host_slots (host, next_allowed_at) VALUES (?, ?) '
+                'ON CONFLICT(host) DO UPDATE SET next_allowed_at = excluded.next_allowed_at',
+                (host, slot + self.interval)
+            )
+        # The slot is ours; wait for it outside the transaction
+        if slot > now:
+            time.sleep(slot - now)
+
+# Fetch worker: lease, fetch and extract, complete, until no URL is pending (failures still
+# backing off are left for a later run). Meant to run
+# as one of several processes (on one machine or several sharing the database file);
+# returns (valid, skipped, failed) for the URLs this worker completed.
+def run_worker(store, worker_id=None, batch_size=None, lease_seconds=None, poll_seconds=None):
+    from . import fetcher
+    from .pipeline import fetch_once
+
+    batch_size = batch_size or LEASE_BATCH
+    poll_seconds = POLL_SECONDS if poll_seconds is None else poll_seconds
+    queue = LeaseQueue(store, worker_id, lease_seconds)
+    counts = [0, 0, 0]
+    logger.info(f"Worker {queue.worker_id} started on {store.path}")
+    try:
+        while True:
+            batch = queue.lease(batch_size)
+            if not batch:
+                if store.pending_count() == 0:
+                    break
+                # Everything left is leased by other workers; their leases may yet expire
+                time.sleep(poll_seconds)
+                continue
+            results = []
+            renewed_at = time.monotonic()
+            for url, name, embed_code, error in fetcher.fetch_many(((row.url, row.name) for row in batch), fetch=fetch_once):
+                if error is not None:
+                    logger.error(f"Failed to fetch {url}, queued for retry: {str(error)}")
+                    counts[2] += 1
+                else:
+                    counts[0 if embed_code else 1] += 1
+                results.append((url, name, embed_code, error is not None))
+                if time.monotonic() - renewed_at > queue.lease_seconds / 3:
+                    queue.renew()
+                    renewed_at = time.monotonic()
+            queue.complete(results)
+    finally:
+        queue.release()
+    logger.info(f"Worker {queue.worker_id} done: {counts[0]} embeds, {counts[1]} without embeds, {counts[2]} failed, {queue.reclaimed} leases reclaimed")
+    return tuple(counts)
+
+# Start count `python -m stormops worker` processes on this machine against the store at
+# path and wait for them; extra_args go to the worker command. Returns the exit codes.
+def spawn_workers(count, path=None, extra_args=(), log_file=None):
+    from .startup import package_env
+
+    path = path or config.STORE_DB
+    command = [sys.executable, '-m', 'stormops', '--store', path]
+    if log_file:
+        command += ['--log-file', log_file]
+    processes = [subprocess.Popen(command + ['worker', '--id', f"{default_worker_id()}-w{i}"] + list(extra_args), env=package_env())
+                 for i in range(count)]
+    try:
+        return [process.wait() for process in processes]
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        raise
@@ -0,0 +1,25 @@
+import logging
+
+from . import config
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(module)s - %(message)s'
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Log to scraper.log plus the console. Entry points call this explicitly so that
+# importing stormops as a library never touches the caller's logging setup.
+def setup_logging(log_file=None, level=logging.INFO, console_level=logging.INFO):
+    root = logging.getLogger()
+    if getattr(root, '_stormops_configured', False):
+        return
+    logging.basicConfig(
+        filename=log_file or config.LOG_FILE,
+        level=level,
+        format=LOG_FORMAT,
+        datefmt=DATE_FORMAT
+    )
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    logging.getLogger('stormops').addHandler(console_handler)
+    root._stormops_configured = True
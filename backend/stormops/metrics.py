@@ -0,0 +1,282 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+METRIC_PREFIX = 'stormops'
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PIPELINE_STAGES = ('fetch', 'parse', 'extract', 'persist', 'render')
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + '}'
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Estimate a quantile by interpolating inside the bucket that contains it
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if seen + bucket_count >= rank and bucket_count:
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))
+        }
+
+# Thread-safe counters, gauges and histograms keyed by metric name and labels
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+        self.started = time.time()
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, value=1, labels=None):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, labels=None):
+        with self.lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    # Time a block as one observation of the stage latency histogram
+    @contextmanager
+    def stage(self, stage_name, **labels):
+        labels = dict(labels, stage=stage_name)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('stage_errors_total', labels=labels)
+            raise
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - started, labels=labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    # Prometheus text exposition format (version 0.0.4)
+    def render_prometheus(self):
+        lines = []
+        with self.lock:
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted({name for name, _ in series}):
+                    full_name = f"{METRIC_PREFIX}_{name}"
+                    if name in self.help:
+                        lines.append(f"# HELP {full_name} {self.help[name]}")
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    for (series_name, key), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f"{full_name}{_format_labels(key)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                full_name = f"{METRIC_PREFIX}_{name}"
+                if name in self.help:
+                    lines.append(f"# HELP {full_name} {self.help[name]}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for (series_name, key), histogram in sorted(self.histograms.items()):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        def flatten(name, key):
+            return name + _format_labels(key)
+        with self.lock:
+            return {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'uptime_seconds': round(time.time() - self.started, 3),
+                'counters': {flatten(name, key): value for (name, key), value in self.counters.items()},
+                'gauges': {flatten(name, key): value for (name, key), value in self.gauges.items()},
+                'histograms': {flatten(name, key): h.as_dict() for (name, key), h in self.histograms.items()}
+            }
+
+    # p50/p95/total per pipeline stage for the end-of-run summary
+    def stage_summary(self):
+        summary = {}
+        with self.lock:
+            for (name, key), histogram in self.histograms.items():
+                labels = dict(key)
+                if name == 'stage_seconds' and 'stage' in labels:
+                    summary[labels['stage']] = {
+                        'count': histogram.count,
+                        'total_seconds': round(histogram.sum, 3),
+                        'p50_seconds': histogram.quantile(0.5),
+                        'p95_seconds': histogram.quantile(0.95)
+                    }
+        return summary
+
+registry = MetricsRegistry()
+registry.describe('fetch_body_bytes', 'Response body size per fetch')
+registry.describe('stage_seconds', 'Wall-clock seconds spent per pipeline stage call')
+registry.describe('stage_errors_total', 'Pipeline stage calls that raised')
+registry.describe('fetch_retries_total', 'Fetch attempts that were retried')
+registry.describe('fetch_responses_total', 'HTTP responses by status code')
+registry.describe('fetch_bytes_total', 'Response body bytes read')
+registry.describe('persist_bytes_total', 'Bytes written by checkpoints')
+registry.describe('fetch_queue_depth', 'Fetches submitted to the worker pool but not yet consumed')
+registry.describe('urls_pending', 'URLs left in the current process_slave pass')
+registry.describe('frontier_urls_total', 'Discovered URLs by whether the frontier found them new or duplicate')
+registry.describe('fetch_results_total', 'Fetched URLs by result state: success, no_embed or failed')
+registry.describe('events_published_total', 'Live camera events by kind: add, update, remove')
+registry.describe('event_subscribers', 'Clients connected to the live camera feed')
+registry.describe('event_overflows_total', 'Feed clients disconnected for falling too far behind')
+registry.describe('gallery_pages_total', 'Gallery batch pages by whether a build rewrote, kept, failed to write or removed them')
+registry.describe('thumbnail_requests_total', 'Thumbnail requests by the tier that answered: memory, disk, fetched or failed')
+registry.describe('thumbnail_evictions_total', 'Thumbnails evicted from the disk cache to stay under its size cap')
+registry.describe('pages_quarantined_total', 'Saved pages quarantined by stage: over their match budget, or dead-lettered by a parse worker')
+registry.describe('parse_tasks_total', 'Saved pages handled by parse workers, by how they ended: done, budget, unreadable, timeout, memory, crash or error')
+registry.describe('parse_workers_started_total', 'Parse worker processes started, first ones and replacements')
+registry.describe('delta_rows_total', 'Rows in the export delta by change: new, changed or removed')
+registry.describe('manifest_shards_total', 'Camera manifest shards by whether an export wrote them or found them unchanged')
+
+# Decorator timing every call of a function as the given pipeline stage
+def timed(stage_name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with registry.stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Serve /metrics (Prometheus text) and /metrics.json from a background thread
+def start_metrics_server(port, host='127.0.0.1', metrics_registry=None):
+    # http.server is only imported by runs that actually serve metrics
+    from .metrics_http import MetricsRequestHandler, ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    server.registry = metrics_registry or registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+# Periodically write registry.snapshot() to a JSON file (atomically) until stopped
+class JsonSnapshotter:
+    def __init__(self, path, interval_seconds=30, metrics_registry=None):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.registry = metrics_registry or registry
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def write(self):
+        from .checkpoint import atomic_write
+        try:
+            with atomic_write(self.path) as f:
+                json.dump(self.registry.snapshot(), f, indent=2)
+        except Exception as e:
+            logger.error(f"Failed to write metrics snapshot {self.path}: {str(e)}")
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval_seconds):
+            self.write()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.write()
+
+# Run fn() under cProfile or pyinstrument and write the report next to output_prefix
+def run_profiled(fn, mode, output_prefix='profile'):
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed, falling back to cProfile")
+            mode = 'cprofile'
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return fn()
+            finally:
+                profiler.stop()
+                with open(f"{output_prefix}.html", 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+                logger.info(f"Wrote pyinstrument profile to {output_prefix}.html")
+    import cProfile
+    import io
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{output_prefix}.prof")
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+        with open(f"{output_prefix}.txt", 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        logger.info(f"Wrote cProfile stats to {os.path.abspath(output_prefix)}.prof and .txt")
@@ -0,0 +1,33 @@
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Body and content type for /metrics or /metrics.json, or None for any other path
+def metrics_response(path, metrics_registry):
+    path = path.split('?', 1)[0]
+    if path == '/metrics':
+        return metrics_registry.render_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+    if path == '/metrics.json':
+        return json.dumps(metrics_registry.snapshot()).encode('utf-8'), 'application/json'
+    return None
+
+def send_body(handler, body, content_type):
+    handler.send_response(200)
+    handler.send_header('Content-Type', content_type)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+# Serves the registry attached to the server as /metrics and /metrics.json
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        response = metrics_response(self.path, self.server.registry)
+        if response is None:
+            self.send_error(404)
+            return
+        send_body(self, *response)
+
+    def log_message(self, format, *args):
+        logger.debug(f"metrics: {format % args}")
@@ -0,0 +1,99 @@
+import functools
+import mmap
+import os
+import re
+from contextlib import contextmanager
+
+from .streamscan import MAX_EMBED_LENGTH
+
+# Bytes of a mapping scanned per step in the windowed scanners; pages behind the window
+# are released with MADV_DONTNEED so resident memory stays near one window per file
+MMAP_WINDOW_BYTES = 8 * 1024 * 1024
+
+# Bytes versions of str patterns, compiled once per pattern tuple
+@functools.lru_cache(maxsize=32)
+def compile_bytes_patterns(patterns, flags=re.IGNORECASE):
+    return [re.compile(pattern.encode('ascii') if isinstance(pattern, str) else pattern, flags) for pattern in patterns]
+
+# Map a file read-only; empty files (which mmap refuses) come back as b''
+@contextmanager
+def mapped_file(filename):
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapping
+        finally:
+            mapping.close()
+
+def _release(mapping, end):
+    # Drop whole pages before end from this process; they stay in the page cache
+    end -= end % mmap.PAGESIZE
+    if end > 0 and hasattr(mapping, 'madvise'):
+        mapping.madvise(mmap.MADV_DONTNEED, 0, end)
+
+# First match of the first pattern that matches anywhere in the file, decoded; None if
+# nothing does. Only the matched span is copied out of the mapping. budget (a
+# quarantine.MatchBudget) is checked before each pattern.
+def search_mapped(filename, patterns, budget=None):
+    with mapped_file(filename) as data:
+        for pattern in patterns:
+            if budget is not None:
+                budget.check()
+            match = pattern.search(data)
+            if match:
+                return match.group(0).decode('utf-8', errors='replace')
+    return None
+
+# Every non-overlapping match of a bytes regex in the file, scanned window by window in
+# place. Same boundary rule as streamscan.iter_matches: matches longer than max_length
+# may be cut short where windows meet. Use each match before the generator finishes,
+# since the mapping is closed then. budget is checked before each window and match.
+def iter_mapped_matches(filename, pattern, max_length=MAX_EMBED_LENGTH, window_size=MMAP_WINDOW_BYTES, budget=None):
+    window_size = max(window_size, 2 * max_length)
+    with mapped_file(filename) as data:
+        size = len(data)
+        start = 0
+        while start < size:
+            if budget is not None:
+                budget.check()
+            end = min(start + window_size, size)
+            safe_end = end if end == size else end - max_length
+            resume = max(safe_end, start)
+            for match in pattern.finditer(data, start, end):
+                if match.start() >= safe_end:
+                    resume = match.start()
+                    break
+                if budget is not None:
+                    budget.check()
+                yield match
+                resume = max(match.end(), safe_end)
+            if end == size:
+                return
+            start = resume
+            if not isinstance(data, bytes):
+                _release(data, start)
+
+# Matches of several patterns over overlapping windows of the file; a match near a window
+# edge can be reported twice, so callers deduplicate (as for streamscan.iter_windows)
+def iter_mapped_window_matches(filename, patterns, max_length=MAX_EMBED_LENGTH, window_size=MMAP_WINDOW_BYTES, budget=None):
+    window_size = max(window_size, 2 * max_length)
+    with mapped_file(filename) as data:
+        size = len(data)
+        start = 0
+        while True:
+            end = min(start + window_size, size)
+            for pattern in patterns:
+                for match in pattern.finditer(data, start, end):
+                    if budget is not None:
+                        budget.check()
+                    yield match
+                if budget is not None:
+                    budget.check()
+            if end >= size:
+                return
+            start = end - max_length
+            if not isinstance(data, bytes):
+                _release(data, start)
@@ -0,0 +1,261 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+COUNTRIES = ['united-states', 'japan', 'norway', 'italy', 'australia', 'iceland', 'chile', 'philippines']
+REGIONS = ['north', 'south', 'coast', 'mountains', 'city']
+PLATFORMS = ['youtube', 'vimeo', 'dailymotion', 'none']
+
+EMBED_TEMPLATES = {
+    'youtube': '<iframe width="560" height="315" src="https://www.youtube.com/embed/{video_id}" frameborder="0" allowfullscreen></iframe>',
+    'vimeo': '<iframe width="640" height="360" src="https://player.vimeo.com/video/{video_number}" frameborder="0" allowfullscreen></iframe>',
+    'dailymotion': '<iframe width="640" height="360" src="https://www.dailymotion.com/embed/video/x{video_number}" frameborder="0" allowfullscreen></iframe>',
+    'none': '<div class="player-offline">Camera offline</div>'
+}
+
+# Shape of a synthetic webcamtaxi-like directory site
+class SiteConfig:
+    def __init__(self, directory_pages=5, cameras_per_page=40, page_kb=50, embed_mix=None,
+                 latency_ms=0, latency_jitter_ms=0, error_rate=0.0, throttle_rate=0.0, seed=1):
+        self.directory_pages = directory_pages
+        self.cameras_per_page = cameras_per_page
+        self.page_kb = page_kb
+        self.embed_mix = embed_mix or {'youtube': 0.6, 'vimeo': 0.15, 'dailymotion': 0.1, 'none': 0.15}
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+
+    @property
+    def camera_count(self):
+        return self.directory_pages * self.cameras_per_page
+
+    def as_dict(self):
+        return dict(vars(self))
+
+def _stable_fraction(seed, key):
+    digest = hashlib.sha256(f"{seed}:{key}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+def camera_path(index):
+    country = COUNTRIES[index % len(COUNTRIES)]
+    region = REGIONS[(index // len(COUNTRIES)) % len(REGIONS)]
+    return f"/en/{country}/{region}/storm-cam-{index}.html"
+
+def camera_name(index):
+    return f"Storm Cam {index}"
+
+def directory_path(page):
+    return f"/en/directory/page-{page + 1}.html"
+
+# Deterministic platform for a camera according to the configured embed mix
+def camera_platform(config, index):
+    point = _stable_fraction(config.seed, index)
+    total = sum(config.embed_mix.values())
+    cumulative = 0.0
+    for platform in PLATFORMS:
+        cumulative += config.embed_mix.get(platform, 0) / total
+        if point < cumulative:
+            return platform
+    return 'none'
+
+def camera_paths(config):
+    return [camera_path(i) for i in range(config.camera_count)]
+
+def _padding(config, label, current_size):
+    target = config.page_kb * 1024
+    block = f'<div class="comment"><p>{label} comment about the weather and the view tonight.</p></div>\n'
+    repeats = max(0, (target - current_size) // len(block))
+    return block * repeats
+
+def render_camera_page(config, index):
+    platform = camera_platform(config, index)
+    embed = EMBED_TEMPLATES[platform].format(video_id=f"vid{index:07d}", video_number=100000 + index)
+    head = f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="UTF-8"><title>{camera_name(index)}</title></head>
+<body>
+<h1>{camera_name(index)}</h1>
+<div class="player">{embed}</div>
+<div class="related">
+"""
+    related = ''.join(
+        f'<a href="{camera_path((index + k) % config.camera_count)}" title="{camera_name((index + k) % config.camera_count)}">related</a>\n'
+        for k in range(1, 6)
+    )
+    tail = "</div>\n</body>\n</html>\n"
+    return head + related + _padding(config, camera_name(index), len(head) + len(related) + len(tail)) + tail
+
+def render_directory_page(config, page):
+    first = page * config.cameras_per_page
+    cards = []
+    for index in range(first, first + config.cameras_per_page):
+        cards.append(
+            f'<div class="nspArt nspCol3"><a href="{camera_path(index)}" class="nspImageWrapper" title="{camera_name(index)}">'
+            f'<img src="/images/{index}.jpg"></a></div>\n'
+        )
+    pagination = ''.join(
+        f'<a href="{directory_path(p)}" title="Page {p + 1}">{p + 1}</a>\n' for p in range(config.directory_pages)
+    )
+    head = f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="UTF-8"><title>Directory page {page + 1}</title></head>
+<body>
+<a href="/" title="Home">Home</a>
+<a href="/en/about.html" title="About">About</a>
+<a href="/en/contact.html">Contact</a>
+"""
+    tail = f'<div class="pagination">{pagination}</div>\n</body>\n</html>\n'
+    body = ''.join(cards)
+    return head + body + _padding(config, f"Directory {page + 1}", len(head) + len(body) + len(tail)) + tail
+
+# Concatenate directory pages (continuing past the site's own pages, so every camera link
+# is new) into one saved dump of at least size_bytes; returns the number of pages written
+def write_directory_dump(config, filename, size_bytes):
+    written = 0
+    page = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        while written < size_bytes:
+            written += f.write(render_directory_page(config, page))
+            page += 1
+    return page
+
+# The root links only the first directory page, so a crawler has to follow pagination
+# for the rest, plus an off-site link and a page robots.txt disallows
+def render_root_page(config):
+    return (
+        '<!DOCTYPE html>\n<html lang="en">\n<body>\n'
+        f'<a href="{directory_path(0)}" title="Webcams">Webcams</a>\n'
+        '<a href="/en/private/admin.html" title="Admin">Admin</a>\n'
+        '<a href="https://www.example.com/" title="Elsewhere">Elsewhere</a>\n'
+        '</body>\n</html>\n'
+    )
+
+ROBOTS_TXT = 'User-agent: *\nDisallow: /en/private/\n'
+
+# Stand-in for the YouTube poster host (i.ytimg.com/vi/<id>/hqdefault.jpg): a JPEG-shaped
+# body, distinct per video, of POSTER_KB
+POSTER_PATH_PATTERN = re.compile(r'^/vi/([A-Za-z0-9_-]+)/hqdefault\.jpg$')
+POSTER_KB = 24
+
+def render_poster(video_id):
+    block = hashlib.sha256(video_id.encode('utf-8')).digest()
+    return b'\xff\xd8\xff\xe0' + block * (POSTER_KB * 1024 // len(block)) + b'\xff\xd9'
+
+# Resolve a request path to (status, body: str, or bytes for an image) without any injected latency or errors
+def render_path(config, path):
+    path = path.split('?', 1)[0]
+    if path in ('/', '/en/', '/index.html'):
+        return 200, render_root_page(config)
+    if path == '/robots.txt':
+        return 200, ROBOTS_TXT
+    poster = POSTER_PATH_PATTERN.match(path)
+    if poster:
+        return 200, render_poster(poster.group(1))
+    for page in range(config.directory_pages):
+        if path == directory_path(page):
+            return 200, render_directory_page(config, page)
+    if path.startswith('/en/') and '/storm-cam-' in path:
+        try:
+            index = int(path.rsplit('-', 1)[1].split('.', 1)[0])
+        except ValueError:
+            return 404, 'Not Found'
+        if 0 <= index < config.camera_count and path == camera_path(index):
+            return 200, render_camera_page(config, index)
+    return 404, 'Not Found'
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        site = self.server.site
+        config = site.config
+        if config.latency_ms or config.latency_jitter_ms:
+            time.sleep((config.latency_ms + site.uniform(0, config.latency_jitter_ms)) / 1000)
+        roll = site.uniform(0, 1)
+        if roll < config.throttle_rate:
+            self._send(429, 'Too Many Requests', {'Retry-After': '1'})
+            return
+        if roll < config.throttle_rate + config.error_rate:
+            self._send(500, 'Internal Server Error')
+            return
+        status, body = render_path(config, self.path)
+        self._send(status, body)
+
+    def _send(self, status, body, headers=None):
+        binary = isinstance(body, bytes)
+        payload = body if binary else body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'image/jpeg' if binary else 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # Streaming clients hang up once they have the embed
+            pass
+        self.server.site.record(status, len(payload))
+
+    def log_message(self, format, *args):
+        logger.debug(f"mocksite: {format % args}")
+
+# A synthetic site served from a background thread on 127.0.0.1
+class MockSite:
+    def __init__(self, config=None, port=0):
+        self.config = config or SiteConfig()
+        self.port = port
+        self.server = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.rng = random.Random(self.config.seed)
+        self.requests = 0
+        self.bytes_served = 0
+        self.status_counts = {}
+
+    def uniform(self, low, high):
+        with self.lock:
+            return self.rng.uniform(low, high)
+
+    def record(self, status, size):
+        with self.lock:
+            self.requests += 1
+            self.bytes_served += size
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), MockSiteHandler)
+        self.server.daemon_threads = True
+        self.server.site = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Mock site serving {self.config.camera_count} cameras at {self.base_url}")
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'bytes_served': self.bytes_served, 'status_counts': dict(self.status_counts)}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
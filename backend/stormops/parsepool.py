@@ -0,0 +1,293 @@
+import logging
+import os
+import time
+from collections import deque
+from itertools import islice
+
+from . import config
+from .metrics import registry
+from .quarantine import MatchBudgetExceeded, quarantine
+from .records import CameraRow
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Rows a worker sends at a time, so a huge page is never held in one message
+ROW_BATCH_SIZE = 1000
+# How long a worker being recycled gets to exit before it is killed
+WORKER_EXIT_SECONDS = 5
+# Workers start from a fresh interpreter rather than a fork, so they inherit none of the
+# parent's threads, locks or store connection
+START_METHOD = 'spawn'
+
+# Why a page ended on the dead-letter list: it ran past its wall-clock limit, its worker
+# ran out of memory, its worker died, or the parser raised
+TIMEOUT = 'timeout'
+MEMORY = 'memory'
+CRASH = 'crash'
+ERROR = 'error'
+
+# A page its parse worker could not finish; recorded in the quarantine (stage 'parse')
+class ParseTaskFailed(Exception):
+    def __init__(self, reason, detail, elapsed, budget=None):
+        super().__init__(f"{reason}: {detail}")
+        self.reason = reason
+        self.elapsed = elapsed
+        self.budget = budget
+
+# Bytes of data segment (heap and anonymous maps) the process already has, from
+# /proc/self/status; 0 where that is not available
+def current_data_bytes():
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmData:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+# Let this process allocate at most megabytes more; past that allocations fail with
+# MemoryError. RLIMIT_DATA rather than RLIMIT_AS, so the read-only map of a large page does
+# not count against it. A no-op where the resource module or the limit is missing.
+def limit_data_size(megabytes):
+    try:
+        import resource
+    except ImportError:
+        return
+    if not megabytes or not hasattr(resource, 'RLIMIT_DATA'):
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    limit = current_data_bytes() + megabytes * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not limit parse worker memory: {str(e)}")
+
+def batched(rows, size=ROW_BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = [(row.url, row.name) for row in islice(rows, size)]
+        if not batch:
+            return
+        yield batch
+
+# The default task: the camera links of one saved directory page, as discover_file finds
+# them, in batches of (url, name)
+def parse_page(filepath, method='both', source=None):
+    from .pipeline import iter_extract_rows_mapped, iter_master_rows_mapped
+    from .quarantine import MatchBudget
+    from .sources import WEBCAMTAXI
+
+    source = source or WEBCAMTAXI
+    budget = MatchBudget(os.path.getsize(filepath))
+    if method in ('master', 'both'):
+        yield from batched(iter_master_rows_mapped(filepath, source.base, budget))
+    if method in ('extract', 'both'):
+        yield from batched(iter_extract_rows_mapped(filepath, source, budget))
+
+# Worker process: take the parent's settings, cap memory, report ready, then run tasks from
+# conn until told to stop. Every task ends with exactly one 'done', 'budget', 'unreadable', MEMORY or
+# ERROR message after its row batches; a MemoryError also ends the worker.
+def _work(conn, settings, target, memory_mb):
+    for name, value in settings.items():
+        setattr(config, name, value)
+    limit_data_size(memory_mb)
+    conn.send(('ready', None))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            for batch in target(*task):
+                conn.send(('rows', batch))
+        except MatchBudgetExceeded as e:
+            conn.send(('budget', (e.elapsed, e.budget)))
+        except MemoryError:
+            try:
+                conn.send((MEMORY, 'over the worker memory limit'))
+            finally:
+                return
+        except OSError as e:
+            conn.send(('unreadable', str(e)))
+        except Exception as e:
+            conn.send((ERROR, f"{type(e).__name__}: {str(e)}"))
+        else:
+            conn.send(('done', None))
+
+# config as it stands in the parent (command-line overrides included), for the workers
+def config_settings():
+    return {name: value for name, value in vars(config).items() if name.isupper()}
+
+class _Worker:
+    def __init__(self, context, settings, target, memory_mb):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_work, args=(child, settings, target, memory_mb), name='stormops-parse', daemon=True)
+        self.process.start()
+        child.close()
+        self.tasks = 0
+        self.filepath = None
+        self.started = None
+        self.deadline = None
+        self.added = 0
+        self.ready = False
+
+    def stop(self, kill=False):
+        if not kill:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(WORKER_EXIT_SECONDS)
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+# Saved pages parsed in a supervised pool of worker processes. Each page gets a wall-clock
+# limit (PARSE_TIMEOUT_SECONDS plus so much per MB) after which its worker is killed, and
+# each worker a memory cap; a worker is replaced after PARSE_TASKS_PER_WORKER pages so
+# whatever it leaked goes with it. A page whose worker times out, runs out of memory,
+# crashes or raises goes on the dead-letter list: the quarantine, with stage 'parse', so
+# later runs skip it until it changes. The rows a page yielded before it failed are kept.
+# A page over its match budget is quarantined as discover_file would. One poisonous page
+# ties up one worker for at most its limit while the others carry on.
+class ParsePool:
+    def __init__(self, workers=None, timeout=None, memory_mb=None, tasks_per_worker=None, target=parse_page):
+        # multiprocessing is only imported by runs that parse in workers
+        import multiprocessing
+
+        self.workers = max(1, workers or config.PARSE_WORKERS)
+        self.timeout = timeout
+        self.memory_mb = memory_mb if memory_mb is not None else config.PARSE_WORKER_MEMORY_MB
+        self.tasks_per_worker = tasks_per_worker or config.PARSE_TASKS_PER_WORKER
+        self.target = target
+        self.context = multiprocessing.get_context(START_METHOD)
+        self.settings = None
+        self.idle = []
+        self.busy = {}
+        self.dead_letters = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for worker in self.idle:
+            worker.stop()
+        for worker in self.busy.values():
+            worker.stop(kill=True)
+        self.idle = []
+        self.busy = {}
+
+    def task_timeout(self, filepath):
+        if self.timeout is not None:
+            return self.timeout
+        try:
+            megabytes = os.path.getsize(filepath) / (1024 * 1024)
+        except OSError:
+            megabytes = 0
+        return config.PARSE_TIMEOUT_SECONDS + config.PARSE_TIMEOUT_SECONDS_PER_MB * megabytes
+
+    def _assign(self, filepath, task):
+        if self.idle:
+            worker = self.idle.pop()
+        else:
+            worker = _Worker(self.context, self.settings, self.target, self.memory_mb)
+            registry.inc('parse_workers_started_total')
+        worker.conn.send(task)
+        worker.filepath = filepath
+        worker.started = time.monotonic()
+        worker.deadline = worker.started + self.task_timeout(filepath)
+        worker.added = 0
+        self.busy[worker.conn] = worker
+
+    # A task is over: record how, then put its worker back, recycle it or (after a failure
+    # that may have left it in a bad state) stop it
+    def _finish(self, worker, result, detail=None, store=None):
+        elapsed = time.monotonic() - worker.started
+        del self.busy[worker.conn]
+        if result == CRASH and not worker.ready:
+            # Not the page's fault: no worker can start, so stop rather than dead-letter every page
+            worker.stop(kill=True)
+            raise RuntimeError(f"Parse worker could not start ({detail})")
+        worker.tasks += 1
+        registry.inc('parse_tasks_total', labels={'result': result})
+        registry.observe('stage_seconds', elapsed, labels={'stage': 'parse'})
+        if result == 'budget':
+            quarantine.add(worker.filepath, 'discover', MatchBudgetExceeded(*detail))
+        elif result == 'unreadable':
+            logger.error(f"Failed to read {worker.filepath}: {detail}")
+        elif result != 'done':
+            budget = self.task_timeout(worker.filepath) if result == TIMEOUT else None
+            quarantine.add(worker.filepath, 'parse', ParseTaskFailed(result, detail, elapsed, budget))
+            self.dead_letters.append({'path': worker.filepath, 'reason': result, 'detail': detail})
+        store.commit()
+        logger.info(f"Discovered {worker.added} new URLs in {worker.filepath}")
+        filepath, added = worker.filepath, worker.added
+        if result in ('done', 'budget', 'unreadable', ERROR) and worker.tasks < self.tasks_per_worker:
+            worker.filepath = None
+            self.idle.append(worker)
+        else:
+            worker.stop(kill=result in (TIMEOUT, MEMORY, CRASH))
+        return filepath, added
+
+    # Everything the worker has sent so far; returns the task's end (result, detail), or
+    # None while it is still running
+    def _drain(self, worker, store):
+        try:
+            while worker.conn.poll():
+                kind, payload = worker.conn.recv()
+                if kind == 'rows':
+                    worker.added += store.add_urls(CameraRow(url, name) for url, name in payload)
+                elif kind == 'ready':
+                    worker.ready = True
+                else:
+                    return kind, payload
+        except (EOFError, OSError):
+            worker.process.join(WORKER_EXIT_SECONDS)
+            return CRASH, f"worker exited with code {worker.process.exitcode}"
+        return None
+
+    # Stream the links of saved directory pages into store (or a Frontier in front of it),
+    # yielding (filepath, new URLs) for each page as it finishes, in completion order.
+    # Quarantined pages are skipped (and yielded with 0).
+    def discover(self, filepaths, store, method='both', source=None):
+        from multiprocessing.connection import wait
+
+        if self.settings is None:
+            self.settings = config_settings()
+        pending = deque()
+        for filepath in filepaths:
+            if quarantine.contains(filepath):
+                logger.warning(f"Skipping quarantined page {filepath}")
+                yield filepath, 0
+            else:
+                pending.append(filepath)
+        while pending or self.busy:
+            while pending and len(self.busy) < self.workers:
+                filepath = pending.popleft()
+                logger.info(f"Processing {filepath}")
+                self._assign(filepath, (filepath, method, source))
+            now = time.monotonic()
+            timeout = max(0, min(worker.deadline for worker in self.busy.values()) - now)
+            waitables = list(self.busy) + [worker.process.sentinel for worker in self.busy.values()]
+            ready = set(wait(waitables, timeout))
+            for worker in list(self.busy.values()):
+                if worker.conn in ready or worker.process.sentinel in ready:
+                    end = self._drain(worker, store)
+                    if end is None and not worker.process.is_alive():
+                        end = self._drain(worker, store) or (CRASH, f"worker exited with code {worker.process.exitcode}")
+                    if end is not None:
+                        yield self._finish(worker, *end, store=store)
+                        continue
+                if time.monotonic() > worker.deadline:
+                    end = self._drain(worker, store) or (TIMEOUT, f"still parsing after {self.task_timeout(worker.filepath):.0f}s")
+                    yield self._finish(worker, *end, store=store)
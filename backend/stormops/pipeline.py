@@ -0,0 +1,674 @@
+import hashlib
+import io
+import logging
+import os
+import re
+from urllib.parse import urlparse
+
+from . import config
+from .checkpoint import PREVIOUS_SUFFIX, Checkpointer, atomic_write, validated_path, write_checkpoint
+from .delta import DELTA_COLUMNS, RunDelta
+from .events import publish_change
+from .fetcher import fetch_embed, fetch_html, fetch_many, permanent_status, rate_controller
+from .frontier import Frontier
+from .html_verify import CountingWriter, load_manifest, manifest_entry, record_manifest_entries, save_manifest, verify_html_file
+from .mmapscan import compile_bytes_patterns, iter_mapped_matches, iter_mapped_window_matches, search_mapped
+from .metrics import PIPELINE_STAGES, JsonSnapshotter, registry, run_profiled, start_metrics_server, timed
+from .parsepool import ParsePool
+from .priority import YieldOrder
+from .quarantine import MatchBudget, MatchBudgetExceeded, quarantine
+from .records import FAILED, CameraRow, EmbedResult, result_status
+from .retries import RetryQueue
+from .sources import WEBCAMTAXI, name_from_path, source_for_url
+from .store import PipelineStore
+from .streamscan import iter_matches, iter_windows
+from .tables import iter_table, table_format, write_table
+from .templates import CARD, PAGE_HEAD, PAGE_TAIL, layout_hash, stylesheet_name, write_stylesheet
+from .thumbnails import thumbnail_path
+
+logger = logging.getLogger(__name__)
+
+# Sanitize URL or name for filename
+def sanitize_for_filename(text):
+    return re.sub(r'[^\w\-_\.]', '_', text).strip('_')
+
+# Stream the page into a CountingWriter, counting embeds as each card is emitted. The page
+# links the shared stylesheet (templates.write_stylesheet puts it next to the page); a
+# YouTube card carries its /thumbnails/ poster URL in data-poster.
+def write_all_webcams_html(writer, webcams, title='All Webcams'):
+    writer.write(PAGE_HEAD.render(title=title, stylesheet=stylesheet_name()))
+    for webcam in webcams:
+        writer.write_card(CARD.render(name=webcam.name, embed_code=webcam.embed_code, poster=thumbnail_path(webcam.embed_code)), webcam.embed_code)
+    writer.write(PAGE_TAIL)
+    return writer
+
+def create_all_webcams_html(webcams):
+    buffer = io.StringIO()
+    write_all_webcams_html(CountingWriter(buffer), webcams)
+    return buffer.getvalue()
+
+# Write the gallery page into f. Its embed count and size go into entries under the page's
+# basename, for the caller to put in the manifest once the page is published.
+@timed('render')
+def write_gallery(f, webcams, filename, entries):
+    write_stylesheet(os.path.dirname(filename) or '.')
+    writer = write_all_webcams_html(CountingWriter(f), webcams)
+    entries[os.path.basename(filename)] = manifest_entry(writer.embed_count, writer.bytes_written)
+    return writer.embed_count
+
+# Record the gallery pages of a checkpoint in their manifest, leaving out any whose write
+# or rename failed
+def record_gallery_pages(directory, entries, failed):
+    failed = {os.path.basename(path) for path in failed}
+    record_manifest_entries(directory, {basename: entry for basename, entry in entries.items() if basename not in failed})
+
+# Function to save the HTML file atomically and record its embed count in the manifest.
+# webcams may be any iterable (e.g. store.iter_webcams()); it is consumed once.
+def save_webcams_html(webcams, filename):
+    logger.debug(f"Saving HTML file: {filename}")
+    entries = {}
+    try:
+        failed = write_checkpoint({filename: lambda f: write_gallery(f, webcams, filename, entries)})
+        record_gallery_pages(os.path.dirname(filename), entries, failed)
+        if not failed:
+            logger.info(f"Saved all webcams to {filename}")
+    except Exception as e:
+        logger.error(f"Failed to save all webcams HTML to {filename}: {str(e)}")
+
+# Checkpoint writer for a table; the format follows the file name (.csv, .json, .ndjson)
+def table_writer(path, rows, columns):
+    return lambda f: write_table(f, rows, columns, table_format(path))
+
+# Stream rows from the last good checkpoint of a table; empty if there is no valid generation
+def iter_checkpointed_table(path):
+    valid_path = validated_path(path)
+    if valid_path is None:
+        return
+    try:
+        yield from iter_table(valid_path, table_format(path))
+    except Exception as e:
+        logger.warning(f"Failed to read table {valid_path}: {str(e)}")
+
+# Open the run's store, seeding it from the URL and results tables of an earlier run
+def open_store(path=None):
+    store = PipelineStore(path)
+    if store.url_count() == 0:
+        added = store.add_urls(CameraRow.from_row(row) for row in iter_checkpointed_table(config.INPUT_CSV) if row.get('URL'))
+        if added:
+            logger.info(f"Loaded {added} URLs from {config.INPUT_CSV}")
+    if store.result_count() == 0:
+        added = store.add_results(EmbedResult.from_row(row) for row in iter_checkpointed_table(config.OUTPUT_CSV) if row.get('URL'))
+        if added:
+            logger.info(f"Loaded {added} processed URLs from {config.OUTPUT_CSV}")
+    store.commit()
+    return store
+
+# Export the URL table from the store
+def export_urls(store):
+    write_checkpoint({config.INPUT_CSV: table_writer(config.INPUT_CSV, store.iter_urls(), config.URL_COLUMNS)})
+
+# Export the results table and the gallery page from the store, streaming both, plus the
+# delta of cameras new, changed or removed since the last export (config.DELTA_FILE). The
+# exported snapshot only moves on once the results table and the delta have both been
+# written; otherwise the same changes are in the next export's delta.
+def export_results(store, all_webcams_filename):
+    gallery_entries = {}
+    writers = {
+        config.OUTPUT_CSV: table_writer(config.OUTPUT_CSV, store.iter_results(), config.RESULT_COLUMNS),
+        all_webcams_filename: lambda f: write_gallery(f, store.iter_webcams(), all_webcams_filename, gallery_entries),
+    }
+    delta = RunDelta(store) if config.DELTA_FILE else None
+    if delta is not None:
+        writers[config.DELTA_FILE] = table_writer(config.DELTA_FILE, delta.rows(), DELTA_COLUMNS)
+    failed = write_checkpoint(writers)
+    record_gallery_pages(os.path.dirname(all_webcams_filename), gallery_entries, failed)
+    if delta is not None:
+        if config.OUTPUT_CSV in failed or config.DELTA_FILE in failed:
+            logger.warning("Export incomplete, keeping the delta for the next export")
+        else:
+            delta.commit()
+    return delta
+
+# Read last log lines for display
+def get_last_log_lines():
+    try:
+        with open(config.LOG_FILE, 'r') as f:
+            lines = f.readlines()
+            return lines[-config.MAX_LOG_LINES_DISPLAY:] if len(lines) > config.MAX_LOG_LINES_DISPLAY else lines
+    except Exception:
+        return []
+
+# [^<>] rather than [^>]: an unclosed <a stops at the next tag instead of rescanning the page
+A_TAG_PATTERN = re.compile(r'<a\s[^<>]+>')
+HREF_PATTERN = re.compile(r'href\s*=\s*["\']?([^"\s>]+)["\']?')
+TITLE_PATTERN = re.compile(r'title="([^"]+)"')
+# Longest <a ...> tag or nspArt block we try to match across a chunk boundary
+MAX_LINK_LENGTH = 4096
+MAX_RECENT_LINKS = 10000
+
+# Function from regex_master.py: yield a CameraRow for every <a> tag with an href and a title
+def rows_from_tags(tags, base_url=None):
+    base_url = base_url or config.BASE_URL
+    for tag in tags:
+        href_match = HREF_PATTERN.search(tag)
+        title_match = TITLE_PATTERN.search(tag)
+        if not (href_match and title_match):
+            continue
+        href = href_match.group(1)
+        full_url = base_url + href if href.startswith('/') else href
+        yield CameraRow(full_url, title_match.group(1))
+
+# Master rows from a document given as text chunks
+def iter_master_rows(chunks, base_url=None):
+    return rows_from_tags((match.group(0) for match in iter_matches(chunks, A_TAG_PATTERN, MAX_LINK_LENGTH)), base_url)
+
+# Master rows from a saved file, matched as bytes in place; only the tags are decoded
+def iter_master_rows_mapped(filepath, base_url=None, budget=None):
+    [a_tag_bytes] = compile_bytes_patterns((A_TAG_PATTERN.pattern,), 0)
+    tags = (match.group(0).decode('utf-8', errors='replace') for match in iter_mapped_matches(filepath, a_tag_bytes, MAX_LINK_LENGTH, budget=budget))
+    return rows_from_tags(tags, base_url)
+
+@timed('parse')
+def process_master(html, progress, task_id, base_url=None):
+    data = list(iter_master_rows([html], base_url))
+    logger.info(f"Master processing complete: {len(data)} valid tags processed")
+    progress.update(task_id, advance=1)
+    return data
+
+# Link patterns and camera path shape of the default (webcamtaxi) source
+EXTRACT_PATTERNS = WEBCAMTAXI.discovery_patterns
+CAMERA_PATH_PATTERN = WEBCAMTAXI.camera_path_pattern
+
+# Function from regex_extract.py: yield a row per webcam link of source (webcamtaxi by
+# default). Overlapping windows and agreeing patterns repeat links, so repeats are dropped
+# with a set of recent paths; it is cleared when full, keeping memory flat, and the store
+# ignores whatever slips through.
+def rows_from_camera_links(links, source=None):
+    source = source or WEBCAMTAXI
+    seen = set()
+    for link in links:
+        url = source.camera_path(link)
+        if url is None or url in seen:
+            continue
+        if len(seen) >= MAX_RECENT_LINKS:
+            seen.clear()
+        seen.add(url)
+        yield CameraRow(f"{source.base}{url}", name_from_path(url))
+
+# Extract rows from a document given as text chunks
+def iter_extract_rows(chunks, source=None):
+    source = source or WEBCAMTAXI
+    return rows_from_camera_links(
+        (match.group(1) for window in iter_windows(chunks, MAX_LINK_LENGTH) for pattern in source.discovery_patterns for match in pattern.finditer(window)),
+        source
+    )
+
+# Extract rows from a saved file, matched as bytes in place; only the links are decoded
+def iter_extract_rows_mapped(filepath, source=None, budget=None):
+    source = source or WEBCAMTAXI
+    patterns = compile_bytes_patterns(tuple(pattern.pattern for pattern in source.discovery_patterns), re.MULTILINE | re.IGNORECASE)
+    return rows_from_camera_links(
+        (match.group(1).decode('utf-8', errors='replace') for match in iter_mapped_window_matches(filepath, patterns, MAX_LINK_LENGTH, budget=budget)),
+        source
+    )
+
+@timed('parse')
+def process_extract(html, progress, task_id):
+    data = sorted({row.url: row for row in iter_extract_rows([html])}.values(), key=lambda row: row.url)
+    logger.info(f"Extract processing complete: {len(data)} webcam URLs found")
+    progress.update(task_id, advance=1)
+    return data
+
+# Stream the links of a saved directory page straight into the store (or a Frontier in
+# front of it), scanning the file through a memory map (one pass per link method);
+# returns how many URLs were new. A page that runs over its match budget is quarantined,
+# keeping the links found before that, and skipped by later runs.
+@timed('parse')
+def discover_file(filepath, store, method='both', source=None):
+    source = source or WEBCAMTAXI
+    added = 0
+    if quarantine.contains(filepath):
+        logger.warning(f"Skipping quarantined page {filepath}")
+        return added
+    budget = MatchBudget(os.path.getsize(filepath))
+    try:
+        if method in ('master', 'both'):
+            added += store.add_urls(iter_master_rows_mapped(filepath, source.base, budget))
+        if method in ('extract', 'both'):
+            added += store.add_urls(iter_extract_rows_mapped(filepath, source, budget))
+    except MatchBudgetExceeded as e:
+        quarantine.add(filepath, 'discover', e)
+    store.commit()
+    logger.info(f"Discovered {added} new URLs in {filepath}")
+    return added
+
+# discover_file over several saved pages, yielding each page once it is done. With
+# config.PARSE_WORKERS the pages are parsed in a supervised pool of worker processes
+# (stormops.parsepool), so a page that hangs, runs out of memory or crashes costs a worker
+# and a dead-letter entry rather than the run; otherwise they are parsed here in turn.
+def discover_files(filepaths, store, method='both', source=None):
+    if config.PARSE_WORKERS:
+        with ParsePool() as pool:
+            for filepath, _ in pool.discover(filepaths, store, method, source):
+                yield filepath
+        return
+    for filepath in filepaths:
+        logger.info(f"Processing {filepath}")
+        try:
+            discover_file(filepath, store, method, source)
+        except OSError as e:
+            logger.error(f"Failed to read {filepath}: {str(e)}")
+        yield filepath
+
+# Function to extract embed codes from HTML
+@timed('extract')
+def extract_embed_code(html):
+    for pattern in config.VIDEO_PATTERNS:
+        match = re.search(pattern, html, re.IGNORECASE)
+        if match:
+            return match.group(0)
+    return None
+
+# Cache file for a fetched page; pages of sources other than the default are prefixed with
+# the source name so the same path on two sites doesn't collide
+def cache_path_for(url):
+    source = source_for_url(url)
+    prefix = '' if source is WEBCAMTAXI else f"{source.name}_"
+    return os.path.join(config.HTML_CACHE_DIR, prefix + sanitize_for_filename(urlparse(url).path))
+
+# Embed code of a saved page, scanning its bytes in place and decoding only the match;
+# same pattern order and result as extract_embed_code(open(filepath).read()). Raises
+# MatchBudgetExceeded if the page runs over its budget.
+@timed('extract')
+def extract_embed_code_from_file(filepath, patterns=None, budget=None):
+    budget = budget or MatchBudget(os.path.getsize(filepath))
+    return search_mapped(filepath, compile_bytes_patterns(tuple(patterns or config.VIDEO_PATTERNS)), budget)
+
+# Embed code of a page already in the HTML cache, '' if it has none, or None if it was
+# never cached or is quarantined (so it is fetched and streamed instead)
+def extract_cached(url):
+    html_filename = cache_path_for(url)
+    if not os.path.exists(html_filename) or quarantine.contains(html_filename):
+        return None
+    try:
+        return extract_embed_code_from_file(html_filename, source_for_url(url).embed_patterns()) or ''
+    except MatchBudgetExceeded as e:
+        quarantine.add(html_filename, 'extract', e)
+        return None
+
+# Fetch one page and return its embed code, using the embed patterns of the URL's source.
+# In streaming mode the body is scanned as it arrives and, with caching off, the download
+# stops at the first embed. With REUSE_CACHE a page already in the cache is scanned from
+# disk instead of being downloaded again. attempts goes to fetcher.send_request.
+def fetch_and_extract(url, attempts=None):
+    source = source_for_url(url)
+    if config.REUSE_CACHE:
+        embed_code = extract_cached(url)
+        if embed_code is not None:
+            logger.debug(f"Replayed {url} from {cache_path_for(url)}")
+            return embed_code or None
+    if config.STREAM_FETCH:
+        embed_code, bytes_read = fetch_embed(url, source.embed_patterns(), cache_path_for(url) if config.CACHE_HTML else None, attempts)
+        logger.debug(f"Streamed {bytes_read} bytes from {url}")
+        return embed_code
+    html = fetch_html(url, attempts)
+    if config.CACHE_HTML:
+        html_filename = cache_path_for(url)
+        logger.debug(f"Saving HTML to: {html_filename}")
+        try:
+            with atomic_write(html_filename) as f:
+                f.write(html)
+            logger.info(f"Saved HTML to {html_filename}")
+        except Exception as e:
+            logger.error(f"Failed to save HTML to {html_filename}: {str(e)}")
+    with registry.stage('extract'):
+        return source.extract_embed(html)
+
+# One try per fetch; the retry queue takes it from there. A page the site answers with a
+# lasting client error (404, 410, ...) is recorded as having no embed, due again after
+# that state's TTL, instead of going on the retry queue.
+def fetch_once(url):
+    try:
+        return fetch_and_extract(url, attempts=1)
+    except Exception as e:
+        status = permanent_status(e)
+        if status is None:
+            raise
+        logger.warning(f"{url} answered HTTP {status}, recording it as having no embed")
+        return None
+
+# Function from regex_slave.py: fetch every URL in the store that has no result yet (or
+# the given rows, e.g. from a running crawl) and write each result straight back to it as
+# success, no embed or failed. Pending URLs go most-likely-embed first (config.FETCH_ORDER,
+# stormops.priority), so a run cut short has found most of the embeds. Each fetch is tried
+# once; a failure goes on the store's retry queue with backoff and comes back round between
+# healthy URLs (stormops.retries). refresh also refetches results past their TTL. Camera
+# add/update/remove events go to the in-process bus for the live feed (stormops.events). Only the
+# fetch window is held in memory; the store is committed on the checkpoint cadence so an
+# interrupted run resumes from there.
+def process_slave(store, progress, task_id, rows=None, refresh=False):
+    from rich import print as rprint
+
+    valid_embeds = 0
+    skipped_urls = 0
+    failed_urls = 0
+
+    urls_pending = None
+    order = None
+    if rows is None:
+        urls_pending = store.pending_count()
+        logger.info(f"Found {urls_pending} unprocessed URLs to scrape")
+        registry.set_gauge('urls_pending', urls_pending)
+        if config.FETCH_ORDER == 'yield':
+            rows = order = YieldOrder(store)
+        else:
+            rows = store.iter_pending()
+    queue = RetryQueue(store, rows, refresh)
+
+    checkpointer = Checkpointer()
+    sub_task = progress.add_task("[cyan]Processing URLs for video embeds...", total=urls_pending)
+    try:
+        for retry_pass in queue.passes():
+            for url, name, embed_code, error in fetch_many(((row.url, row.name) for row in retry_pass), fetch=fetch_once):
+                logger.debug(f"Processing URL: {url} (Name: {name})")
+
+                if error is not None:
+                    logger.error(f"Failed to fetch {url}, queued for retry: {str(error)}")
+                    failed_urls += 1
+                else:
+                    logger.info(f"Successfully fetched HTML from {url}")
+                    logger.debug(f"embed_code: {'Found' if embed_code else 'Not found'}")
+                    if embed_code:
+                        logger.debug(f"Extracted embed code: {embed_code}")
+                        rprint(f"[green]Successfully extracted embed code for {name}[/green]")
+                        valid_embeds += 1
+                    else:
+                        logger.debug("No video iframe found for this URL")
+                        skipped_urls += 1
+                previous = store.result_for(url) if error is None else None
+                store.add_result(url, name, embed_code, failed=error is not None)
+                queue.done(url)
+                if error is None:
+                    publish_change(previous, url, name, embed_code)
+                registry.inc('fetch_results_total', labels={'status': result_status(embed_code, error is not None)})
+                if order is not None and error is None:
+                    order.observe(url, name, embed_code)
+
+                if urls_pending:
+                    urls_pending -= 1
+                    registry.set_gauge('urls_pending', urls_pending)
+                checkpointer.mark()
+                if checkpointer.due():
+                    with registry.stage('persist'):
+                        store.commit()
+                    checkpointer.reset()
+                    logger.debug(f"Committed progress to {store.path}")
+                progress.update(sub_task, advance=1)
+    finally:
+        # Keep whatever was fetched, including on KeyboardInterrupt
+        store.commit()
+
+    if queue.retried:
+        logger.info(f"Retried {queue.retried} failed URLs from the retry queue")
+    progress.update(task_id, advance=1)
+    return valid_embeds, skipped_urls, failed_urls
+
+# HTML files named directly or found (non-recursively) in the given directories
+def iter_html_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                if filename.endswith('.html'):
+                    yield os.path.join(path, filename)
+        elif os.path.exists(path):
+            yield path
+        else:
+            logger.warning(f"{path} does not exist")
+
+# Extract embeds from saved pages without any network access; the file name stands in for the URL
+def iter_extract_files(paths):
+    for filepath in iter_html_files(paths):
+        if quarantine.contains(filepath):
+            logger.warning(f"Skipping quarantined page {filepath}")
+            continue
+        try:
+            embed_code = extract_embed_code_from_file(filepath)
+        except OSError as e:
+            logger.error(f"Failed to process {filepath}: {str(e)}")
+            continue
+        except MatchBudgetExceeded as e:
+            quarantine.add(filepath, 'extract', e)
+            continue
+        if embed_code:
+            logger.info(f"Extracted embed code from {filepath}")
+        else:
+            logger.warning(f"No embed code found in {filepath}")
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        yield EmbedResult(filepath, name, embed_code, result_status(embed_code))
+
+# Re-extract every URL whose page is in the HTML cache, without fetching
+def iter_replayed(rows):
+    for row in rows:
+        embed_code = extract_cached(row.url)
+        if embed_code is not None:
+            yield EmbedResult(row.url, row.name, embed_code or None, result_status(embed_code))
+
+# Gallery cards for every result row (a table dict) that has an embed
+def webcams_from_results(rows):
+    for row in rows:
+        if isinstance(row.get('Embed_Code'), str) and row['Embed_Code']:
+            yield EmbedResult.from_row(row)
+
+BATCH_PAGE_PATTERN = re.compile(r'^webcams_(\d+)\.html$')
+
+def batch_page_number(filename):
+    match = BATCH_PAGE_PATTERN.match(os.path.basename(filename))
+    return int(match.group(1)) if match else 0
+
+# Content hash of one batch page: its cameras in order plus the page layout, so a changed
+# name, embed or template all show up as a different hash
+def batch_page_hash(webcams):
+    digest = hashlib.sha256(layout_hash().encode('utf-8'))
+    for webcam in webcams:
+        digest.update(f"\0{webcam.url}\0{webcam.name}\0{webcam.embed_code}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+# Page membership for this build: cameras stay on the page the manifest has them on (in
+# the same order), cameras gone from the results drop off their page, and new cameras top
+# up the last page and then start new ones. Returns {basename: [webcam, ...]} by page number.
+def assign_batch_pages(webcams, batch_size, previous):
+    home = {url: basename for basename, entry in previous.items() for url in entry['cameras']}
+    members = {basename: {} for basename in previous}
+    new = []
+    for webcam in webcams:
+        basename = home.get(webcam.url)
+        if basename is None:
+            new.append(webcam)
+        else:
+            members[basename][webcam.url] = webcam
+    pages = {basename: [members[basename][url] for url in previous[basename]['cameras'] if url in members[basename]]
+             for basename in sorted(previous, key=batch_page_number)}
+    last = max(previous, key=batch_page_number, default=None)
+    number = batch_page_number(last) if last else 0
+    if last and len(pages[last]) < batch_size:
+        room = batch_size - len(pages[last])
+        pages[last].extend(new[:room])
+        new = new[room:]
+    for start in range(0, len(new), batch_size):
+        number += 1
+        pages[f"webcams_{number}.html"] = new[start:start + batch_size]
+    return pages
+
+# Split the gallery into pages of batch_size cameras (webcams_1.html, ...), rewriting only
+# the pages whose cameras changed. Membership and a content hash per page are kept under
+# 'pages' in the gallery manifest; an unchanged page is not opened, so its mtime stays put
+# and rsync or a CDN sync only sees the pages that really changed. A page left with no
+# cameras is deleted, and a different batch_size repartitions everything. Returns the page
+# paths in order.
+def save_batch_pages(webcams, batch_size, directory=None):
+    directory = directory or config.WEBCAM_DIR
+    manifest = load_manifest(directory)
+    previous = manifest.get('pages', {})
+    if manifest.get('batch_size') != batch_size:
+        previous = {}
+    pages = assign_batch_pages(webcams, batch_size, previous)
+    writers = {}
+    entries = {}
+    written = {}
+    for basename, batch in pages.items():
+        if not batch:
+            continue
+        filename = os.path.join(directory, basename)
+        digest = batch_page_hash(batch)
+        entries[basename] = {'cameras': [webcam.url for webcam in batch], 'hash': digest}
+        recorded = manifest['files'].get(basename, {})
+        old = previous.get(basename, {})
+        if old.get('hash') != digest or not os.path.exists(filename) or recorded.get('Bytes') != os.path.getsize(filename):
+            writers[filename] = lambda f, batch=batch, filename=filename: write_gallery(f, batch, filename, written)
+    removed = [basename for basename in set(previous) | set(manifest.get('pages', {})) if basename not in entries]
+    failed = write_checkpoint(writers) if writers else []
+    for path in failed:
+        # Not published: no hash, so the next build writes it again
+        entries[os.path.basename(path)].pop('hash', None)
+        written.pop(os.path.basename(path), None)
+    for basename in removed:
+        filename = os.path.join(directory, basename)
+        for path in (filename, filename + PREVIOUS_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+    manifest['files'].update(written)
+    for basename in removed:
+        manifest['files'].pop(basename, None)
+    manifest['batch_size'] = batch_size
+    manifest['pages'] = entries
+    save_manifest(directory, manifest)
+    registry.inc('gallery_pages_total', len(written), labels={'result': 'written'})
+    registry.inc('gallery_pages_total', len(entries) - len(writers), labels={'result': 'unchanged'})
+    registry.inc('gallery_pages_total', len(failed), labels={'result': 'failed'})
+    registry.inc('gallery_pages_total', len(removed), labels={'result': 'removed'})
+    logger.info(f"Gallery pages: {len(written)} rewritten, {len(entries) - len(writers)} unchanged, {len(failed)} failed, {len(removed)} removed")
+    return [os.path.join(directory, basename) for basename in entries]
+
+# Main processing function: stream every saved directory page into the store, fetch what
+# is pending after each one, then export the results table and gallery from the store
+def main():
+    from rich import print as rprint
+    from rich.panel import Panel
+    from rich.progress import Progress
+    from rich.table import Table
+
+    config.ensure_directories()
+    all_webcams_filename = os.path.join(config.WEBCAM_DIR, config.GALLERY_FILENAME)
+    total_valid_embeds = 0
+    total_skipped_urls = 0
+    total_failed_urls = 0
+
+    if os.path.exists(config.UNPARSED_DIR):
+        html_files = list(iter_html_files([config.UNPARSED_DIR]))
+        logger.info(f"Found {len(html_files)} HTML files in {config.UNPARSED_DIR}")
+    else:
+        logger.warning(f"{config.UNPARSED_DIR} does not exist")
+        html_files = [config.RAW_PAGE_HTML] if os.path.exists(config.RAW_PAGE_HTML) else []
+
+    store = open_store()
+    frontier = Frontier(store)
+    try:
+        with Progress() as progress:
+            task_files = progress.add_task("[cyan]Processing saved directory pages...", total=len(html_files))
+            for _ in discover_files(html_files, frontier):
+                progress.update(task_files, advance=1)
+            export_urls(store)
+
+            total_valid_embeds, total_skipped_urls, total_failed_urls = process_slave(store, progress, task_files)
+
+        # Final export of the results table and gallery, streamed from the store
+        delta = export_results(store, all_webcams_filename)
+        logger.info(f"Final results saved to {config.OUTPUT_CSV}")
+        results_total = store.result_count()
+        retry_queue = store.status_counts().get(FAILED, 0)
+    finally:
+        store.close()
+
+    # Verify HTML file (served from the manifest written alongside it, no reread)
+    verification_results = [verify_html_file(all_webcams_filename)] if os.path.exists(all_webcams_filename) else []
+
+    # Create summary table
+    table = Table(title="Processing Summary", style="cyan", header_style="bold green")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="green")
+    table.add_row("Total URLs Processed", str(results_total))
+    table.add_row("Duplicate URLs Skipped", str(frontier.duplicates))
+    table.add_row("Valid Embed Codes Found", str(total_valid_embeds))
+    table.add_row("URLs Without Embeds", str(total_skipped_urls))
+    table.add_row("Failed Fetches", str(total_failed_urls))
+    table.add_row("URLs Queued for Retry", str(retry_queue))
+    dead_letters = [entry for entry in quarantine.added if entry['stage'] == 'parse']
+    if len(quarantine.added) > len(dead_letters):
+        table.add_row("Pages Quarantined", f"{len(quarantine.added) - len(dead_letters)} (see {quarantine.filename})")
+    if dead_letters:
+        table.add_row("Pages Dead-Lettered", f"{len(dead_letters)} by parse workers (see {quarantine.filename})")
+    if delta is not None:
+        table.add_row("Changes Since Last Run", f"{delta.counts['new']} new, {delta.counts['changed']} changed, {delta.counts['removed']} removed ({config.DELTA_FILE})")
+    table.add_row("Output CSV", config.OUTPUT_CSV)
+    table.add_row("Store", config.STORE_DB)
+    table.add_row("HTML Cache Directory", config.HTML_CACHE_DIR)
+    table.add_row("Webcam Directory", config.WEBCAM_DIR)
+    table.add_row("UnParsed Directory", config.UNPARSED_DIR)
+    for host, stats in rate_controller.snapshot().items():
+        table.add_row(f"Fetch Rate ({host})", f"{stats['requests']} requests, {stats['failures']} failed, {stats['throttled']} throttled, concurrency {stats['concurrency']}, delay {stats['delay']}s, circuit {stats['breaker']}")
+    rprint(table)
+
+    # Create verification table
+    if verification_results:
+        verify_table = Table(title="HTML File Verification", style="cyan", header_style="bold green")
+        verify_table.add_column("File", style="cyan")
+        verify_table.add_column("Embed Count", style="green")
+        for result in verification_results:
+            verify_table.add_row(result['File'], str(result['Embed Count']))
+        rprint(verify_table)
+
+    # Per-stage timings so a slow run can be attributed to network, regex or persistence
+    stage_summary = registry.stage_summary()
+    if stage_summary:
+        timing_table = Table(title="Stage Timings", style="cyan", header_style="bold green")
+        for column in ["Stage", "Calls", "Total (s)", "p50 (s)", "p95 (s)"]:
+            timing_table.add_column(column, style="green")
+        for stage_name in [s for s in PIPELINE_STAGES if s in stage_summary]:
+            stats = stage_summary[stage_name]
+            timing_table.add_row(stage_name, str(stats['count']), str(stats['total_seconds']), f"{stats['p50_seconds']:.4f}", f"{stats['p95_seconds']:.4f}")
+        rprint(timing_table)
+
+    # Display last log lines in a sleek panel
+    log_lines = get_last_log_lines()
+    log_content = "".join(log_lines).strip()
+    rprint(Panel(log_content, title="System Logs", border_style="green", expand=False, style="cyan"))
+
+    # Print success message
+    rprint(f"[green bold]✔ Processing complete! Data saved to {config.OUTPUT_CSV} and {all_webcams_filename}[/green bold]")
+
+# Run target (main() by default) with the optional metrics endpoint, JSON snapshots and
+# profiler around it, and optionally the gallery with its live camera feed on serve_port
+def run(metrics_port=None, metrics_snapshot=None, profile=None, target=None, serve_port=None):
+    target = target or main
+    metrics_port = config.METRICS_PORT if metrics_port is None else metrics_port
+    metrics_snapshot = config.METRICS_SNAPSHOT_FILE if metrics_snapshot is None else metrics_snapshot
+    profile = profile or config.PROFILE_MODE
+    server = start_metrics_server(metrics_port) if metrics_port is not None else None
+    gallery_server = None
+    if serve_port is not None:
+        from .server import start_gallery_server
+
+        gallery_server = start_gallery_server(serve_port)
+    snapshotter = JsonSnapshotter(metrics_snapshot, config.METRICS_SNAPSHOT_SECONDS).start() if metrics_snapshot else None
+    try:
+        if profile:
+            run_profiled(target, profile)
+        else:
+            target()
+    finally:
+        if snapshotter is not None:
+            snapshotter.stop()
+        if server is not None:
+            server.shutdown()
+        if gallery_server is not None:
+            gallery_server.shutdown()
@@ -0,0 +1,118 @@
+import logging
+import re
+from urllib.parse import urlsplit
+
+from .records import FAILED
+from .sources import CAMERA, source_for_url
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Starting guesses for the share of URLs with an embed, by (camera-shaped path, "Cam" in
+# the title); replaced by observed rates as results come in
+DEFAULT_YIELDS = {
+    (True, True): 0.8,
+    (True, False): 0.6,
+    (False, True): 0.2,
+    (False, False): 0.02,
+}
+# How many observations a prior is worth when blended with observed counts
+FEATURE_PRIOR_WEIGHT = 20
+PREFIX_PRIOR_WEIGHT = 5
+# Path segments making up the prefixes whose hit rates are tracked: /en/japan/, /en/japan/tokyo/
+PREFIX_DEPTHS = (2, 3)
+# Pending URLs handed out between re-rankings with what the run has learned so far
+RERANK_INTERVAL = 500
+
+CAM_TITLE_PATTERN = re.compile(r'cam', re.IGNORECASE)
+
+# Leading path prefixes of a URL, shortest first: https://h/en/japan/tokyo/x.html ->
+# ['h/en/japan/', 'h/en/japan/tokyo/']
+def path_prefixes(url):
+    parts = urlsplit(url)
+    segments = parts.path.split('/')[1:-1]
+    return [f"{parts.netloc}/{'/'.join(segments[:depth])}/" for depth in PREFIX_DEPTHS if len(segments) >= depth]
+
+def url_features(url, name):
+    camera_shaped = source_for_url(url).classify(url) == CAMERA
+    return camera_shaped, bool(name and CAM_TITLE_PATTERN.search(name))
+
+# Predicted embed yield for a URL from what discovery already knows about it: whether its
+# path has the camera shape (/en/x/y/z.html for webcamtaxi), whether its title mentions a
+# cam, and how often URLs under the same path prefixes turned out to have an embed. The
+# estimate is hierarchical: the feature bucket's rate, smoothed towards its default, is the
+# prior for the shorter prefix's rate, which is the prior for the longer one's.
+class YieldModel:
+    def __init__(self):
+        self.features = {key: [0, 0] for key in DEFAULT_YIELDS}
+        self.prefixes = {}
+
+    # Seeded from every result already in the store except failures, which say nothing about
+    # the page (process_slave only observes successful fetches either)
+    @classmethod
+    def from_store(cls, store):
+        model = cls()
+        for row in store.iter_results():
+            if row.status != FAILED:
+                model.observe(row.url, row.name, row.embed_code)
+        return model
+
+    def observe(self, url, name, embed_code):
+        hit = 1 if embed_code else 0
+        counts = self.features[url_features(url, name)]
+        counts[0] += hit
+        counts[1] += 1
+        for prefix in path_prefixes(url):
+            counts = self.prefixes.setdefault(prefix, [0, 0])
+            counts[0] += hit
+            counts[1] += 1
+
+    def score(self, url, name):
+        key = url_features(url, name)
+        hits, total = self.features[key]
+        estimate = (hits + FEATURE_PRIOR_WEIGHT * DEFAULT_YIELDS[key]) / (total + FEATURE_PRIOR_WEIGHT)
+        for prefix in path_prefixes(url):
+            counts = self.prefixes.get(prefix)
+            if counts:
+                estimate = (counts[0] + PREFIX_PRIOR_WEIGHT * estimate) / (counts[1] + PREFIX_PRIOR_WEIGHT)
+        return estimate
+
+# Score every pending URL into the store's priority column; returns how many were ranked
+def rank_pending(store, model=None):
+    model = model or YieldModel.from_store(store)
+    ranked = store.set_priorities((model.score(row.url, row.name), row.url) for row in store.iter_pending())
+    store.commit()
+    logger.info(f"Ranked {ranked} pending URLs by predicted embed yield")
+    return ranked
+
+# Pending URLs best-first for process_slave. Results fed back through observe() update the
+# model, and after every rerank_interval URLs (or a tenth of what is pending, whichever is
+# more, so re-scoring stays a small share of the run) the rest are re-scored with it and a
+# prefix that keeps failing sinks. URLs handed out in the previous round are not repeated
+# while their fetches may still be in flight.
+class YieldOrder:
+    def __init__(self, store, model=None, rerank_interval=None):
+        self.store = store
+        self.model = model
+        self.rerank_interval = rerank_interval or RERANK_INTERVAL
+
+    def observe(self, url, name, embed_code):
+        self.model.observe(url, name, embed_code)
+
+    def __iter__(self):
+        recent = set()
+        if self.model is None:
+            self.model = YieldModel.from_store(self.store)
+        while True:
+            interval = max(self.rerank_interval, rank_pending(self.store, self.model) // 10)
+            handed_out = set()
+            for row in self.store.iter_pending(by_priority=True):
+                if row.url in recent:
+                    continue
+                handed_out.add(row.url)
+                yield row
+                if len(handed_out) >= interval:
+                    break
+            else:
+                return
+            recent = handed_out
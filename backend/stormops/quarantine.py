@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from . import config
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Raised by MatchBudget.check() once a page has had its share of pattern matching time
+class MatchBudgetExceeded(Exception):
+    def __init__(self, elapsed, budget):
+        super().__init__(f"pattern matching took {elapsed:.1f}s, over the {budget:.1f}s budget")
+        self.elapsed = elapsed
+        self.budget = budget
+
+# Time allowed for matching patterns over one page: a fixed allowance plus so much per MB,
+# so a large dump is not cut short while a small page that grinds is. Scanners call check()
+# between windows and matches; Python's re cannot be interrupted inside one search, which
+# is why the patterns themselves are kept linear (see bench's redos stage).
+class MatchBudget:
+    def __init__(self, size_bytes=0, seconds=None):
+        self.seconds = seconds if seconds is not None else (
+            config.MATCH_BUDGET_SECONDS + config.MATCH_BUDGET_SECONDS_PER_MB * size_bytes / (1024 * 1024))
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def check(self):
+        elapsed = self.elapsed
+        if elapsed > self.seconds:
+            raise MatchBudgetExceeded(elapsed, self.seconds)
+
+# Saved pages that ran over their budget (or, with stage 'parse', that a parse worker could
+# not finish: the dead-letter list of stormops.parsepool), appended to config.QUARANTINE_FILE (one JSON
+# object per line) and skipped by later runs until the file changes size or mtime
+class Quarantine:
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.keys = None
+        self.added = []
+
+    @property
+    def filename(self):
+        return self.path or config.QUARANTINE_FILE
+
+    @staticmethod
+    def _key(filepath):
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        return os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns
+
+    def _load(self):
+        self.keys = set()
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.keys.add((entry['path'], entry['bytes'], entry['mtime_ns']))
+        except Exception as e:
+            logger.warning(f"Failed to read quarantine list {self.filename}: {str(e)}")
+
+    def contains(self, filepath):
+        key = self._key(filepath)
+        with self.lock:
+            if self.keys is None:
+                self._load()
+            return key is not None and key in self.keys
+
+    def add(self, filepath, stage, error):
+        key = self._key(filepath)
+        budget = getattr(error, 'budget', None)
+        entry = {'path': os.path.abspath(filepath), 'bytes': key[1] if key else None, 'mtime_ns': key[2] if key else None,
+                 'stage': stage, 'error': str(error), 'seconds': round(error.elapsed, 3),
+                 'budget': round(budget, 3) if budget is not None else None,
+                 'quarantined_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with self.lock:
+            if self.keys is None:
+                self._load()
+            if key is not None:
+                self.keys.add(key)
+            self.added.append(entry)
+            try:
+                with open(self.filename, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+            except OSError as e:
+                logger.error(f"Failed to record {filepath} in {self.filename}: {str(e)}")
+        registry.inc('pages_quarantined_total', labels={'stage': stage})
+        logger.warning(f"Quarantined {filepath} ({stage}): {str(error)}")
+
+# The process-wide quarantine list
+quarantine = Quarantine()
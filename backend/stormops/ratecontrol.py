@@ -0,0 +1,216 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+MIN_DELAY_SECONDS = 0.05
+MAX_DELAY_SECONDS = 30.0
+INITIAL_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+# Successes needed in a row before concurrency is stepped up by one
+RAMP_UP_SUCCESSES = 10
+# A response slower than this multiple of the best latency seen counts as unhealthy, unless
+# it is within LATENCY_SLACK_SECONDS of the best: millisecond jitter on a fast host is noise
+LATENCY_TOLERANCE = 3.0
+LATENCY_SLACK_SECONDS = 0.1
+LATENCY_EWMA_ALPHA = 0.2
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+# Consecutive failures that open a host's circuit, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 60.0
+BREAKER_MAX_COOLDOWN_SECONDS = 900.0
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half-open'
+
+class CircuitOpenError(Exception):
+    def __init__(self, host, retry_in):
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+# Parse a Retry-After header (delta-seconds or HTTP-date) into seconds, or None
+def parse_retry_after(value, now=None):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    # HTTP-dates are rare; keep email.utils (and socket) out of startup
+    import email.utils
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, retry_at.timestamp() - now)
+
+# Exponential backoff with full jitter: uniform(0, min(cap, base * 2^attempt))
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS):
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+# Rate and breaker state for a single host
+class HostState:
+    def __init__(self, host, initial_delay):
+        self.host = host
+        self.delay = initial_delay
+        self.concurrency = INITIAL_CONCURRENCY
+        self.in_flight = 0
+        self.next_allowed_at = 0.0
+        self.latency_ewma = None
+        self.best_latency = None
+        self.success_streak = 0
+        self.consecutive_failures = 0
+        self.breaker = BREAKER_CLOSED
+        self.open_until = 0.0
+        self.cooldown = BREAKER_COOLDOWN_SECONDS
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+
+# AIMD controller: additively ramps per-host concurrency and shortens the pacing delay while
+# responses stay fast and clean, halves concurrency and doubles the delay on errors or
+# throttling, honours Retry-After, and opens a per-host circuit after sustained failures.
+class AdaptiveRateController:
+    def __init__(self, initial_delay=0.5, min_delay=MIN_DELAY_SECONDS, max_delay=MAX_DELAY_SECONDS, max_concurrency=MAX_CONCURRENCY):
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.host_limits = {}
+        self.hosts = {}
+        self.condition = threading.Condition()
+
+    def _state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            initial_delay = self.host_limits.get(host, {}).get('initial_delay', self.initial_delay)
+            state = self.hosts[host] = HostState(host, initial_delay)
+        return state
+
+    def _max_concurrency(self, host):
+        return self.host_limits.get(host, {}).get('max_concurrency', self.max_concurrency)
+
+    # Per-host starting delay and concurrency ceiling (e.g. a source adapter's limits);
+    # None leaves the controller-wide value in place
+    def configure_host(self, host, initial_delay=None, max_concurrency=None):
+        with self.condition:
+            limits = self.host_limits.setdefault(host, {})
+            if initial_delay is not None:
+                limits['initial_delay'] = initial_delay
+            if max_concurrency is not None:
+                limits['max_concurrency'] = max_concurrency
+            state = self.hosts.get(host)
+            if state is not None:
+                if initial_delay is not None:
+                    state.delay = initial_delay
+                if max_concurrency is not None:
+                    state.concurrency = min(state.concurrency, max_concurrency)
+
+    # Block until the host has a free slot and its pacing delay has elapsed
+    def acquire(self, host):
+        with self.condition:
+            state = self._state(host)
+            while True:
+                now = time.monotonic()
+                if state.breaker == BREAKER_OPEN:
+                    if now < state.open_until:
+                        raise CircuitOpenError(host, state.open_until - now)
+                    state.breaker = BREAKER_HALF_OPEN
+                    logger.info(f"Circuit half-open for {host}, sending a probe request")
+                limit = 1 if state.breaker == BREAKER_HALF_OPEN else state.concurrency
+                if state.in_flight < limit and now >= state.next_allowed_at:
+                    state.in_flight += 1
+                    state.requests += 1
+                    state.next_allowed_at = now + state.delay
+                    return
+                wait = state.next_allowed_at - now if state.in_flight < limit else None
+                self.condition.wait(timeout=wait)
+
+    # Give back a slot taken with acquire() for a request that was never sent, recording no
+    # outcome (so the host's concurrency and breaker are left as they were)
+    def cancel(self, host):
+        with self.condition:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            state.requests = max(0, state.requests - 1)
+            self.condition.notify_all()
+
+    # Report the outcome of a request started with acquire()
+    def release(self, host, latency=None, ok=True, throttled=False, retry_after=None):
+        with self.condition:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            if ok and not throttled:
+                self._on_success(state, latency)
+            else:
+                self._on_failure(state, throttled, retry_after)
+            self.condition.notify_all()
+
+    def _on_success(self, state, latency):
+        state.consecutive_failures = 0
+        if state.breaker != BREAKER_CLOSED:
+            logger.info(f"Circuit closed for {state.host}")
+            state.breaker = BREAKER_CLOSED
+            state.cooldown = BREAKER_COOLDOWN_SECONDS
+        healthy = True
+        if latency is not None:
+            state.latency_ewma = latency if state.latency_ewma is None else (
+                LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * state.latency_ewma)
+            state.best_latency = latency if state.best_latency is None else min(state.best_latency, latency)
+            healthy = state.latency_ewma <= max(state.best_latency * LATENCY_TOLERANCE, state.best_latency + LATENCY_SLACK_SECONDS)
+        if not healthy:
+            # Latency is climbing: hold concurrency and ease off the pacing a little
+            state.success_streak = 0
+            state.delay = min(self.max_delay, state.delay * 1.25)
+            return
+        state.success_streak += 1
+        state.delay = max(self.min_delay, state.delay * 0.9)
+        if state.success_streak >= RAMP_UP_SUCCESSES and state.concurrency < self._max_concurrency(state.host):
+            state.concurrency += 1
+            state.success_streak = 0
+            logger.debug(f"Raised concurrency for {state.host} to {state.concurrency} (delay {state.delay:.2f}s)")
+
+    def _on_failure(self, state, throttled, retry_after):
+        state.failures += 1
+        state.success_streak = 0
+        state.consecutive_failures += 1
+        if throttled:
+            state.throttled += 1
+        state.concurrency = max(1, state.concurrency // 2)
+        state.delay = min(self.max_delay, max(state.delay * 2, self.min_delay))
+        now = time.monotonic()
+        if retry_after is not None:
+            state.next_allowed_at = max(state.next_allowed_at, now + retry_after)
+            logger.info(f"Honouring Retry-After of {retry_after:.1f}s for {state.host}")
+        if state.breaker == BREAKER_HALF_OPEN or state.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+            if state.breaker == BREAKER_HALF_OPEN:
+                state.cooldown = min(BREAKER_MAX_COOLDOWN_SECONDS, state.cooldown * 2)
+            state.breaker = BREAKER_OPEN
+            state.open_until = now + max(state.cooldown, retry_after or 0)
+            logger.warning(f"Circuit opened for {state.host} for {state.open_until - now:.0f}s after {state.consecutive_failures} consecutive failures")
+        logger.debug(f"Backed off {state.host}: concurrency {state.concurrency}, delay {state.delay:.2f}s")
+
+    # Per-host view for summaries and metrics
+    def snapshot(self):
+        with self.condition:
+            return {
+                host: {
+                    'concurrency': state.concurrency,
+                    'delay': round(state.delay, 3),
+                    'in_flight': state.in_flight,
+                    'latency_ewma': None if state.latency_ewma is None else round(state.latency_ewma, 3),
+                    'breaker': state.breaker,
+                    'requests': state.requests,
+                    'failures': state.failures,
+                    'throttled': state.throttled
+                }
+                for host, state in self.hosts.items()
+            }
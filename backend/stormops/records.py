@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+
+# Table column -> record attribute, so records can be written and read like the CSV rows
+COLUMN_FIELDS = {'URL': 'url', 'Name': 'name', 'Embed_Code': 'embed_code', 'Status': 'status'}
+
+# What a fetch came to: an embed was found, the page had none, or the page could not be fetched
+SUCCESS = 'success'
+NO_EMBED = 'no_embed'
+FAILED = 'failed'
+
+def result_status(embed_code, failed=False):
+    if failed:
+        return FAILED
+    return SUCCESS if embed_code else NO_EMBED
+
+# Rows carried through the pipeline. Slotted, so a row costs its fields and nothing else
+# (no per-row dict); tables and JSON see them through get()/[] with the column names.
+class _Record:
+    __slots__ = ()
+
+    def get(self, column, default=None):
+        field = COLUMN_FIELDS.get(column)
+        if field is None or field not in self.__slots__:
+            return default
+        return getattr(self, field)
+
+    def __getitem__(self, column):
+        field = COLUMN_FIELDS.get(column)
+        if field is None or field not in self.__slots__:
+            raise KeyError(column)
+        return getattr(self, field)
+
+# A discovered camera page
+@dataclass(frozen=True)
+class CameraRow(_Record):
+    __slots__ = ('url', 'name')
+    url: str
+    name: str
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row['URL'], row.get('Name'))
+
+# A fetched (or replayed) page and its embed; embed_code is None when the page had none.
+# status is SUCCESS, NO_EMBED or FAILED (a failed refetch keeps the last embed found).
+@dataclass(frozen=True)
+class EmbedResult(_Record):
+    __slots__ = ('url', 'name', 'embed_code', 'status')
+    url: str
+    name: str
+    embed_code: str
+    status: str
+
+    # Tables written before results had a status get one from their embed
+    @classmethod
+    def from_row(cls, row):
+        embed_code = row.get('Embed_Code') or None
+        return cls(row.get('URL'), row.get('Name'), embed_code, row.get('Status') or result_status(embed_code))
@@ -0,0 +1,80 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Seconds between checks of the store's retry queue while new URLs are being fetched
+RETRY_POLL_SECONDS = 5.0
+# Due retries handed out per check
+RETRY_BATCH = 64
+# Once the new URLs run out, how long a run keeps waiting for failures still backing off;
+# whatever is due later is left for the next run
+RETRY_WAIT_SECONDS = 120
+
+# The rows process_slave fetches, with the store's retry queue folded in, as passes to fetch
+# one after the other. Failed URLs whose backoff has run out are handed out between the new
+# URLs as soon as a check finds them, so a failing page never holds up healthy ones and no
+# fetch thread sleeps waiting for it. With refresh, results past their TTL
+# (config.RESULT_TTL_SECONDS) are due too. process_slave calls done(url) once a URL's
+# result is stored; until then the URL counts as in flight and is not handed out again.
+class RetryQueue:
+    def __init__(self, store, rows, refresh=False, wait_seconds=None, poll_seconds=None):
+        self.store = store
+        self.rows = rows
+        self.refresh = refresh
+        self.wait_seconds = RETRY_WAIT_SECONDS if wait_seconds is None else wait_seconds
+        self.poll_seconds = RETRY_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.in_flight = set()
+        self.retried = 0
+
+    def done(self, url):
+        self.in_flight.discard(url)
+
+    def _hand_out(self, row):
+        self.in_flight.add(row.url)
+        return row
+
+    def _due(self):
+        due = [row for row in self.store.due_rows(time.time(), RETRY_BATCH + len(self.in_flight), self.refresh)
+               if row.url not in self.in_flight][:RETRY_BATCH]
+        self.retried += len(due)
+        return [self._hand_out(row) for row in due]
+
+    # Everything due now, without waiting for anything still backing off
+    def _drain(self):
+        while True:
+            due = self._due()
+            if not due:
+                return
+            yield from due
+
+    def _first_pass(self):
+        polled_at = None
+        for row in self.rows:
+            if polled_at is None or time.monotonic() - polled_at >= self.poll_seconds:
+                polled_at = time.monotonic()
+                yield from self._due()
+            if row.url not in self.in_flight:
+                yield self._hand_out(row)
+        yield from self._drain()
+
+    # The first pass hands out the new URLs and whatever is due along the way. Each later
+    # pass is started once the one before has been fetched and stored: it waits (committed,
+    # with no fetch running) for the next failure to come due and hands out what is due
+    # then. Waiting stops wait_seconds after the first pass; whatever is due later is left
+    # for the next run.
+    def passes(self):
+        yield self._first_pass()
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            next_at = self.store.next_retry_at(time.time())
+            if next_at is None:
+                return
+            wait = next_at - time.time()
+            if time.monotonic() + wait > deadline:
+                logger.info(f"Leaving failed URLs due in {wait:.0f}s or later for the next run")
+                return
+            self.store.commit()
+            time.sleep(max(wait, 0))
+            yield self._drain()
@@ -0,0 +1,155 @@
+import functools
+import logging
+import os
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import config
+from .events import bus
+from .metrics import registry
+from .metrics_http import metrics_response, send_body
+from .templates import HASHED_ASSET_PATTERN
+from .thumbnails import THUMBNAIL_MAX_AGE_SECONDS, THUMBNAILS_PATH, ThumbnailService
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = '/events'
+# Comment line sent to idle event streams so proxies keep them open and dead clients are noticed
+KEEPALIVE_SECONDS = 15
+# Reconnect delay suggested to EventSource clients, in milliseconds
+RECONNECT_MS = 3000
+# Precompressed siblings a static file may have, best first, by Accept-Encoding token
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+# Static files from the gallery directory, the metrics endpoints, the live camera feed and
+# poster thumbnails
+class GalleryRequestHandler(SimpleHTTPRequestHandler):
+    extensions_map = {**SimpleHTTPRequestHandler.extensions_map, '.msgpack': 'application/vnd.msgpack'}
+
+    def do_GET(self):
+        response = metrics_response(self.path, self.server.registry)
+        if response is not None:
+            send_body(self, *response)
+            return
+        if urlsplit(self.path).path == EVENTS_PATH:
+            self.send_events()
+            return
+        if urlsplit(self.path).path.startswith(THUMBNAILS_PATH):
+            self.send_thumbnail()
+            return
+        if self.send_precompressed():
+            return
+        super().do_GET()
+
+    def accepted_encodings(self):
+        accepted = set()
+        for part in self.headers.get('Accept-Encoding', '').split(','):
+            token, _, params = part.partition(';')
+            params = params.replace(' ', '')
+            try:
+                weight = float(params[2:]) if params.startswith('q=') else 1.0
+            except ValueError:
+                weight = 1.0
+            if token.strip() and weight > 0:
+                accepted.add(token.strip().lower())
+        return accepted
+
+    # A file's .br or .gz sibling (as written next to camera shards) when the client accepts
+    # that encoding, sent as the file itself with Content-Encoding; False to serve it plainly
+    def send_precompressed(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return False
+        accepted = self.accepted_encodings()
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                with open(path + suffix, 'rb') as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header('Content-Type', self.guess_type(path))
+                self.send_header('Content-Encoding', encoding)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return True
+        return False
+
+    # Last-Event-ID header (sent by a reconnecting EventSource) or ?last_event_id=
+    def last_event_id(self):
+        value = self.headers.get('Last-Event-ID') or parse_qs(urlsplit(self.path).query).get('last_event_id', [None])[0]
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
+
+    # Server-Sent Events: camera add/update/remove deltas as they are published, after any
+    # missed since Last-Event-ID. A client that falls SUBSCRIBER_BUFFER events behind is
+    # disconnected and resumes from the history when it reconnects.
+    def send_events(self):
+        subscription = self.server.bus.subscribe(self.last_event_id())
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('X-Accel-Buffering', 'no')
+            self.end_headers()
+            self.wfile.write(f"retry: {RECONNECT_MS}\n\n".encode('ascii'))
+            self.wfile.flush()
+            while not subscription.overflowed:
+                events = subscription.get(KEEPALIVE_SECONDS)
+                self.wfile.write(b''.join(event.sse() for event in events) if events else b': keepalive\n\n')
+                self.wfile.flush()
+            logger.info(f"Event client {self.client_address[0]} fell behind, disconnecting it to resume")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.bus.unsubscribe(subscription)
+
+    # /thumbnails/<video id>.jpg: the YouTube poster, from the cache or fetched into it
+    def send_thumbnail(self):
+        name = urlsplit(self.path).path[len(THUMBNAILS_PATH):]
+        data = self.server.thumbnails.get(name[:-len('.jpg')]) if name.endswith('.jpg') else None
+        if data is None:
+            self.send_error(404, 'No thumbnail for this video')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', f"public, max-age={THUMBNAIL_MAX_AGE_SECONDS}")
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    # Content-hashed assets never change under the same name; they may have precompressed
+    # siblings, so caches must key them on Accept-Encoding too
+    def end_headers(self):
+        if HASHED_ASSET_PATTERN.search(self.path.split('?', 1)[0]):
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+            self.send_header('Vary', 'Accept-Encoding')
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(f"serve: {format % args}")
+
+# Serve directory (WEBCAM_DIR by default) on host:port until serve_forever() is stopped
+def make_server(port=8000, host='127.0.0.1', directory=None, metrics_registry=None, event_bus=None, thumbnails=None):
+    handler = functools.partial(GalleryRequestHandler, directory=directory or config.WEBCAM_DIR)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.registry = metrics_registry or registry
+    server.bus = event_bus or bus
+    # The disk cache is only opened when the first thumbnail is asked for
+    server.thumbnails = thumbnails or ThumbnailService()
+    return server
+
+# Serve the gallery and live feed on a background thread while a command runs, streaming
+# the events that run publishes in-process
+def start_gallery_server(port, host='127.0.0.1', directory=None):
+    import threading
+
+    server = make_server(port, host, directory)
+    threading.Thread(target=server.serve_forever, name='gallery-server', daemon=True).start()
+    logger.info(f"Serving the gallery on http://{host}:{server.server_address[1]}/ (live camera feed at {EVENTS_PATH})")
+    return server
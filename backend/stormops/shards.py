@@ -0,0 +1,168 @@
+import gzip
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+from urllib.parse import urlsplit
+
+from . import config
+from .checkpoint import PREVIOUS_SUFFIX, atomic_write_bytes
+from .metrics import registry
+from .thumbnails import thumbnail_path
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+# Shards and their index live in this subdirectory of the gallery directory
+SHARD_DIRECTORY = 'cameras'
+INDEX_FILENAME = 'cameras.index.json'
+# Bumped whenever the shard layout changes, so clients can tell old shards apart
+SHARD_VERSION = 2
+SHARD_FIELDS = ['path', 'name', 'src', 'poster']
+# Cameras whose URL has no /en/<country>/<region>/ shape
+OTHER_REGION = 'other'
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Below this many bytes a compressed sibling saves less than its own request overhead
+MIN_COMPRESS_BYTES = 256
+
+SHARD_FORMATS = {'json': '.json', 'msgpack': '.msgpack'}
+SHARD_FILE_PATTERN = re.compile(r'^cameras\.[a-z0-9-]+\.[0-9a-f]{12}\.(?:json|msgpack)(?:\.gz|\.br)?$')
+REGION_SEGMENT_PATTERN = re.compile(r'[^a-z0-9]+')
+IFRAME_SRC_PATTERN = re.compile(r'\ssrc="([^"]+)"', re.IGNORECASE)
+
+# Shard key of a camera URL: the country/region segments after /en/, depth of them joined
+# with '-' (https://h/en/japan/tokyo/x.html -> 'japan-tokyo', or 'japan' at depth 1)
+def region_key(url, depth=None):
+    depth = depth or config.MANIFEST_SHARD_DEPTH
+    segments = urlsplit(url).path.lower().split('/')[1:-1]
+    if len(segments) < 2 or segments[0] != 'en':
+        return OTHER_REGION
+    parts = [REGION_SEGMENT_PATTERN.sub('-', segment).strip('-') for segment in segments[1:1 + depth]]
+    return '-'.join(part for part in parts if part) or OTHER_REGION
+
+# The player URL out of an embed iframe (entities such as &amp; decoded); the frontend
+# builds its own iframe around it. An embed without one is kept whole.
+def embed_src(embed_code):
+    match = IFRAME_SRC_PATTERN.search(embed_code or '')
+    return html.unescape(match.group(1)) if match else embed_code
+
+# One compact row per camera, in SHARD_FIELDS order. URLs on the base host are stored as
+# paths; the shard's base puts them back together. poster is the camera's /thumbnails/
+# path on the gallery server, or None for an embed that is not a YouTube video.
+def camera_record(webcam, base_url):
+    url = webcam.url
+    path = url[len(base_url):] if base_url and url.startswith(base_url + '/') else url
+    return [path, webcam.name, embed_src(webcam.embed_code), thumbnail_path(webcam.embed_code)]
+
+# Group cameras with an embed by region; each shard is sorted by path so the same cameras
+# always encode to the same bytes (and the same content-hashed name)
+def group_by_region(webcams, depth=None, base_url=None):
+    base_url = (base_url or config.BASE_URL).rstrip('/')
+    regions = {}
+    for webcam in webcams:
+        if webcam.embed_code:
+            regions.setdefault(region_key(webcam.url, depth), []).append(camera_record(webcam, base_url))
+    for records in regions.values():
+        records.sort()
+    return regions
+
+# msgpack if asked for and installed, else minified JSON
+def resolve_format(shard_format):
+    if shard_format == 'msgpack':
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            logger.warning("msgpack is not installed, writing JSON shards instead")
+            return 'json'
+    return shard_format
+
+def encode_shard(payload, shard_format):
+    if shard_format == 'msgpack':
+        import msgpack
+
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+# Precompressed siblings {suffix: bytes}: gzip always, brotli when the module is installed.
+# gzip's header mtime is zeroed so the same shard always compresses to the same bytes.
+def compressed_siblings(data):
+    if len(data) < MIN_COMPRESS_BYTES:
+        return {}
+    siblings = {'.gz': gzip.compress(data, GZIP_LEVEL, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        logger.debug("brotli is not installed, writing gzip siblings only")
+    else:
+        siblings['.br'] = brotli.compress(data, quality=BROTLI_QUALITY)
+    return siblings
+
+def shard_directory(directory=None):
+    return os.path.join(directory or config.WEBCAM_DIR, SHARD_DIRECTORY)
+
+def load_index(directory):
+    path = os.path.join(directory, INDEX_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to read shard index {path}: {str(e)}")
+        return {}
+
+def index_files(index):
+    return {entry['file'] for entry in index.get('regions', {}).values()}
+
+# Write the cameras as one compact manifest per region, cameras.<region>.<hash>.json (or
+# .msgpack) with .gz/.br siblings, plus cameras.index.json mapping each region to its file.
+# A client reads the small index, then fetches just its region's shard, which is cached
+# for good since a change gets a new name. Shards already on disk are not rewritten; those
+# referenced by neither this index nor the previous one are deleted, so a client holding
+# the previous index can still fetch its shard. Returns the index.
+def write_shards(webcams, directory=None, shard_format='json', depth=None, base_url=None):
+    directory = shard_directory(directory)
+    os.makedirs(directory, exist_ok=True)
+    shard_format = resolve_format(shard_format)
+    base_url = (base_url or config.BASE_URL).rstrip('/')
+    previous = load_index(directory)
+    regions = {}
+    written = 0
+    for region, records in sorted(group_by_region(webcams, depth, base_url).items()):
+        payload = {'v': SHARD_VERSION, 'region': region, 'base': base_url, 'fields': SHARD_FIELDS, 'cameras': records}
+        data = encode_shard(payload, shard_format)
+        name = f"cameras.{region}.{hashlib.sha256(data).hexdigest()[:12]}{SHARD_FORMATS[shard_format]}"
+        siblings = compressed_siblings(data)
+        entry = {'file': name, 'count': len(records), 'bytes': len(data)}
+        entry.update({suffix.lstrip('.'): len(body) for suffix, body in siblings.items()})
+        regions[region] = entry
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            continue
+        # Siblings first: the plain file appearing is what marks the shard complete
+        for suffix, body in siblings.items():
+            atomic_write_bytes(path + suffix, body)
+        atomic_write_bytes(path, data)
+        written += 1
+    index = {'v': SHARD_VERSION, 'format': shard_format, 'depth': depth or config.MANIFEST_SHARD_DEPTH,
+             'base': base_url, 'fields': SHARD_FIELDS, 'regions': regions}
+    # Published as is, with no .prev generation beside it in the served directory (one left
+    # by an earlier build is removed)
+    index_path = os.path.join(directory, INDEX_FILENAME)
+    atomic_write_bytes(index_path, json.dumps(index, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+    if os.path.exists(index_path + PREVIOUS_SUFFIX):
+        os.remove(index_path + PREVIOUS_SUFFIX)
+    keep = index_files(index) | index_files(previous)
+    removed = 0
+    for filename in os.listdir(directory):
+        if SHARD_FILE_PATTERN.match(filename) and re.sub(r'\.(?:gz|br)$', '', filename) not in keep:
+            os.remove(os.path.join(directory, filename))
+            removed += 1
+    registry.inc('manifest_shards_total', written, labels={'result': 'written'})
+    registry.inc('manifest_shards_total', len(regions) - written, labels={'result': 'unchanged'})
+    logger.info(f"Camera shards: {len(regions)} regions in {directory}, {written} written, "
+                f"{len(regions) - written} unchanged, {removed} stale files removed")
+    return index
@@ -0,0 +1,133 @@
+import logging
+import re
+from urllib.parse import urlsplit
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+CAMERA = 'camera'
+DIRECTORY = 'directory'
+OTHER = 'other'
+
+# Camera name from the last path segment: /en/x/y/storm-cam-1.html -> Storm Cam 1
+def name_from_path(path):
+    return path.split('?', 1)[0].split('/')[-1].replace('.html', '').replace('-', ' ').title()
+
+# Everything the pipeline needs to know about one webcam directory site: where it lives,
+# which links on its pages are cameras or further directory pages, the regexes that pull
+# camera links out of saved pages, the embed patterns for its camera pages, and how hard
+# it may be fetched. base_url None means config.BASE_URL (read at call time), so the
+# default adapter follows --base-url and the benchmark's mock site.
+class SourceAdapter:
+    def __init__(self, name, base_url=None, hosts=(), root_path='/', camera_path_pattern=None,
+                 directory_path_pattern=None, discovery_patterns=(), video_patterns=None,
+                 delay=None, max_concurrency=None, crawl_delay=None):
+        self.name = name
+        self.base_url = base_url
+        self.hosts = tuple(hosts)
+        self.root_path = root_path
+        self.camera_path_pattern = re.compile(camera_path_pattern)
+        self.directory_path_pattern = re.compile(directory_path_pattern)
+        self.discovery_patterns = [re.compile(pattern, re.MULTILINE | re.IGNORECASE) for pattern in discovery_patterns]
+        self.video_patterns = video_patterns
+        self.delay = delay
+        self.max_concurrency = max_concurrency
+        self.crawl_delay = crawl_delay
+
+    @property
+    def base(self):
+        return (self.base_url or config.BASE_URL).rstrip('/')
+
+    @property
+    def host(self):
+        return urlsplit(self.base).netloc
+
+    @property
+    def root(self):
+        return self.base + self.root_path
+
+    # Hosts whose links belong to this site (the live host as well as base_url's)
+    def owns(self, host):
+        return host == self.host or host in self.hosts
+
+    # camera, directory or other for a canonical URL
+    def classify(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not self.owns(parts.netloc):
+            return OTHER
+        if self.camera_path_pattern.match(parts.path):
+            return CAMERA
+        if self.directory_path_pattern.match(parts.path):
+            return DIRECTORY
+        return OTHER
+
+    # Site path for a discovered link, or None if it is not a camera page on this site
+    def camera_path(self, link):
+        if link.startswith('http'):
+            parts = urlsplit(link)
+            if not self.owns(parts.netloc):
+                return None
+            link = parts.path + (f"?{parts.query}" if parts.query else '')
+        return link if self.camera_path_pattern.match(link) else None
+
+    def embed_patterns(self):
+        return self.video_patterns or config.VIDEO_PATTERNS
+
+    def extract_embed(self, html):
+        for pattern in self.embed_patterns():
+            match = re.search(pattern, html, re.IGNORECASE)
+            if match:
+                return match.group(0)
+        return None
+
+    # Per-host pacing and concurrency ceiling for this site on the shared rate controller
+    def apply_rate_limits(self, rate_controller):
+        if self.delay is not None or self.max_concurrency is not None:
+            rate_controller.configure_host(self.host, self.delay, self.max_concurrency)
+
+WEBCAMTAXI = SourceAdapter(
+    'webcamtaxi',
+    hosts=('www.webcamtaxi.com',),
+    camera_path_pattern=r'^/en/[^/]+/[^/]+/[^/]+\.html(?:\?[^"]*)?$',
+    # The site root and category/pagination pages: /en/japan.html, /en/japan/tokyo.html
+    directory_path_pattern=r'^/(?:en/?)?$|^/en/[^/]+(?:/[^/]+)?\.html$',
+    # Linear-time by construction (the bench redos stage checks): a tag's attributes are
+    # [^<>] so a failed attempt stops at the next tag, each span is bounded, and no two
+    # adjacent quantifiers can trade characters (\s then [^<>], never \s+[^>]*)
+    discovery_patterns=[
+        r'<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"[^<>]{0,512}>',
+        r'<a\s[^<>]{0,512}href="(https?://www\.webcamtaxi\.com/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"[^<>]{0,512}>',
+        r'<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html(?:\?[^"<>]{0,512})?)"[^<>]{0,512}>',
+        r'<div\s+class="nspArt[^<>]{0,512}>[\s\S]{0,1536}?<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"[^<>]{0,512}>',
+        r'<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"\s[^<>]{0,512}class="nspImageWrapper[^"<>]{0,512}"[^<>]{0,512}>',
+        r'<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"\s+title="[^"<>]{0,512}Cam[^"<>]{0,512}"[^<>]{0,512}>',
+        r'<a\s[^<>]{0,512}href="(/en/[a-zA-Z0-9\-]{1,128}/[a-zA-Z0-9\-]{1,128}/[a-zA-Z0-9\-]{1,128}\.html)"[^<>]{0,512}>',
+        r'<div\s+class="nspCol[13]"[^<>]{0,512}>[\s\S]{0,1536}?<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"[^<>]{0,512}>',
+        r'<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"\s[^<>]{0,512}class="[^"<>]{0,512}webcam[^"<>]{0,512}"[^<>]{0,512}>',
+        r'<a\s[^<>]{0,512}href="(/en/[^/"<>]{1,128}/[^/"<>]{1,128}/[^/"<>]{1,128}\.html)"\s[^<>]{0,512}class="[^"<>]{0,512}thumbnail[^"<>]{0,512}"[^<>]{0,512}>',
+    ],
+)
+
+# Adapters by name; a new site is one register_source() call
+SOURCES = {}
+
+def register_source(adapter):
+    SOURCES[adapter.name] = adapter
+    return adapter
+
+register_source(WEBCAMTAXI)
+
+def get_source(name):
+    try:
+        return SOURCES[name]
+    except KeyError:
+        raise ValueError(f"Unknown source {name!r}, expected one of {', '.join(sorted(SOURCES))}") from None
+
+# Adapter whose site a URL belongs to; the default webcamtaxi adapter for anything else
+def source_for_url(url):
+    host = urlsplit(url).netloc
+    for adapter in SOURCES.values():
+        if adapter.owns(host):
+            return adapter
+    return WEBCAMTAXI
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import time
+
+# Startup budgets, in milliseconds. Import time covers `import stormops.pipeline` alone;
+# time-to-first-fetch is a fresh interpreter importing the fetcher and downloading one page.
+IMPORT_BUDGET_MS = 150
+FIRST_FETCH_BUDGET_MS = 1500
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_FETCH_SCRIPT = """
+import sys
+from stormops.fetcher import fetch_html
+fetch_html(sys.argv[1])
+"""
+
+# Environment for subprocesses that import stormops from this checkout
+def package_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGE_PARENT, env.get('PYTHONPATH')]))
+    return env
+
+# Cumulative import time of module in a fresh interpreter, from `python -X importtime`
+def measure_import_ms(module='stormops.pipeline'):
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                               capture_output=True, text=True, env=package_env(), check=True)
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return round(int(parts[1]) / 1000, 2)
+    return None
+
+# Wall time of a fresh interpreter that imports the fetcher and fetches url, or None if it failed
+def measure_first_fetch_ms(url):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', FIRST_FETCH_SCRIPT, url],
+                               capture_output=True, text=True, env=package_env())
+    elapsed = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        return None
+    return round(elapsed, 2)
+
+# Measure both numbers against their budgets; 'within_budget' is False if either is over
+def measure_startup(url, import_budget_ms=IMPORT_BUDGET_MS, first_fetch_budget_ms=FIRST_FETCH_BUDGET_MS):
+    import_ms = measure_import_ms()
+    first_fetch_ms = measure_first_fetch_ms(url)
+    over = []
+    if import_ms is None or import_ms > import_budget_ms:
+        over.append('import')
+    if first_fetch_ms is None or first_fetch_ms > first_fetch_budget_ms:
+        over.append('first_fetch')
+    return {
+        'import_ms': import_ms,
+        'import_budget_ms': import_budget_ms,
+        'first_fetch_ms': first_fetch_ms,
+        'first_fetch_budget_ms': first_fetch_budget_ms,
+        'over_budget': over,
+        'within_budget': not over,
+    }
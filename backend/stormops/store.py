@@ -0,0 +1,273 @@
+import hashlib
+import logging
+import sqlite3
+import time
+from itertools import islice
+
+from . import config
+from .records import FAILED, CameraRow, EmbedResult, result_status
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany()/SELECT page, so neither inserts nor scans hold a whole table
+STORE_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    name TEXT,
+    priority REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    name TEXT,
+    embed_code TEXT,
+    status TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    checked_at REAL,
+    due_at REAL
+);
+CREATE TABLE IF NOT EXISTS exported (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    digest TEXT NOT NULL
+);
+"""
+# Stores created before URLs had a fetch priority or results had a state. Old results
+# without an embed may have been failures recorded as "no embed", so they are due for
+# one more fetch (due_at RECHECK_DUE_AT); old embeds keep theirs until the success TTL.
+MIGRATIONS = [
+    ('urls', 'priority', 'ALTER TABLE urls ADD COLUMN priority REAL NOT NULL DEFAULT 0'),
+    ('results', 'status', """
+ALTER TABLE results ADD COLUMN status TEXT;
+ALTER TABLE results ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE results ADD COLUMN checked_at REAL;
+ALTER TABLE results ADD COLUMN due_at REAL;
+UPDATE results SET status = CASE WHEN embed_code IS NULL OR embed_code = '' THEN 'no_embed' ELSE 'success' END;
+UPDATE results SET due_at = CASE status WHEN 'no_embed' THEN {recheck_due_at} ELSE strftime('%s', 'now') + {success_ttl} END;
+"""),
+]
+# due_at of a result owed one more fetch whatever its state; the retry queue picks these up
+# along with failures
+RECHECK_DUE_AT = 0
+INDEXES = """
+CREATE INDEX IF NOT EXISTS urls_by_priority ON urls (priority DESC, id);
+CREATE INDEX IF NOT EXISTS results_by_due ON results (due_at);
+CREATE INDEX IF NOT EXISTS urls_by_folded_url ON urls (url COLLATE NOCASE);
+"""
+# A fetched page: state, when it was checked and when it is due again; attempts counts
+# consecutive failures, so a success resets it
+RESULT_UPSERT = (
+    'INSERT INTO results (url, name, embed_code, status, attempts, checked_at, due_at) VALUES (?, ?, ?, ?, 0, ?, ?) '
+    'ON CONFLICT(url) DO UPDATE SET name = excluded.name, embed_code = excluded.embed_code, status = excluded.status, '
+    'attempts = 0, checked_at = excluded.checked_at, due_at = excluded.due_at'
+)
+# A failed fetch: due again after the backoff, doubled per consecutive failure and capped.
+# A page that had an embed keeps it (and stays in the gallery) while it is being retried.
+FAILURE_UPSERT = (
+    "INSERT INTO results (url, name, status, attempts, checked_at, due_at) VALUES (?, ?, 'failed', 1, ?, ? + ?) "
+    "ON CONFLICT(url) DO UPDATE SET status = 'failed', attempts = results.attempts + 1, checked_at = excluded.checked_at, "
+    'due_at = excluded.checked_at + MIN(? * (1 << MIN(results.attempts, 20)), ?)'
+)
+
+# Digest of a camera as exported (its name and embed), registered in SQLite as
+# row_digest() so deltas are worked out in queries
+def row_digest(name, embed_code):
+    return hashlib.sha256(f"{name or ''}\0{embed_code or ''}".encode('utf-8')).hexdigest()[:16]
+
+# On-disk URL table and results for a run. Discovered links stream in, pending URLs and
+# results stream out in pages, and commits are cheap enough to follow the checkpoint cadence.
+# Rows go in and come out as CameraRow / EmbedResult records.
+class PipelineStore:
+    def __init__(self, path=None):
+        self.path = path or config.STORE_DB
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.create_function('row_digest', 2, row_digest, deterministic=True)
+        self.conn.executescript(SCHEMA)
+        for table, column, sql in MIGRATIONS:
+            if column not in {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}:
+                self.conn.executescript(sql.format(success_ttl=int(config.RESULT_TTL_SECONDS['success']), recheck_due_at=RECHECK_DUE_AT))
+        self.conn.executescript(INDEXES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def _insert_batches(self, sql, params):
+        params = iter(params)
+        before = self.conn.total_changes
+        while True:
+            batch = list(islice(params, STORE_BATCH_SIZE))
+            if not batch:
+                break
+            self.conn.executemany(sql, batch)
+        return self.conn.total_changes - before
+
+    # Add URL rows, ignoring ones already known; returns how many were new
+    def add_urls(self, rows):
+        return self._insert_batches(
+            'INSERT OR IGNORE INTO urls (url, name) VALUES (?, ?)',
+            ((row.url, row.name) for row in rows)
+        )
+
+    # Record a fetch: success or no embed (due again after that state's TTL), or a failure
+    # (on the retry queue with backoff)
+    def add_result(self, url, name, embed_code, failed=False):
+        now = time.time()
+        if failed:
+            backoff = config.RETRY_BACKOFF_SECONDS
+            self.conn.execute(FAILURE_UPSERT, (url, name, now, now, backoff, backoff, config.RETRY_MAX_BACKOFF_SECONDS))
+        else:
+            self.conn.execute(RESULT_UPSERT, self._result_params(url, name, embed_code, now))
+
+    def add_results(self, rows):
+        now = time.time()
+        return self._insert_batches(
+            RESULT_UPSERT,
+            (self._result_params(row.url, row.name, row.embed_code, now, row.status) for row in rows)
+        )
+
+    # A row imported as failed (e.g. from a results table) stays failed and is due for a
+    # retry straight away; otherwise the state follows from the embed
+    @staticmethod
+    def _result_params(url, name, embed_code, now, status=None):
+        if status == FAILED:
+            return url, name, embed_code or None, FAILED, now, now
+        status = result_status(embed_code)
+        return url, name, embed_code or None, status, now, now + config.RESULT_TTL_SECONDS[status]
+
+    # Set fetch priorities from (priority, url) pairs; returns how many URLs were updated
+    def set_priorities(self, scored):
+        return self._insert_batches('UPDATE urls SET priority = ? WHERE url = ?', scored)
+
+    def result_for(self, url):
+        row = self.conn.execute('SELECT url, name, embed_code, status FROM results WHERE url = ?', (url,)).fetchone()
+        return EmbedResult(*row) if row else None
+
+    # ignore_case matches ASCII letters case-insensitively (via urls_by_folded_url)
+    def has_url(self, url, ignore_case=False):
+        collate = ' COLLATE NOCASE' if ignore_case else ''
+        return self.conn.execute(f'SELECT 1 FROM urls WHERE url = ?{collate}', (url,)).fetchone() is not None
+
+    def url_count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+
+    def result_count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def pending_count(self):
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM urls WHERE NOT EXISTS (SELECT 1 FROM results WHERE results.url = urls.url)'
+        ).fetchone()[0]
+
+    # Page through a query keyed on id so callers may write between pages
+    def _iter_pages(self, sql):
+        last_id = 0
+        while True:
+            rows = self.conn.execute(sql, (last_id, STORE_BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield from rows
+
+    def iter_urls(self):
+        for _, url, name in self._iter_pages('SELECT id, url, name FROM urls WHERE id > ? ORDER BY id LIMIT ?'):
+            yield CameraRow(url, name)
+
+    # URLs with no result yet, in discovery order or highest priority first
+    def iter_pending(self, by_priority=False):
+        if not by_priority:
+            for _, url, name in self._iter_pages(
+                'SELECT id, url, name FROM urls WHERE id > ? '
+                'AND NOT EXISTS (SELECT 1 FROM results WHERE results.url = urls.url) ORDER BY id LIMIT ?'
+            ):
+                yield CameraRow(url, name)
+            return
+        # Keyset pages on (priority, id), the order of the urls_by_priority index
+        last_priority, last_id = float('inf'), 0
+        while True:
+            rows = self.conn.execute(
+                'SELECT id, url, name, priority FROM urls WHERE (priority < ? OR (priority = ? AND id > ?)) '
+                'AND NOT EXISTS (SELECT 1 FROM results WHERE results.url = urls.url) '
+                'ORDER BY priority DESC, id LIMIT ?',
+                (last_priority, last_priority, last_id, STORE_BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                return
+            last_id, _, _, last_priority = rows[-1]
+            for _, url, name, _ in rows:
+                yield CameraRow(url, name)
+
+    def iter_results(self):
+        for _, url, name, embed_code, status in self._iter_pages(
+            'SELECT id, url, name, embed_code, status FROM results WHERE id > ? ORDER BY id LIMIT ?'
+        ):
+            yield EmbedResult(url, name, embed_code, status)
+
+    # Gallery cards: results that have an embed
+    def iter_webcams(self):
+        for _, url, name, embed_code, status in self._iter_pages(
+            "SELECT id, url, name, embed_code, status FROM results WHERE id > ? AND embed_code IS NOT NULL AND embed_code != '' ORDER BY id LIMIT ?"
+        ):
+            yield EmbedResult(url, name, embed_code, status)
+
+    # Cameras (results with an embed) not in the exported snapshot or changed since it, as
+    # (url, name, embed_code, digest, new)
+    def iter_changed_webcams(self):
+        for _, url, name, embed_code, digest, previous in self._iter_pages(
+            'SELECT r.id, r.url, r.name, r.embed_code, row_digest(r.name, r.embed_code), e.digest FROM results r '
+            'LEFT JOIN exported e ON e.url = r.url '
+            "WHERE r.id > ? AND r.embed_code IS NOT NULL AND r.embed_code != '' "
+            'AND (e.digest IS NULL OR e.digest != row_digest(r.name, r.embed_code)) ORDER BY r.id LIMIT ?'
+        ):
+            yield url, name, embed_code, digest, previous is None
+
+    # URLs in the exported snapshot that no longer have an embed
+    def iter_removed_webcams(self):
+        for _, url in self._iter_pages(
+            'SELECT id, url FROM exported e WHERE id > ? AND NOT EXISTS (SELECT 1 FROM results r WHERE r.url = e.url '
+            "AND r.embed_code IS NOT NULL AND r.embed_code != '') ORDER BY id LIMIT ?"
+        ):
+            yield url
+
+    # Move the exported snapshot on by a delta: (url, digest) pairs, digest None for removed
+    def apply_exported(self, changes):
+        self._insert_batches(
+            'INSERT INTO exported (url, digest) VALUES (?, ?) ON CONFLICT(url) DO UPDATE SET digest = excluded.digest',
+            ((url, digest) for url, digest in changes if digest is not None)
+        )
+        self._insert_batches('DELETE FROM exported WHERE url = ?', ((url,) for url, digest in changes if digest is None))
+        self.conn.commit()
+
+    # The retry queue: up to limit results due by now, soonest first, as CameraRows. Only
+    # failures and results owed a recheck (RECHECK_DUE_AT) unless refresh, which adds
+    # results whose TTL has run out.
+    def due_rows(self, now, limit, refresh=False):
+        status_filter = '' if refresh else f"AND (status = '{FAILED}' OR due_at = {RECHECK_DUE_AT}) "
+        rows = self.conn.execute(
+            f'SELECT url, name FROM results WHERE due_at <= ? {status_filter}ORDER BY due_at LIMIT ?', (now, limit)
+        ).fetchall()
+        return [CameraRow(url, name) for url, name in rows]
+
+    # When the next failure still backing off after now comes due, or None
+    def next_retry_at(self, now):
+        return self.conn.execute(
+            'SELECT MIN(due_at) FROM results WHERE status = ? AND due_at > ?', (FAILED, now)
+        ).fetchone()[0]
+
+    # Result count per state
+    def status_counts(self):
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM results GROUP BY status').fetchall())
@@ -0,0 +1,68 @@
+import re
+
+# --- Configuration Constants ---
+STREAM_CHUNK_SIZE = 16 * 1024
+# Longest embed tag we expect to straddle a chunk boundary
+MAX_EMBED_LENGTH = 4096
+
+# Incrementally search a document fed in chunks for the first match of any pattern.
+# A tail of MAX_EMBED_LENGTH characters is carried between chunks so a tag split across
+# a boundary still matches, while each byte is scanned a bounded number of times.
+class EmbedStreamScanner:
+    def __init__(self, patterns, flags=re.IGNORECASE, max_embed_length=MAX_EMBED_LENGTH):
+        self.pattern = re.compile('|'.join(f'(?:{p})' for p in patterns), flags)
+        self.max_embed_length = max_embed_length
+        self.carry = ''
+        self.match = None
+        self.chars_scanned = 0
+
+    # Feed the next decoded chunk; returns the embed once found, else None
+    def feed(self, text):
+        if self.match is not None:
+            return self.match
+        buffer = self.carry + text
+        self.chars_scanned += len(text)
+        found = self.pattern.search(buffer)
+        if found:
+            self.match = found.group(0)
+            self.carry = ''
+            return self.match
+        self.carry = buffer[-self.max_embed_length:]
+        return None
+
+    @property
+    def found(self):
+        return self.match is not None
+
+# Yield every non-overlapping match of regex over a document fed as chunks, as if the
+# chunks had been joined. Matches longer than max_length may be cut short at a boundary;
+# everything else is found exactly once while only about max_length characters are kept.
+def iter_matches(chunks, regex, max_length=MAX_EMBED_LENGTH):
+    carry = ''
+    for chunk in chunks:
+        window = carry + chunk
+        # A match starting before safe_end cannot be extended by text still to come
+        safe_end = len(window) - max_length
+        resume = max(safe_end, 0)
+        for match in regex.finditer(window):
+            if match.start() >= safe_end:
+                resume = match.start()
+                break
+            yield match
+            resume = max(match.end(), safe_end)
+        carry = window[resume:]
+    yield from regex.finditer(carry)
+
+# Overlapping windows over chunked text, for pattern sets whose matches are deduplicated
+# downstream; each window shares its last max_length characters with the next
+def iter_windows(chunks, max_length=MAX_EMBED_LENGTH):
+    carry = ''
+    for chunk in chunks:
+        window = carry + chunk
+        if len(window) > max_length:
+            yield window
+            carry = window[-max_length:]
+        else:
+            carry = window
+    if carry:
+        yield carry
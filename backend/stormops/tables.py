@@ -0,0 +1,50 @@
+import csv
+import json
+import os
+
+# Result and URL tables are written as CSV unless the file name asks for JSON
+TABLE_FORMATS = ('csv', 'json', 'ndjson')
+EXTENSION_FORMATS = {'.csv': 'csv', '.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+def table_format(path):
+    return EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+# Stream rows (dicts keyed by column) into f one at a time, returning the row count for
+# the checkpoint state. Missing values are written as empty CSV cells or JSON nulls.
+def write_table(f, rows, columns, fmt='csv'):
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format {fmt!r}, expected one of {', '.join(TABLE_FORMATS)}")
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([row.get(column) for column in columns])
+            count += 1
+        return count
+    if fmt == 'json':
+        f.write('[')
+    for row in rows:
+        record = json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False)
+        if fmt == 'json':
+            f.write(('\n  ' if count == 0 else ',\n  ') + record)
+        else:
+            f.write(record + '\n')
+        count += 1
+    if fmt == 'json':
+        f.write('\n]\n' if count else ']\n')
+    return count
+
+# Stream rows back out of a table written by write_table; empty cells come back as None
+def iter_table(path, fmt=None):
+    fmt = fmt or table_format(path)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                yield {column: value if value != '' else None for column, value in row.items()}
+        elif fmt == 'ndjson':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
@@ -0,0 +1,92 @@
+import functools
+import hashlib
+import html
+import logging
+import os
+import re
+
+from .checkpoint import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Gallery styles, shipped once per directory as a content-hashed file that every page links
+# to, so browsers fetch it once and a style change gets a new name instead of a stale cache
+STYLESHEET = """body{font-family:'Segoe UI',Arial,sans-serif;margin:0;padding:20px;background-color:#1a1a1a;color:#e0e0e0}
+.masonry{column-count:1;column-gap:20px;max-width:1200px;margin:0 auto}
+.card{break-inside:avoid;background:#2a2a2a;border-radius:12px;box-shadow:0 4px 10px rgba(0,0,0,0.3);margin-bottom:20px;padding:20px;transition:transform 0.2s}
+.card:hover{transform:translateY(-5px)}
+h2{margin:0 0 15px;font-size:1.6em;color:#00ccff}
+.video-container{position:relative;width:100%;aspect-ratio:16/9;border-radius:8px;overflow:hidden}
+iframe{width:100%;height:100%;border:none}
+@media (min-width:600px){.masonry{column-count:2}}
+@media (min-width:900px){.masonry{column-count:3}}
+"""
+# gallery.<hash>.css, camera shards and the like (and their .gz/.br siblings); served with a long-lived Cache-Control
+HASHED_ASSET_PATTERN = re.compile(r'\.[0-9a-f]{12}\.(?:css|js|json|msgpack)(?:\.gz|\.br)?$')
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)(!raw)?\}')
+
+@functools.lru_cache(maxsize=None)
+def stylesheet_name():
+    return f"gallery.{hashlib.sha256(STYLESHEET.encode('utf-8')).hexdigest()[:12]}.css"
+
+# Write the stylesheet into directory unless it is already there (its name is its content)
+def write_stylesheet(directory):
+    path = os.path.join(directory, stylesheet_name())
+    if not os.path.exists(path):
+        with atomic_write(path) as f:
+            f.write(STYLESHEET)
+        logger.info(f"Wrote stylesheet {path}")
+    return path
+
+def _text(value):
+    return '' if value is None else str(value)
+
+def _escaped(value):
+    return '' if value is None else html.escape(str(value))
+
+# A template compiled once into a Python function that concatenates its literal text with
+# its fields. Fields are HTML-escaped (None renders as nothing); {field!raw} inserts trusted
+# markup such as an embed iframe.
+class Template:
+    def __init__(self, text):
+        self.text = text
+        pieces = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            pieces.append(repr(text[position:match.start()]))
+            pieces.append(f"{'_text' if match.group(2) else '_escaped'}(values[{match.group(1)!r}])")
+            position = match.end()
+        pieces.append(repr(text[position:]))
+        namespace = {'_text': _text, '_escaped': _escaped}
+        exec(compile(f"def render(**values):\n    return {' + '.join(pieces)}\n", '<template>', 'exec'), namespace)
+        self.render = namespace['render']
+
+# Compiled once per process for each distinct template text
+@functools.lru_cache(maxsize=64)
+def compile_template(text):
+    return Template(text)
+
+PAGE_HEAD = compile_template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{title}</title>
+<link rel="stylesheet" href="{stylesheet}">
+</head>
+<body>
+<div class="masonry">
+""")
+PAGE_TAIL = """</div>
+</body>
+</html>
+"""
+CARD = compile_template("""<div class="card"><h2>{name}</h2><div class="video-container" data-poster="{poster}">{embed_code!raw}</div></div>
+""")
+
+# Changes whenever the page markup or the stylesheet does, so incremental builds know that
+# every page needs rewriting
+@functools.lru_cache(maxsize=None)
+def layout_hash():
+    layout = '\0'.join((PAGE_HEAD.text, CARD.text, PAGE_TAIL, stylesheet_name()))
+    return hashlib.sha256(layout.encode('utf-8')).hexdigest()[:12]
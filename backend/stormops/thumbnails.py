@@ -0,0 +1,235 @@
+import io
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from . import config
+from .checkpoint import atomic_write_bytes
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants ---
+THUMBNAILS_PATH = '/thumbnails/'
+# Poster fetched for a video; hqdefault exists for every video, live streams included
+POSTER_PATH = '/vi/{video_id}/hqdefault.jpg'
+# Cached thumbnails are scaled down to this width (when Pillow is installed)
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = 80
+# Posters fetched at once, whatever the number of clients asking
+THUMBNAIL_CONCURRENCY = 4
+# In-process hot tier in front of the disk cache
+MEMORY_CACHE_BYTES = 16 * 1024 * 1024
+# A poster that could not be fetched is not asked for again for this long
+FAILURE_TTL_SECONDS = 300
+# Failed IDs remembered before expired ones are swept out
+MAX_FAILURES = 10000
+# Sent with every thumbnail; a video's poster rarely changes
+THUMBNAIL_MAX_AGE_SECONDS = 30 * 86400
+
+VIDEO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{6,32}$')
+YOUTUBE_ID_PATTERN = re.compile(r'youtube(?:-nocookie)?\.com/embed/([A-Za-z0-9_-]{6,32})')
+
+# YouTube video ID of an embed iframe, or None for other platforms
+def youtube_video_id(embed_code):
+    match = YOUTUBE_ID_PATTERN.search(embed_code or '')
+    return match.group(1) if match else None
+
+def poster_url(video_id, origin=None):
+    return (origin or config.THUMBNAIL_ORIGIN).rstrip('/') + POSTER_PATH.format(video_id=video_id)
+
+# Path the gallery server answers with the cached thumbnail of an embed, or None
+def thumbnail_path(embed_code):
+    video_id = youtube_video_id(embed_code)
+    return f"{THUMBNAILS_PATH}{video_id}.jpg" if video_id else None
+
+# Scale a poster down to width as a JPEG. Without Pillow, or for an image it cannot read,
+# the poster is cached as fetched.
+def resize_poster(data, width=THUMBNAIL_WIDTH):
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= width:
+                return data
+            height = max(1, round(image.height * width / image.width))
+            output = io.BytesIO()
+            image.convert('RGB').resize((width, height), Image.LANCZOS).save(output, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+            return output.getvalue()
+    except Exception as e:
+        logger.debug(f"Could not resize poster ({str(e)}), caching it as fetched")
+        return data
+
+# Least-recently-used byte strings up to max_bytes in total
+class MemoryCache:
+    def __init__(self, max_bytes=MEMORY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+# Files in directory up to max_bytes in total, evicting the least recently used. Recency
+# is the file's mtime (touched on every hit), so the order survives a restart; the
+# directory is scanned on first use.
+class DiskCache:
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or config.THUMBNAIL_CACHE_DIR
+        self.max_bytes = max_bytes or config.THUMBNAIL_CACHE_BYTES
+        self.entries = None
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        self.entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self.size = sum(self.entries.values())
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self.entries:
+            name, size = self.entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logger.debug(f"Could not evict {name} from {self.directory}: {str(e)}")
+            registry.inc('thumbnail_evictions_total')
+
+    def get(self, name):
+        path = os.path.join(self.directory, name)
+        with self.lock:
+            if self.entries is None:
+                self._load()
+            if name not in self.entries:
+                return None
+            self.entries.move_to_end(name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self.lock:
+                self.size -= self.entries.pop(name, 0)
+            return None
+
+    def put(self, name, data):
+        path = os.path.join(self.directory, name)
+        with self.lock:
+            if self.entries is None:
+                self._load()
+        atomic_write_bytes(path, data)
+        with self.lock:
+            self.size -= self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            self.size += len(data)
+            self._evict()
+
+# Poster thumbnails for YouTube embeds: memory tier, then disk cache, then at most
+# concurrency fetches from the poster host at a time. Clients asking for the same poster
+# while it is being fetched wait for that one fetch. fetch(url) -> bytes defaults to the
+# shared fetcher, so poster requests go through the same rate controller as page fetches.
+class ThumbnailService:
+    def __init__(self, disk=None, memory=None, fetch=None, origin=None, concurrency=THUMBNAIL_CONCURRENCY, width=THUMBNAIL_WIDTH):
+        self.disk = disk or DiskCache()
+        self.memory = memory or MemoryCache()
+        self.fetch = fetch
+        self.origin = origin
+        self.width = width
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.failures = {}
+
+    def _fetch(self, video_id):
+        if self.fetch is None:
+            from .fetcher import fetch_bytes
+
+            self.fetch = fetch_bytes
+        with self.slots:
+            return resize_poster(self.fetch(poster_url(video_id, self.origin)), self.width)
+
+    # JPEG bytes of the video's thumbnail, or None for an invalid ID or a poster that could
+    # not be fetched
+    def get(self, video_id):
+        if not VIDEO_ID_PATTERN.match(video_id or ''):
+            return None
+        name = f"{video_id}_{self.width}.jpg"
+        data = self.memory.get(name)
+        if data is not None:
+            registry.inc('thumbnail_requests_total', labels={'tier': 'memory'})
+            return data
+        data = self.disk.get(name)
+        if data is not None:
+            self.memory.put(name, data)
+            registry.inc('thumbnail_requests_total', labels={'tier': 'disk'})
+            return data
+        with self.lock:
+            if self.failures.get(video_id, 0) > time.monotonic():
+                registry.inc('thumbnail_requests_total', labels={'tier': 'failed'})
+                return None
+            done = self.in_flight.get(video_id)
+            leader = done is None
+            if leader:
+                done = self.in_flight[video_id] = threading.Event()
+        if not leader:
+            done.wait()
+            return self.memory.get(name) or self.disk.get(name)
+        try:
+            data = self._fetch(video_id)
+        except Exception as e:
+            logger.warning(f"Failed to fetch the poster of video {video_id}: {str(e)}")
+            now = time.monotonic()
+            with self.lock:
+                if len(self.failures) >= MAX_FAILURES:
+                    self.failures = {key: until for key, until in self.failures.items() if until > now}
+                self.failures[video_id] = now + FAILURE_TTL_SECONDS
+            registry.inc('thumbnail_requests_total', labels={'tier': 'failed'})
+            return None
+        else:
+            try:
+                self.disk.put(name, data)
+            except OSError as e:
+                logger.error(f"Failed to cache the thumbnail of video {video_id}: {str(e)}")
+            self.memory.put(name, data)
+            registry.inc('thumbnail_requests_total', labels={'tier': 'fetched'})
+            return data
+        finally:
+            with self.lock:
+                del self.in_flight[video_id]
+            done.set()
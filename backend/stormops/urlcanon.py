@@ -0,0 +1,48 @@
+import posixpath
+import re
+import string
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from . import config
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+REPEATED_SLASHES = re.compile(r'/{2,}')
+# ASCII letters only, the way SQLite's NOCASE folds them, so a key the Bloom filter saw is
+# found by the store's case-insensitive lookup
+ASCII_LOWERCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# One spelling per page: relative links resolved against base_url, scheme and host
+# lowercased, default ports, fragments and repeated or trailing slashes dropped, dot
+# segments resolved, and the query reduced to config.CANONICAL_QUERY_PARAMS (sorted). The
+# path keeps its case, since that is what the origin serves; see url_key. Anything that is
+# not http(s) (mailto:, javascript:) comes back stripped but otherwise untouched.
+def canonicalize_url(url, base_url=None):
+    url = url.strip()
+    parts = urlsplit(urljoin((base_url or config.BASE_URL) + '/', url))
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url
+    try:
+        host = (parts.hostname or '').rstrip('.')
+        port = parts.port
+    except ValueError:
+        return url
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+
+    path = posixpath.normpath(REPEATED_SLASHES.sub('/', parts.path)) if parts.path else '/'
+    if path == '.':
+        path = '/'
+
+    keep = config.CANONICAL_QUERY_PARAMS
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key in keep)) if keep else ''
+    return urlunsplit((scheme, host, path, query, ''))
+
+# Duplicate-detection key of a canonical URL: with config.CANONICAL_LOWERCASE_PATH, links
+# differing only in path case count as one page. Only the key is folded; the URL stored and
+# fetched keeps the case it was first seen with.
+def url_key(url):
+    if not config.CANONICAL_LOWERCASE_PATH:
+        return url
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=parts.path.translate(ASCII_LOWERCASE)))
@@ -0,0 +1,9 @@
+import pytest
+
+
+# Every config path is relative, so running each test in its own directory keeps the
+# store, checkpoints and outputs it writes apart
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
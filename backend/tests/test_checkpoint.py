@@ -0,0 +1,31 @@
+import os
+import stat
+
+from stormops.checkpoint import atomic_write, atomic_write_bytes
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_files_get_the_umask_mode():
+    umask = os.umask(0o022)
+    try:
+        with atomic_write('table.csv') as f:
+            f.write('URL,Name\n')
+        atomic_write_bytes('shard.json', b'{}')
+    finally:
+        os.umask(umask)
+    assert mode('table.csv') == 0o644
+    assert mode('shard.json') == 0o644
+
+
+def test_replaced_files_keep_their_mode():
+    with atomic_write('table.csv') as f:
+        f.write('old\n')
+    os.chmod('table.csv', 0o640)
+    with atomic_write('table.csv') as f:
+        f.write('new\n')
+    assert mode('table.csv') == 0o640
+    with open('table.csv', encoding='utf-8') as f:
+        assert f.read() == 'new\n'
@@ -0,0 +1,76 @@
+import pytest
+import requests
+
+from stormops import config
+from stormops.crawler import LinkCrawler
+from stormops.frontier import Frontier
+from stormops.mocksite import MockSite, SiteConfig, camera_path
+from stormops.store import PipelineStore
+
+PAGES = 3
+CAMERAS_PER_PAGE = 5
+
+
+# The default webcamtaxi adapter follows config.BASE_URL, as under the bench
+@pytest.fixture
+def site(monkeypatch):
+    with MockSite(SiteConfig(directory_pages=PAGES, cameras_per_page=CAMERAS_PER_PAGE, page_kb=1)) as site:
+        monkeypatch.setattr(config, 'BASE_URL', site.base_url)
+        yield site
+
+
+# Plain GET, so the crawl is not paced by the shared rate controller
+def get(url):
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    return response.text
+
+
+def crawler_for(site, **kwargs):
+    return LinkCrawler(root=site.base_url + '/', delay=0, fetch=get, **kwargs)
+
+
+# The root links page 1 and a robots.txt-disallowed page; page 1 links the other pages,
+# plus about and contact pages the mock site answers with 404
+def test_crawl_follows_pagination_and_obeys_robots(site):
+    crawler = crawler_for(site, max_depth=2, max_pages=50)
+    pages = list(crawler.iter_pages())
+    paths = sorted(row.url[len(site.base_url):] for cameras in pages for row in cameras)
+    assert paths == sorted(camera_path(i) for i in range(PAGES * CAMERAS_PER_PAGE))
+    stats = crawler.stats()
+    assert stats['pages'] == 1 + PAGES
+    assert stats['failed_pages'] == 2
+    assert stats['disallowed'] == 1
+    assert stats['other_links'] >= 1
+
+
+def test_crawl_stops_at_max_depth(site):
+    crawler = crawler_for(site, max_depth=1, max_pages=50)
+    cameras = [row for page in crawler.iter_pages() for row in page]
+    assert len(cameras) == CAMERAS_PER_PAGE
+    assert crawler.stats()['pages'] == 2
+
+
+def test_crawl_stops_at_max_pages(site):
+    crawler = crawler_for(site, max_depth=5, max_pages=3)
+    list(crawler.iter_pages())
+    stats = crawler.stats()
+    assert stats['pages'] + stats['failed_pages'] == 3
+
+
+def test_ignoring_robots_fetches_the_disallowed_page(site):
+    crawler = crawler_for(site, max_depth=1, max_pages=50, obey_robots=False)
+    list(crawler.iter_pages())
+    # /en/private/admin.html is not on the mock site, so it is fetched and fails
+    assert crawler.stats()['disallowed'] == 0
+    assert crawler.stats()['failed_pages'] == 1
+
+
+def test_cameras_reach_the_store_once(site):
+    with PipelineStore() as store:
+        frontier = Frontier(store)
+        first = list(crawler_for(site, max_depth=2, max_pages=50).iter_cameras(frontier))
+        assert len(first) == store.url_count() == PAGES * CAMERAS_PER_PAGE
+        again = crawler_for(site, max_depth=2, max_pages=50)
+        assert list(again.iter_cameras(frontier)) == []
+        assert again.stats()['new_cameras'] == 0
@@ -0,0 +1,52 @@
+import json
+import os
+
+from stormops import config
+from stormops.pipeline import export_results
+from stormops.store import PipelineStore
+
+BASE = 'https://www.webcamtaxi.com/en/japan/tokyo'
+EMBED = '<iframe src="https://www.youtube.com/embed/{}"></iframe>'
+
+
+def read_delta(path):
+    with open(path, encoding='utf-8') as f:
+        return {(row['Change'], row['URL']) for row in map(json.loads, f)}
+
+
+def export(store):
+    config.ensure_directories()
+    return export_results(store, os.path.join(config.WEBCAM_DIR, config.GALLERY_FILENAME))
+
+
+def test_delta_lists_new_changed_and_removed(monkeypatch):
+    monkeypatch.setattr(config, 'DELTA_FILE', 'delta.ndjson')
+    with PipelineStore('store.db') as store:
+        store.add_result(f"{BASE}/a.html", 'A Cam', EMBED.format('aaaaaaaa'))
+        store.add_result(f"{BASE}/b.html", 'B Cam', EMBED.format('bbbbbbbb'))
+        export(store)
+        assert read_delta('delta.ndjson') == {('new', f"{BASE}/a.html"), ('new', f"{BASE}/b.html")}
+
+        store.add_result(f"{BASE}/a.html", 'A Cam', EMBED.format('cccccccc'))
+        store.add_result(f"{BASE}/b.html", 'B Cam', None)
+        store.add_result(f"{BASE}/d.html", 'D Cam', EMBED.format('dddddddd'))
+        delta = export(store)
+        assert read_delta('delta.ndjson') == {
+            ('changed', f"{BASE}/a.html"), ('removed', f"{BASE}/b.html"), ('new', f"{BASE}/d.html"),
+        }
+        assert delta.counts == {'new': 1, 'changed': 1, 'removed': 1}
+
+        export(store)
+        assert read_delta('delta.ndjson') == set()
+
+
+def test_failed_export_keeps_the_changes(monkeypatch):
+    monkeypatch.setattr(config, 'DELTA_FILE', 'delta.ndjson')
+    monkeypatch.setattr(config, 'OUTPUT_CSV', os.path.join('missing-directory', 'video_embeds.csv'))
+    with PipelineStore('store.db') as store:
+        store.add_result(f"{BASE}/a.html", 'A Cam', EMBED.format('aaaaaaaa'))
+        export(store)
+
+        monkeypatch.setattr(config, 'OUTPUT_CSV', 'video_embeds.csv')
+        export(store)
+        assert read_delta('delta.ndjson') == {('new', f"{BASE}/a.html")}
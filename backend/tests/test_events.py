@@ -0,0 +1,61 @@
+import socket
+import threading
+
+from stormops.events import ADD, REMOVE, RESET, EventBus
+from stormops.server import make_server
+
+
+def publish(bus, count):
+    return [bus.publish(ADD, {'url': f"https://www.webcamtaxi.com/en/a/b/cam{i}.html"}) for i in range(count)]
+
+
+def test_a_client_resumes_after_its_last_event_id():
+    bus = EventBus()
+    events = publish(bus, 5)
+    subscription = bus.subscribe(events[1].id)
+    assert [event.id for event in subscription.get(0)] == [event.id for event in events[2:]]
+    bus.publish(REMOVE, {'url': 'https://www.webcamtaxi.com/en/a/b/cam0.html'})
+    assert [event.kind for event in subscription.get(0)] == [REMOVE]
+
+
+def test_an_id_older_than_the_history_gets_a_reset():
+    bus = EventBus(history=3)
+    events = publish(bus, 5)
+    assert [event.kind for event in bus.subscribe(events[0].id).get(0)] == [RESET]
+    assert [event.kind for event in bus.subscribe(events[1].id).get(0)] == [ADD, ADD, ADD]
+    # An ID from before a restart is not taken for a recent one
+    assert [event.kind for event in bus.subscribe(events[0].id - 10 ** 6).get(0)] == [RESET]
+
+
+def test_a_client_that_falls_behind_is_cut_off_but_can_resume():
+    bus = EventBus(buffer=2)
+    subscription = bus.subscribe()
+    events = publish(bus, 5)
+    assert subscription.overflowed
+    delivered = subscription.get(0)
+    assert len(delivered) == 2
+    resumed = bus.subscribe(delivered[-1].id)
+    assert [event.id for event in resumed.get(0)] == [event.id for event in events[2:]]
+    assert not resumed.overflowed
+
+
+def test_the_events_endpoint_replays_from_last_event_id(tmp_path):
+    bus = EventBus()
+    events = publish(bus, 3)
+    server = make_server(port=0, directory=str(tmp_path), event_bus=bus)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with socket.create_connection(server.server_address, timeout=5) as conn:
+            conn.sendall(f"GET /events HTTP/1.1\r\nHost: localhost\r\nLast-Event-ID: {events[0].id}\r\n\r\n".encode('ascii'))
+            received = b''
+            while received.count(b'event: add') < 2:
+                chunk = conn.recv(65536)
+                assert chunk
+                received += chunk
+        assert b'text/event-stream' in received
+        assert f"id: {events[0].id}\n".encode('ascii') not in received
+        assert f"id: {events[1].id}\n".encode('ascii') in received
+        assert f"id: {events[2].id}\n".encode('ascii') in received
+    finally:
+        server.shutdown()
+        server.server_close()
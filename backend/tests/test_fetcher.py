@@ -0,0 +1,67 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from stormops import config
+from stormops.fetcher import fetch_embed, fetch_html
+from stormops.pipeline import fetch_once
+from stormops.streamscan import STREAM_CHUNK_SIZE
+
+EMBED = '<iframe width="560" src="https://www.youtube.com/embed/abcdef12345" allowfullscreen></iframe>'
+
+
+# One page served with the given Content-Type, on a port of its own so every test gets a
+# fresh host in the shared rate controller
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(body, content_type='text/html; charset=utf-8', status=200):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/cam.html"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_embed_split_across_chunks_is_found(serve):
+    body = 'x' * (STREAM_CHUNK_SIZE - 40) + EMBED + 'y' * STREAM_CHUNK_SIZE
+    url = serve(body, 'text/html; charset=utf-8')
+    embed, bytes_read = fetch_embed(url, config.VIDEO_PATTERNS, attempts=1)
+    assert embed == EMBED
+    assert bytes_read < len(body)
+
+
+def test_unknown_charset_is_read_as_utf8(serve):
+    body = '<p>Café cam</p>' + EMBED
+    url = serve(body, 'text/html; charset=bogus-enc')
+    assert fetch_embed(url, config.VIDEO_PATTERNS, attempts=1)[0] == EMBED
+    assert EMBED in fetch_html(url, attempts=1)
+
+
+def test_a_gone_page_has_no_embed_instead_of_failing(serve):
+    assert fetch_once(serve('Not here', status=404)) is None
+    assert fetch_once(serve('Gone', status=410)) is None
+
+
+def test_server_errors_still_fail_for_a_retry(serve):
+    with pytest.raises(requests.HTTPError):
+        fetch_once(serve('Busy', status=503))
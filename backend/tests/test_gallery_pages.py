@@ -0,0 +1,58 @@
+import os
+
+from stormops import html_verify, pipeline
+from stormops.html_verify import load_manifest
+from stormops.pipeline import save_batch_pages
+from stormops.records import SUCCESS, EmbedResult
+
+BASE = 'https://www.webcamtaxi.com/en/japan/tokyo'
+EMBED = '<iframe src="https://www.youtube.com/embed/{}"></iframe>'
+
+
+def cameras(count, renamed=()):
+    return [EmbedResult(f"{BASE}/cam{i}.html", f"Renamed {i}" if i in renamed else f"Cam {i}", EMBED.format(f"video{i:05d}"), SUCCESS)
+            for i in range(count)]
+
+
+def mtimes(directory):
+    return {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in os.listdir(directory) if name.endswith('.html')}
+
+
+def test_a_one_camera_change_rewrites_only_its_page():
+    os.makedirs('gallery')
+    save_batch_pages(cameras(25), 10, 'gallery')
+    before = mtimes('gallery')
+    for name in before:
+        os.utime(os.path.join('gallery', name), ns=(1, 1))
+    save_batch_pages(cameras(25, renamed={14}), 10, 'gallery')
+    after = mtimes('gallery')
+    assert sorted(after) == ['webcams_1.html', 'webcams_2.html', 'webcams_3.html']
+    assert [name for name in after if after[name] != 1] == ['webcams_2.html']
+    assert load_manifest('gallery')['files']['webcams_2.html']['Embed Count'] == 10
+
+
+def test_a_build_saves_the_manifest_once(monkeypatch):
+    saves = []
+    save = html_verify.save_manifest
+
+    def counting_save(directory, manifest):
+        saves.append(directory)
+        save(directory, manifest)
+
+    monkeypatch.setattr(html_verify, 'save_manifest', counting_save)
+    monkeypatch.setattr(pipeline, 'save_manifest', counting_save)
+    os.makedirs('gallery')
+    save_batch_pages(cameras(50), 5, 'gallery')
+    assert saves == ['gallery']
+
+
+def test_a_page_that_failed_to_publish_is_not_in_the_manifest():
+    # A directory where the page should go makes its rename fail
+    os.makedirs(os.path.join('gallery', 'webcams_2.html'))
+    save_batch_pages(cameras(25), 10, 'gallery')
+    manifest = load_manifest('gallery')
+    assert sorted(manifest['files']) == ['webcams_1.html', 'webcams_3.html']
+    assert 'hash' not in manifest['pages']['webcams_2.html']
+    os.rmdir(os.path.join('gallery', 'webcams_2.html'))
+    save_batch_pages(cameras(25), 10, 'gallery')
+    assert load_manifest('gallery')['files']['webcams_2.html']['Embed Count'] == 10
@@ -0,0 +1,36 @@
+import os
+
+from stormops.html_verify import count_embeds_streaming, load_manifest, verify_html_file, verify_html_files
+from stormops.pipeline import save_webcams_html
+from stormops.records import NO_EMBED, SUCCESS, EmbedResult
+
+BASE = 'https://www.webcamtaxi.com/en/japan/tokyo'
+EMBED = '<iframe src="https://www.youtube.com/embed/{}"></iframe>'
+
+
+def gallery(directory, count):
+    os.makedirs(directory)
+    filename = os.path.join(directory, 'all_webcams.html')
+    webcams = [EmbedResult(f"{BASE}/cam{i}.html", f"Cam {i}", EMBED.format(f"video{i:05d}"), SUCCESS) for i in range(count)]
+    save_webcams_html(webcams + [EmbedResult(f"{BASE}/dark.html", 'Dark', None, NO_EMBED)], filename)
+    return filename
+
+
+def test_written_pages_are_verified_from_the_manifest():
+    filename = gallery('gallery', 3)
+    entry = load_manifest('gallery')['files']['all_webcams.html']
+    assert entry['Embed Count'] == 3
+    assert entry['Bytes'] == os.path.getsize(filename)
+    assert verify_html_files('gallery') == [{'File': 'all_webcams.html', 'Embed Count': 3}]
+
+
+def test_a_page_changed_since_it_was_written_is_rescanned():
+    filename = gallery('gallery', 3)
+    with open(filename, 'a', encoding='utf-8') as f:
+        f.write(EMBED.format('appended1'))
+    assert verify_html_file(filename) == {'File': 'all_webcams.html', 'Embed Count': 4}
+
+
+def test_streaming_count_finds_embeds_split_across_chunks():
+    filename = gallery('gallery', 40)
+    assert count_embeds_streaming(filename, chunk_size=100) == 40
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from stormops.leasequeue import GlobalHostLimiter, LeaseQueue
+from stormops.records import CameraRow
+from stormops.store import PipelineStore
+
+LEASE_SECONDS = 0.3
+URLS = [f"https://www.webcamtaxi.com/en/japan/tokyo/cam-{i}.html" for i in range(3)]
+
+
+# Two workers, each with its own connection to one store file
+@pytest.fixture
+def workers():
+    with PipelineStore() as seed:
+        seed.add_urls([CameraRow(url, f"Cam {i}") for i, url in enumerate(URLS)])
+        seed.commit()
+    stores = [PipelineStore(), PipelineStore()]
+    yield [LeaseQueue(store, worker_id, LEASE_SECONDS) for store, worker_id in zip(stores, ('a', 'b'))]
+    for store in stores:
+        store.close()
+
+
+def test_live_leases_are_not_handed_out_twice(workers):
+    a, b = workers
+    assert sorted(row.url for row in a.lease(10)) == URLS
+    assert b.lease(10) == []
+    assert a.leased_count() == len(URLS)
+
+
+def test_expired_leases_are_reclaimed(workers):
+    a, b = workers
+    a.lease(10)
+    time.sleep(LEASE_SECONDS + 0.1)
+    assert a.leased_count() == 0
+    assert sorted(row.url for row in b.lease(10)) == URLS
+    assert b.reclaimed == len(URLS)
+    b.complete([(url, 'Cam', '<iframe></iframe>', False) for url in URLS])
+    assert b.leased_count() == 0
+    assert b.store.pending_count() == 0
+    # The stalled worker finds nothing left to do
+    assert a.lease(10) == []
+
+
+def test_renewed_leases_outlive_their_first_expiry(workers):
+    a, b = workers
+    a.lease(10)
+    time.sleep(LEASE_SECONDS * 2 / 3)
+    a.renew()
+    time.sleep(LEASE_SECONDS * 2 / 3)
+    assert b.lease(10) == []
+
+
+def test_released_leases_go_straight_back(workers):
+    a, b = workers
+    a.lease(2)
+    a.release()
+    assert len(b.lease(10)) == len(URLS)
+    assert b.reclaimed == 0
+
+
+def test_failures_are_not_leased_again_until_due(workers):
+    a, b = workers
+    a.lease(10)
+    a.complete([(URLS[0], 'Cam 0', None, True)])
+    a.release()
+    assert sorted(row.url for row in b.lease(10)) == URLS[1:]
+
+
+# Limiters in two processes share each host's slots through the store file
+def test_host_slots_are_spaced_across_limiters(workers):
+    interval = 0.1
+    limiters = [GlobalHostLimiter(workers[0].store.path, interval) for _ in range(2)]
+    started = time.monotonic()
+    for i in range(4):
+        limiters[i % 2].acquire('www.webcamtaxi.com')
+    assert time.monotonic() - started >= 3 * interval * 0.9
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+from stormops.mmapscan import compile_bytes_patterns, iter_mapped_matches, iter_mapped_window_matches
+from stormops.mocksite import SiteConfig, render_camera_page, write_directory_dump
+from stormops.pipeline import (
+    A_TAG_PATTERN, MAX_LINK_LENGTH, extract_embed_code, extract_embed_code_from_file, iter_extract_rows,
+    iter_extract_rows_mapped, iter_master_rows, iter_master_rows_mapped
+)
+from stormops.sources import WEBCAMTAXI
+
+SITE = SiteConfig(directory_pages=4, cameras_per_page=20, page_kb=4)
+# Several windows of the smallest size the scanners allow for links
+WINDOW = 2 * MAX_LINK_LENGTH
+
+
+@pytest.fixture
+def dump(workdir):
+    path = workdir / 'dump.html'
+    write_directory_dump(SITE, path, 6 * WINDOW)
+    # A non-ASCII name must decode the same from the mapped bytes
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('<a href="/en/iceland/south/skógafoss.html" title="Skógafoss Cam">Skógafoss</a>\n')
+    return str(path)
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_master_rows_match_the_text_scan(dump):
+    mapped = list(iter_master_rows_mapped(dump))
+    assert mapped == list(iter_master_rows([read(dump)]))
+    assert any('Skógafoss' in row.name for row in mapped)
+
+
+def test_extract_rows_match_the_text_scan(dump):
+    mapped = list(iter_extract_rows_mapped(dump))
+    assert mapped == list(iter_extract_rows([read(dump)]))
+    assert len(mapped) > SITE.cameras_per_page
+
+
+def test_windowed_matches_equal_one_pass_over_the_file(dump):
+    [pattern] = compile_bytes_patterns((A_TAG_PATTERN.pattern,), 0)
+    with open(dump, 'rb') as f:
+        whole = [match.group(0) for match in pattern.finditer(f.read())]
+    windowed = [match.group(0) for match in iter_mapped_matches(dump, pattern, MAX_LINK_LENGTH, window_size=WINDOW)]
+    assert windowed == whole
+
+
+# Overlapping windows may report a link twice but never miss one
+def test_overlapping_windows_find_every_link(dump):
+    patterns = compile_bytes_patterns(tuple(pattern.pattern for pattern in WEBCAMTAXI.discovery_patterns), re.MULTILINE | re.IGNORECASE)
+    with open(dump, 'rb') as f:
+        data = f.read()
+    whole = {match.group(1) for pattern in patterns for match in pattern.finditer(data)}
+    windowed = {match.group(1) for match in iter_mapped_window_matches(dump, patterns, MAX_LINK_LENGTH, window_size=WINDOW)}
+    assert windowed == whole
+
+
+def test_embed_from_file_matches_the_text_search(workdir):
+    for index in range(8):
+        path = workdir / f"cam-{index}.html"
+        html = render_camera_page(SITE, index)
+        path.write_text(html, encoding='utf-8')
+        assert extract_embed_code_from_file(str(path)) == extract_embed_code(html)
+
+
+def test_empty_file_has_no_matches(workdir):
+    path = workdir / 'empty.html'
+    path.write_bytes(b'')
+    assert list(iter_master_rows_mapped(str(path))) == []
+    assert extract_embed_code_from_file(str(path)) is None
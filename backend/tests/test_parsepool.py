@@ -0,0 +1,26 @@
+import shutil
+
+from stormops import mocksite
+from stormops.bench import poisoned_parse
+from stormops.parsepool import MEMORY, TIMEOUT, ParsePool
+from stormops.quarantine import Quarantine
+from stormops.store import PipelineStore
+
+
+def test_hanging_and_memory_hungry_pages_are_dead_lettered():
+    site = mocksite.SiteConfig(directory_pages=1, cameras_per_page=10, page_kb=4)
+    with open('directory_1.html', 'w', encoding='utf-8') as f:
+        f.write(mocksite.render_directory_page(site, 0))
+    for kind in ('hang', 'memory'):
+        shutil.copyfile('directory_1.html', f"poison-{kind}.html")
+    store = PipelineStore('store.db')
+    with ParsePool(workers=2, timeout=2.0, memory_mb=128, target=poisoned_parse) as pool:
+        done = dict(pool.discover(['poison-hang.html', 'poison-memory.html', 'directory_1.html'], store))
+    assert sorted(done) == ['directory_1.html', 'poison-hang.html', 'poison-memory.html']
+    assert sorted((entry['path'], entry['reason']) for entry in pool.dead_letters) == [
+        ('poison-hang.html', TIMEOUT), ('poison-memory.html', MEMORY)]
+    # Every link of the clean page is found; the poison pages add none
+    assert done['directory_1.html'] == store.url_count() >= 10
+    quarantined = Quarantine()
+    assert quarantined.contains('poison-hang.html') and quarantined.contains('poison-memory.html')
+    assert not quarantined.contains('directory_1.html')
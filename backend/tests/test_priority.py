@@ -0,0 +1,37 @@
+from stormops.priority import YieldModel, path_prefixes
+from stormops.records import SUCCESS, EmbedResult
+from stormops.store import PipelineStore
+
+BASE = 'https://www.webcamtaxi.com'
+
+
+def test_path_prefixes_are_country_and_region():
+    assert path_prefixes(f"{BASE}/en/japan/tokyo/shibuya-crossing.html") == [
+        'www.webcamtaxi.com/en/japan/',
+        'www.webcamtaxi.com/en/japan/tokyo/',
+    ]
+
+
+def test_path_prefixes_of_a_shallow_url():
+    assert path_prefixes(f"{BASE}/en/japan/index.html") == ['www.webcamtaxi.com/en/japan/']
+    assert path_prefixes(f"{BASE}/about.html") == []
+
+
+def test_a_failing_region_sinks_below_a_productive_one():
+    model = YieldModel()
+    for i in range(30):
+        model.observe(f"{BASE}/en/japan/tokyo/cam-{i}.html", f"Tokyo Cam {i}", '<iframe></iframe>')
+        model.observe(f"{BASE}/en/italy/rome/cam-{i}.html", f"Rome Cam {i}", None)
+    tokyo = model.score(f"{BASE}/en/japan/tokyo/new-cam.html", 'New Cam')
+    rome = model.score(f"{BASE}/en/italy/rome/new-cam.html", 'New Cam')
+    osaka = model.score(f"{BASE}/en/japan/osaka/new-cam.html", 'New Cam')
+    assert tokyo > osaka > rome
+
+
+def test_failed_fetches_do_not_count_against_a_region():
+    store = PipelineStore('store.db')
+    store.add_results([EmbedResult(f"{BASE}/en/japan/tokyo/cam-{i}.html", f"Tokyo Cam {i}", '<iframe></iframe>', SUCCESS) for i in range(3)])
+    for i in range(3, 30):
+        store.add_result(f"{BASE}/en/japan/tokyo/cam-{i}.html", f"Tokyo Cam {i}", None, failed=True)
+    assert YieldModel.from_store(store).prefixes['www.webcamtaxi.com/en/japan/tokyo/'] == [3, 3]
+    assert sum(total for _, total in YieldModel.from_store(store).features.values()) == 3
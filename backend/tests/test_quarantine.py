@@ -0,0 +1,39 @@
+import json
+
+from stormops import config
+from stormops.bench import measure_pattern_scaling
+from stormops.pipeline import discover_file
+from stormops.quarantine import Quarantine
+from stormops.store import PipelineStore
+
+LINK = '<a href="/en/japan/tokyo/cam-{0}.html" title="Cam {0}" class="webcam thumbnail">Cam {0}</a>\n'
+
+
+def write_page(path, count=50):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(LINK.format(i) for i in range(count)))
+
+
+def test_no_page_pattern_grows_faster_than_its_input():
+    scaling = measure_pattern_scaling()
+    assert scaling['patterns'] > 0
+    assert scaling['superlinear'] == []
+
+
+def test_a_page_over_its_match_budget_is_quarantined_until_it_changes(monkeypatch):
+    monkeypatch.setattr(config, 'MATCH_BUDGET_SECONDS', -1.0)
+    monkeypatch.setattr(config, 'MATCH_BUDGET_SECONDS_PER_MB', 0.0)
+    write_page('page.html')
+    store = PipelineStore('store.db')
+    discover_file('page.html', store)
+    with open(config.QUARANTINE_FILE, encoding='utf-8') as f:
+        [entry] = [json.loads(line) for line in f]
+    assert entry['stage'] == 'discover'
+    assert entry['path'].endswith('page.html')
+
+    monkeypatch.setattr(config, 'MATCH_BUDGET_SECONDS', 60.0)
+    assert Quarantine().contains('page.html')
+    assert discover_file('page.html', store) == 0
+    write_page('page.html', count=60)
+    assert not Quarantine().contains('page.html')
+    assert discover_file('page.html', store) > 0
@@ -0,0 +1,35 @@
+from stormops.ratecontrol import AdaptiveRateController
+
+HOST = 'www.webcamtaxi.com'
+
+
+def test_cancel_gives_the_slot_back_without_an_outcome():
+    controller = AdaptiveRateController(initial_delay=0)
+    controller.acquire(HOST)
+    controller.cancel(HOST)
+    state = controller.snapshot()[HOST]
+    assert state['in_flight'] == 0
+    assert state['requests'] == 0
+    assert state['failures'] == 0
+    assert state['concurrency'] == 1
+    assert state['delay'] == 0
+
+
+def test_jitter_on_a_fast_host_still_speeds_pacing_up():
+    controller = AdaptiveRateController(initial_delay=0.5)
+    for latency in [0.002, 0.011, 0.004, 0.015, 0.003, 0.012] * 5:
+        controller.acquire(HOST)
+        controller.hosts[HOST].next_allowed_at = 0
+        controller.release(HOST, latency=latency)
+    state = controller.snapshot()[HOST]
+    assert state['delay'] < 0.5
+    assert state['concurrency'] > 1
+
+
+def test_a_real_slowdown_still_eases_off():
+    controller = AdaptiveRateController(initial_delay=0.5)
+    for latency in [0.2] * 5 + [2.0] * 10:
+        controller.acquire(HOST)
+        controller.hosts[HOST].next_allowed_at = 0
+        controller.release(HOST, latency=latency)
+    assert controller.snapshot()[HOST]['delay'] > 0.5
@@ -0,0 +1,35 @@
+import time
+
+from stormops import config
+from stormops.records import CameraRow
+from stormops.retries import RetryQueue
+from stormops.store import PipelineStore
+
+BASE = 'https://www.webcamtaxi.com/en/japan/tokyo'
+
+
+def test_a_pass_never_waits_for_a_failure_backing_off(monkeypatch):
+    monkeypatch.setattr(config, 'RETRY_BACKOFF_SECONDS', 0.5)
+    store = PipelineStore('store.db')
+    store.add_result(f"{BASE}/flaky.html", 'Flaky', None, failed=True)
+    queue = RetryQueue(store, [CameraRow(f"{BASE}/new.html", 'New')], wait_seconds=5)
+    passes = queue.passes()
+
+    started = time.monotonic()
+    assert [row.url for row in next(passes)] == [f"{BASE}/new.html"]
+    assert time.monotonic() - started < 0.3
+    queue.done(f"{BASE}/new.html")
+
+    retry_pass = next(passes)
+    assert time.monotonic() - started >= 0.4
+    assert [row.url for row in retry_pass] == [f"{BASE}/flaky.html"]
+    assert queue.retried == 1
+
+
+def test_failures_due_after_the_wait_are_left_for_the_next_run(monkeypatch):
+    monkeypatch.setattr(config, 'RETRY_BACKOFF_SECONDS', 60)
+    store = PipelineStore('store.db')
+    store.add_result(f"{BASE}/flaky.html", 'Flaky', None, failed=True)
+    passes = list(RetryQueue(store, [], wait_seconds=1).passes())
+    assert len(passes) == 1
+    assert list(passes[0]) == []
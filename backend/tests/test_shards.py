@@ -0,0 +1,51 @@
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+
+from stormops.records import SUCCESS, EmbedResult
+from stormops.shards import INDEX_FILENAME, SHARD_FILE_PATTERN, embed_src, write_shards
+
+BASE = 'https://www.webcamtaxi.com'
+EMBED = '<iframe src="https://www.youtube.com/embed/{}?autoplay=1&amp;mute=1"></iframe>'
+
+
+def cameras(regions, count=8):
+    return [EmbedResult(f"{BASE}/en/{region}/cam-{i}.html", f"{region} cam {i}", EMBED.format(f"{region.replace('/', '')}{i:05d}"), SUCCESS)
+            for region in regions for i in range(count)]
+
+
+def shard_files():
+    return sorted(os.listdir(os.path.join('gallery', 'cameras')))
+
+
+def test_index_points_at_content_hashed_shards_with_compressed_siblings():
+    index = write_shards(cameras(['japan/tokyo', 'italy/rome']), 'gallery', base_url=BASE)
+    assert sorted(index['regions']) == ['italy-rome', 'japan-tokyo']
+    with open(os.path.join('gallery', 'cameras', INDEX_FILENAME), encoding='utf-8') as f:
+        assert json.load(f) == index
+    for entry in index['regions'].values():
+        path = os.path.join('gallery', 'cameras', entry['file'])
+        with open(path, 'rb') as f:
+            data = f.read()
+        assert SHARD_FILE_PATTERN.match(entry['file'])
+        assert hashlib.sha256(data).hexdigest()[:12] in entry['file']
+        assert entry['count'] == 8
+        with open(path + '.gz', 'rb') as f:
+            assert gzip.decompress(f.read()) == data
+        assert os.path.exists(path + '.br') == (importlib.util.find_spec('brotli') is not None)
+
+
+def test_a_rebuild_renames_only_the_changed_region_and_leaves_no_prev_files():
+    first = write_shards(cameras(['japan/tokyo', 'italy/rome']), 'gallery', base_url=BASE)
+    second = write_shards(cameras(['japan/tokyo']) + cameras(['italy/rome'], count=9), 'gallery', base_url=BASE)
+    assert second['regions']['japan-tokyo'] == first['regions']['japan-tokyo']
+    assert second['regions']['italy-rome']['file'] != first['regions']['italy-rome']['file']
+    assert not [name for name in shard_files() if name.endswith('.prev')]
+    # The previous index's shards stay for clients that still hold it
+    assert first['regions']['italy-rome']['file'] in shard_files()
+
+
+def test_player_urls_are_unescaped():
+    assert embed_src(EMBED.format('abcdef12345')) == 'https://www.youtube.com/embed/abcdef12345?autoplay=1&mute=1'
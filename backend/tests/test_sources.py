@@ -0,0 +1,84 @@
+import pytest
+import requests
+
+from stormops import sources
+from stormops.crawler import LinkCrawler, crawl_sources
+from stormops.frontier import Frontier
+from stormops.mocksite import MockSite, SiteConfig
+from stormops.sources import CAMERA, DIRECTORY, OTHER, WEBCAMTAXI, SourceAdapter, get_source, register_source, source_for_url
+from stormops.store import PipelineStore
+
+
+def adapter(name, base_url, **kwargs):
+    return SourceAdapter(
+        name,
+        base_url=base_url,
+        camera_path_pattern=WEBCAMTAXI.camera_path_pattern.pattern,
+        directory_path_pattern=WEBCAMTAXI.directory_path_pattern.pattern,
+        **kwargs,
+    )
+
+
+# Registrations made by a test stay in that test
+@pytest.fixture(autouse=True)
+def isolated_sources(monkeypatch):
+    monkeypatch.setattr(sources, 'SOURCES', dict(sources.SOURCES))
+
+
+def test_webcamtaxi_is_built_in():
+    assert get_source('webcamtaxi') is WEBCAMTAXI
+    assert source_for_url('https://www.webcamtaxi.com/en/japan/tokyo/cam.html') is WEBCAMTAXI
+
+
+def test_unknown_source_names_the_known_ones():
+    with pytest.raises(ValueError, match='webcamtaxi'):
+        get_source('nosuchsite')
+
+
+def test_a_registered_source_owns_its_host():
+    other = register_source(adapter('othercams', 'https://cams.example.org', hosts=('www.cams.example.org',)))
+    assert get_source('othercams') is other
+    assert source_for_url('https://cams.example.org/en/norway/coast/fjord.html') is other
+    assert source_for_url('https://www.cams.example.org/en/') is other
+    # Any other host falls back to the default adapter
+    assert source_for_url('https://unknown.example.net/en/a/b/c.html') is WEBCAMTAXI
+
+
+def test_classify_and_camera_path():
+    other = adapter('othercams', 'https://cams.example.org')
+    assert other.classify('https://cams.example.org/en/norway/coast/fjord.html') == CAMERA
+    assert other.classify('https://cams.example.org/en/norway.html') == DIRECTORY
+    assert other.classify('https://cams.example.org/en/norway/coast.html') == DIRECTORY
+    assert other.classify('https://cams.example.org/images/1.jpg') == OTHER
+    assert other.classify('https://www.webcamtaxi.com/en/norway/coast/fjord.html') == OTHER
+    assert other.classify('mailto:cams@example.org') == OTHER
+    assert other.camera_path('https://cams.example.org/en/norway/coast/fjord.html?lang=no') == '/en/norway/coast/fjord.html?lang=no'
+    assert other.camera_path('/en/norway/coast/fjord.html') == '/en/norway/coast/fjord.html'
+    assert other.camera_path('https://www.webcamtaxi.com/en/norway/coast/fjord.html') is None
+
+
+def test_extract_embed_uses_the_adapter_patterns():
+    other = adapter('othercams', 'https://cams.example.org', video_patterns=[r'<video src="[^"]+"></video>'])
+    html = '<iframe src="https://www.youtube.com/embed/abc"></iframe><video src="/live.m3u8"></video>'
+    assert other.extract_embed(html) == '<video src="/live.m3u8"></video>'
+    assert WEBCAMTAXI.extract_embed(html).startswith('<iframe')
+
+
+def get(url):
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    return response.text
+
+
+# Two sites crawled at once, each by its own adapter, into one store
+def test_crawl_sources_merges_sites():
+    config = SiteConfig(directory_pages=2, cameras_per_page=4, page_kb=1)
+    with MockSite(config) as first, MockSite(config) as second:
+        crawlers = [
+            LinkCrawler(register_source(adapter(f"site{i}", site.base_url)), delay=0, max_depth=2, max_pages=20, fetch=get)
+            for i, site in enumerate((first, second))
+        ]
+        with PipelineStore() as store:
+            cameras = list(crawl_sources(crawlers, Frontier(store)))
+            assert len(cameras) == store.url_count() == 2 * config.camera_count
+            assert {source_for_url(row.url).name for row in cameras} == {'site0', 'site1'}
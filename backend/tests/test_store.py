@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+from stormops import config
+from stormops.pipeline import open_store
+from stormops.records import FAILED, NO_EMBED, SUCCESS, CameraRow, EmbedResult
+from stormops.store import PipelineStore
+
+BASE = 'https://www.webcamtaxi.com/en/japan/tokyo'
+EMBED = '<iframe src="https://www.youtube.com/embed/aaaaaaaa"></iframe>'
+
+
+def due_urls(store, refresh=False):
+    return {row.url for row in store.due_rows(time.time(), 100, refresh)}
+
+
+def test_result_status_round_trips_through_the_store():
+    with PipelineStore('store.db') as store:
+        store.add_results([
+            EmbedResult(f"{BASE}/a.html", 'A', EMBED, SUCCESS),
+            EmbedResult(f"{BASE}/b.html", 'B', None, NO_EMBED),
+            EmbedResult(f"{BASE}/c.html", 'C', None, FAILED),
+        ])
+        assert [row.status for row in store.iter_results()] == [SUCCESS, NO_EMBED, FAILED]
+        assert due_urls(store) == {f"{BASE}/c.html"}
+
+
+def test_failed_rows_seeded_from_the_results_table_are_retried():
+    with open(config.OUTPUT_CSV, 'w', encoding='utf-8', newline='') as f:
+        f.write('URL,Name,Embed_Code,Status\n')
+        f.write(f"{BASE}/a.html,A,,failed\n")
+        f.write(f"{BASE}/b.html,B,,no_embed\n")
+    store = open_store('store.db')
+    try:
+        assert store.status_counts() == {FAILED: 1, NO_EMBED: 1}
+        assert due_urls(store) == {f"{BASE}/a.html"}
+    finally:
+        store.close()
+
+
+def test_migrated_results_without_an_embed_are_rechecked_once():
+    conn = sqlite3.connect('store.db')
+    conn.executescript(
+        'CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, name TEXT);'
+        'CREATE TABLE results (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, name TEXT, embed_code TEXT);'
+    )
+    conn.execute('INSERT INTO results (url, name, embed_code) VALUES (?, ?, ?)', (f"{BASE}/a.html", 'A', EMBED))
+    conn.execute('INSERT INTO results (url, name, embed_code) VALUES (?, ?, ?)', (f"{BASE}/b.html", 'B', None))
+    conn.commit()
+    conn.close()
+    with PipelineStore('store.db') as store:
+        assert due_urls(store) == {f"{BASE}/b.html"}
+        store.add_result(f"{BASE}/b.html", 'B', None)
+        assert due_urls(store) == set()
+
+
+def test_failures_back_off_and_successes_reset():
+    with PipelineStore('store.db') as store:
+        store.add_urls([CameraRow(f"{BASE}/a.html", 'A')])
+        store.add_result(f"{BASE}/a.html", 'A', None, failed=True)
+        assert due_urls(store) == set()
+        assert store.next_retry_at(time.time()) > time.time()
+        store.add_result(f"{BASE}/a.html", 'A', EMBED)
+        assert store.status_counts() == {SUCCESS: 1}
+        assert store.pending_count() == 0
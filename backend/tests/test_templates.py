@@ -0,0 +1,22 @@
+from stormops.pipeline import create_all_webcams_html
+from stormops.records import SUCCESS, EmbedResult
+from stormops.templates import compile_template, stylesheet_name
+
+EMBED = '<iframe src="https://www.youtube.com/embed/abcdef12345"></iframe>'
+
+
+def test_fields_are_escaped_and_raw_fields_are_not():
+    template = compile_template('<h2 title="{name}">{name}</h2>{embed_code!raw}')
+    assert template.render(name='<script>"Cam" & co</script>', embed_code=EMBED) == (
+        '<h2 title="&lt;script&gt;&quot;Cam&quot; &amp; co&lt;/script&gt;">'
+        '&lt;script&gt;&quot;Cam&quot; &amp; co&lt;/script&gt;</h2>' + EMBED
+    )
+    assert template.render(name=None, embed_code=None) == '<h2 title=""></h2>'
+
+
+def test_gallery_escapes_camera_names_and_links_the_shared_stylesheet():
+    page = create_all_webcams_html([EmbedResult('https://www.webcamtaxi.com/en/a/b/c.html', 'Tom & Jerry <Cam>', EMBED, SUCCESS)])
+    assert '<h2>Tom &amp; Jerry &lt;Cam&gt;</h2>' in page
+    assert EMBED in page
+    assert f'<link rel="stylesheet" href="{stylesheet_name()}">' in page
+    assert '<style>' not in page
@@ -0,0 +1,27 @@
+from stormops.pipeline import create_all_webcams_html
+from stormops.records import SUCCESS, EmbedResult
+from stormops.shards import SHARD_FIELDS, camera_record
+
+BASE = 'https://www.webcamtaxi.com'
+YOUTUBE = '<iframe src="https://www.youtube.com/embed/abcdef12345"></iframe>'
+OTHER = '<iframe src="https://player.example.com/live/42"></iframe>'
+
+
+def camera(embed):
+    return EmbedResult(f"{BASE}/en/japan/tokyo/shibuya.html", 'Shibuya', embed, SUCCESS)
+
+
+def test_cards_point_at_the_cached_poster():
+    page = create_all_webcams_html([camera(YOUTUBE), camera(OTHER)])
+    assert 'data-poster="/thumbnails/abcdef12345.jpg"' in page
+    assert page.count('data-poster=""') == 1
+
+
+def test_shard_records_carry_the_poster():
+    assert dict(zip(SHARD_FIELDS, camera_record(camera(YOUTUBE), BASE))) == {
+        'path': '/en/japan/tokyo/shibuya.html',
+        'name': 'Shibuya',
+        'src': 'https://www.youtube.com/embed/abcdef12345',
+        'poster': '/thumbnails/abcdef12345.jpg',
+    }
+    assert camera_record(camera(OTHER), BASE)[-1] is None
@@ -0,0 +1,36 @@
+from stormops import config
+from stormops.frontier import Frontier
+from stormops.records import CameraRow
+from stormops.store import PipelineStore
+from stormops.urlcanon import canonicalize_url, url_key
+
+BASE = 'https://www.webcamtaxi.com'
+
+
+def test_canonical_form():
+    assert canonicalize_url('/en/japan//tokyo/./x.html#live', BASE) == f"{BASE}/en/japan/tokyo/x.html"
+    assert canonicalize_url('HTTPS://WWW.Webcamtaxi.com:443/en/?b=1&start=20', BASE) == f"{BASE}/en?start=20"
+    assert canonicalize_url('http://example.com:8080/a/', BASE) == 'http://example.com:8080/a'
+    assert canonicalize_url('mailto:cams@example.com ', BASE) == 'mailto:cams@example.com'
+
+
+def test_path_case_is_kept_for_fetching():
+    assert canonicalize_url('/en/Japan/Tokyo/Shibuya.html', BASE) == f"{BASE}/en/Japan/Tokyo/Shibuya.html"
+    assert url_key(f"{BASE}/en/Japan/Tokyo/Shibuya.html") == f"{BASE}/en/japan/tokyo/shibuya.html"
+
+
+def test_path_case_variants_are_one_page(monkeypatch):
+    monkeypatch.setattr(config, 'CANONICAL_LOWERCASE_PATH', True)
+    store = PipelineStore(':memory:')
+    store.add_urls([CameraRow(f"{BASE}/en/Japan/Tokyo/Shibuya.html", 'Shibuya')])
+    frontier = Frontier(store, expected=100, base_url=BASE)
+    rows = [CameraRow('/en/japan/tokyo/shibuya.html', 'Shibuya'), CameraRow('/en/Japan/Osaka/Dotonbori.html', 'Dotonbori'),
+            CameraRow('/en/JAPAN/OSAKA/DOTONBORI.html', 'Dotonbori')]
+    assert frontier.new_rows(rows) == [CameraRow(f"{BASE}/en/Japan/Osaka/Dotonbori.html", 'Dotonbori')]
+    assert frontier.stats()['duplicates_avoided'] == 2
+
+
+def test_path_case_variants_are_separate_pages_when_folding_is_off(monkeypatch):
+    monkeypatch.setattr(config, 'CANONICAL_LOWERCASE_PATH', False)
+    frontier = Frontier(PipelineStore(':memory:'), expected=100, base_url=BASE)
+    assert frontier.add_urls([CameraRow('/en/a/b/Cam.html', 'Cam'), CameraRow('/en/a/b/cam.html', 'Cam')]) == 2